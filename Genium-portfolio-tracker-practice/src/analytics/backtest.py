@@ -0,0 +1,380 @@
+import itertools
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .base_strategy import BaseStrategy
+from .performance import TRADING_DAYS
+
+# equity: pd.Series of portfolio value per bar. fills: pd.DataFrame of executed
+# trades. summary: dict of headline statistics, as in summarize.
+BacktestResult = namedtuple('BacktestResult', ['equity', 'fills', 'summary'])
+
+# summary: pd.DataFrame with one row per parameter combination, its parameters
+# and statistics. equity: pd.DataFrame with one column per combination.
+SweepResult = namedtuple('SweepResult', ['summary', 'equity'])
+
+
+def rebalance_rows(index, frequency):
+    """
+    Rows of a date index on which to rebalance: the first row, then the first row of every new period
+
+    Args:
+        index (pd.DatetimeIndex): Bar timestamps
+        frequency (str): pandas period alias, e.g. 'D', 'W', 'M', 'Q', or 'h'
+                         and '30min' for intraday bars
+    """
+    index = pd.DatetimeIndex(index)
+    try:
+        # Fixed frequencies align to the clock, so '30min' starts on the hour and half hour
+        periods = index.floor(frequency)
+    except ValueError:
+        periods = index.to_period(frequency)
+    return np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+
+
+def periods_per_year(index):
+    """Bars per year: 252 for daily bars, 252 times the typical bars per day for intraday ones"""
+    days = pd.DatetimeIndex(index).normalize()
+    bars_per_day = pd.Series(days).value_counts().median() if len(days) else 1
+    return TRADING_DAYS * max(bars_per_day, 1)
+
+
+def simulate(prices, weights, rows, cost_bps=0.0, initial_capital=1.0):
+    """
+    Equity curves of target-weight portfolios rebalanced on the given rows
+
+    At the close of every rebalance row the book is traded to its target
+    weights, paying cost_bps on the value traded; between rebalances the
+    positions drift with prices. Each holding period is one matrix product
+    of relative prices and weights, covering every bar of the period and
+    every grid point at once. Capital is chained across periods with a
+    cumulative product, so nothing loops over bars or grid points.
+
+    Args:
+        prices (np.ndarray): Closes, one row per bar and one column per
+                             security. Gaps are forward filled; a security
+                             can't be held before its first price.
+        weights (np.ndarray): Target weights of shape (..., len(rows), securities).
+                              Leading axes are parameter grid points. Weights
+                              summing to less than 1 leave the rest in cash.
+        rows (np.ndarray): Increasing bar positions of the rebalances
+        cost_bps (float): Commission and slippage in basis points of traded value
+        initial_capital (float): Cash before the first rebalance
+
+    Returns:
+        tuple: (equity of shape (..., bars), turnover of shape (..., len(rows))
+                as the sum of absolute weight changes at each rebalance)
+    """
+    prices = pd.DataFrame(prices).ffill().to_numpy(dtype=np.float64)
+    rows = np.asarray(rows)
+    grid_shape = weights.shape[:-2]
+    n_bars, n_securities = prices.shape
+    n_rebalances = len(rows)
+    weights = np.asarray(weights, dtype=np.float64).reshape(-1, n_rebalances, n_securities)
+    listed = ~np.isnan(prices[rows])
+    weights = np.where(listed, weights, 0.0)
+    prices = np.where(np.isnan(prices), 1.0, prices)
+    cash = 1 - weights.sum(axis=2)
+
+    # Growth of the book since its last rebalance, on every bar
+    growth = np.ones((len(weights), n_bars))
+    ends = np.r_[rows[1:], n_bars]
+    for k, (start, end) in enumerate(zip(rows, ends)):
+        relative = prices[start:end] / prices[start]
+        growth[:, start:end] = (relative @ weights[:, k].T).T + cash[:, k, None]
+
+    # The same growth at the next rebalance's close, before trading, and the weights it drifted to
+    relative = prices[rows[1:]] / prices[rows[:-1]]
+    drift = weights[:, :-1] * relative
+    period_growth = drift.sum(axis=2) + cash[:, :-1]
+    # Turn drift into |target - drifted weight| in place: it is the largest array here
+    drift /= period_growth[..., None]
+    drift -= weights[:, 1:]
+    np.abs(drift, out=drift)
+    turnover = np.concatenate([np.abs(weights[:, :1]).sum(axis=2), drift.sum(axis=2)], axis=1)
+
+    step = 1 - turnover * cost_bps / 1e4
+    step[:, 1:] *= period_growth
+    capital = initial_capital * np.cumprod(step, axis=1)
+
+    period = np.searchsorted(rows, np.arange(n_bars), side='right') - 1
+    equity = np.full((len(weights), n_bars), float(initial_capital))
+    invested = period >= 0
+    equity[:, invested] = capital[:, period[invested]] * growth[:, invested]
+    return equity.reshape(*grid_shape, n_bars), turnover.reshape(*grid_shape, n_rebalances)
+
+
+def summarize(equity, turnover, bars_per_year=TRADING_DAYS):
+    """
+    Headline statistics of equity curves
+
+    Args:
+        equity (np.ndarray): Equity of shape (..., bars)
+        turnover (np.ndarray): Turnover per rebalance of shape (..., rebalances)
+
+    Returns:
+        dict: Arrays of shape (...) for total_return, annualized_return,
+              volatility, sharpe (with a zero risk-free rate), max_drawdown
+              and annual turnover
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = equity[..., 1:] / equity[..., :-1] - 1
+    years = max(equity.shape[-1] - 1, 1) / bars_per_year
+    total_return = equity[..., -1] / equity[..., 0] - 1
+    volatility = returns.std(axis=-1, ddof=1) * np.sqrt(bars_per_year) if returns.shape[-1] > 1 \
+        else np.zeros(equity.shape[:-1])
+    mean_return = returns.mean(axis=-1) * bars_per_year if returns.shape[-1] else np.zeros(equity.shape[:-1])
+    return {
+        'total_return': total_return,
+        'annualized_return': (1 + total_return) ** (1 / years) - 1,
+        'volatility': volatility,
+        'sharpe': np.divide(mean_return, volatility, out=np.zeros_like(volatility), where=volatility > 0),
+        'max_drawdown': (equity / np.maximum.accumulate(equity, axis=-1) - 1).min(axis=-1),
+        'turnover': np.asarray(turnover).sum(axis=-1) / years
+    }
+
+
+def momentum_weights(prices, rows, lookback, top_n):
+    """
+    Equal weights in the top_n securities by trailing return over lookback bars
+
+    Rebalances with less than lookback bars of history hold cash. lookback
+    and top_n may be equal-length arrays, one entry per grid point; the
+    weights then gain a leading grid axis.
+
+    Returns:
+        np.ndarray: Weights of shape (grid points, len(rows), securities)
+    """
+    lookback, top_n = np.broadcast_arrays(np.atleast_1d(lookback), np.atleast_1d(top_n))
+    prices = pd.DataFrame(prices).ffill().to_numpy(dtype=np.float64)
+    current = prices[rows]
+    weights = np.zeros((len(lookback), len(rows), prices.shape[1]))
+    for window in np.unique(lookback):
+        points = np.flatnonzero(lookback == window)
+        trailing = current / prices[np.maximum(rows - window, 0)] - 1
+        trailing[(rows < window)[:, None] | np.isnan(trailing)] = -np.inf
+        # Rank of every security at every rebalance, best first
+        ranks = np.argsort(np.argsort(-trailing, axis=1, kind='stable'), axis=1)
+        selected = (ranks < top_n[points, None, None]) & np.isfinite(trailing)
+        counts = selected.sum(axis=2, keepdims=True)
+        weights[points] = np.divide(selected, counts, out=np.zeros(selected.shape), where=counts > 0)
+    return weights
+
+
+def equal_weights(prices, rows):
+    """Equal weights in every security with a price, at every rebalance"""
+    listed = ~np.isnan(pd.DataFrame(prices).ffill().to_numpy(dtype=np.float64)[rows])
+    return (listed / np.maximum(listed.sum(axis=1, keepdims=True), 1))[None]
+
+
+_worker_prices = None
+
+
+def _init_worker(prices):
+    """Process pool initializer: every worker receives the price matrix once"""
+    global _worker_prices
+    _worker_prices = prices
+
+
+def _run_chunk(signal, rows, params, cost_bps, initial_capital, bars_per_year, prices=None):
+    """Backtest one chunk of grid points, vectorized across them"""
+    prices = _worker_prices if prices is None else prices
+    weights = signal(prices, rows, **params)
+    equity, turnover = simulate(prices, weights, rows, cost_bps, initial_capital)
+    return equity, summarize(equity, turnover, bars_per_year)
+
+
+class Backtester:
+    """
+    Replays historical prices through strategies and target-weight signals
+
+    run calls a strategy's analyze on a holdings snapshot at every
+    rebalance and trades the orders it implies, the way a user acting on
+    the dashboard would. sweep backtests a vectorized weight signal, such
+    as momentum_weights, across a parameter grid: each chunk of grid points
+    is simulated at once by simulate, and chunks are spread over a process
+    pool.
+    """
+
+    def __init__(self, prices, cost_bps=5.0, initial_capital=1000000.0, max_workers=None):
+        """
+        Args:
+            prices (pd.DataFrame): Daily or intraday closes indexed by timestamp,
+                                   one column per security
+            cost_bps (float): Commission and slippage in basis points of traded value
+            initial_capital (float): Starting cash for sweep
+            max_workers (int): Processes for sweep; 1 runs in this process
+        """
+        self.prices = prices.sort_index()
+        self.cost_bps = cost_bps
+        self.initial_capital = initial_capital
+        self.max_workers = max_workers
+        self.bars_per_year = periods_per_year(self.prices.index)
+
+    def sweep(self, signal, grid, frequency='M', chunk_size=16):
+        """
+        Backtest a weight signal at every combination of grid parameters
+
+        Args:
+            signal (callable): signal(prices, rows, **params) returning weights
+                               of shape (grid points, len(rows), securities),
+                               where every param is an array with one entry per
+                               grid point. Must be a module-level function so
+                               it can be sent to worker processes.
+            grid (dict): Parameter name to list of values. A 'frequency' entry
+                         sweeps the rebalance frequency too.
+            frequency (str): Rebalance frequency when the grid has none
+            chunk_size (int): Grid points simulated together
+
+        Returns:
+            SweepResult: Statistics and equity curves per combination
+        """
+        grid = dict(grid)
+        frequencies = grid.pop('frequency', [frequency])
+        names = list(grid)
+        combinations = list(itertools.product(frequencies, *grid.values()))
+        prices = self.prices.to_numpy(dtype=np.float64)
+
+        tasks = []
+        for frequency in frequencies:
+            rows = rebalance_rows(self.prices.index, frequency)
+            points = [combination[1:] for combination in combinations if combination[0] == frequency]
+            for start in range(0, len(points), chunk_size):
+                chunk = points[start:start + chunk_size]
+                params = {name: np.array([point[column] for point in chunk]) for column, name in enumerate(names)}
+                tasks.append((signal, rows, params, self.cost_bps, self.initial_capital, self.bars_per_year))
+
+        if self.max_workers == 1 or len(tasks) == 1:
+            outputs = [_run_chunk(*task, prices=prices) for task in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(prices,)) as executor:
+                outputs = list(executor.map(_run_chunk, *zip(*tasks)))
+
+        equity = np.concatenate([chunk_equity for chunk_equity, _ in outputs])
+        stats = {name: np.concatenate([chunk_stats[name] for _, chunk_stats in outputs])
+                 for name in outputs[0][1]}
+        summary = pd.DataFrame(combinations, columns=['frequency', *names]).assign(**stats)
+        return SweepResult(summary, pd.DataFrame(equity.T, index=self.prices.index))
+
+    def run(self, strategy, holdings, frequency='M', cash=0.0):
+        """
+        Replay history through a strategy, trading the orders of every analysis
+
+        Args:
+            strategy (BaseStrategy): Analyzed on a holdings snapshot at every
+                                     rebalance; its orders method turns the
+                                     results into trades. Strategies with an
+                                     as_of date read history from these prices
+                                     up to each rebalance, so pass an instance
+                                     the dashboard isn't using.
+            holdings (pd.DataFrame): Starting book with Security, Sector and
+                                     Quantity, e.g. one portfolio's holdings
+                                     summary. Positions are bought at the first
+                                     close.
+            frequency (str): Rebalance frequency, see rebalance_rows
+            cash (float): Starting cash besides the positions
+
+        Returns:
+            BacktestResult: Equity per bar, fills at the rebalance closes
+                            (with costs) and summary statistics
+        """
+        book = holdings.groupby('Security', sort=True).agg({'Sector': 'first', 'Quantity': 'sum'})
+        book = book[book.index.isin(self.prices.columns)]
+        securities = book.index.to_numpy()
+        prices = self.prices[securities].ffill().to_numpy(dtype=np.float64)
+        index = self.prices.index
+        rows = rebalance_rows(index, frequency)
+
+        # Strategies that read price history only see the replayed closes up to each rebalance
+        point_in_time = hasattr(strategy, 'as_of')
+        if point_in_time:
+            from data.price_history import StaticHistoryProvider
+            saved = strategy.history_store, strategy.as_of
+            strategy.history_store = StaticHistoryProvider(self.prices.groupby(index.normalize()).last())
+        try:
+            return self._replay(strategy, book, prices, rows, cash, point_in_time)
+        finally:
+            if point_in_time:
+                strategy.history_store, strategy.as_of = saved
+
+    def _replay(self, strategy, book, prices, rows, cash, point_in_time):
+        index = self.prices.index
+        securities = book.index.to_numpy()
+        cost = self.cost_bps / 1e4
+        # Strategies that only measure, such as risk, are held without analyzing them
+        trades = type(strategy).orders is not BaseStrategy.orders
+        quantity = book['Quantity'].to_numpy(dtype=np.float64)
+        quantity[np.isnan(prices[0])] = 0  # Not listed yet
+        cost_basis = quantity * np.nan_to_num(prices[0])
+        equity = np.empty(len(index))
+        equity[:rows[0]] = cash + np.nan_to_num(prices[:rows[0]]) @ quantity
+        fills = []
+        for start, end in zip(rows, np.r_[rows[1:], len(index)]):
+            if not trades:
+                equity[start:end] = cash + np.nan_to_num(prices[start:end]) @ quantity
+                continue
+            price = prices[start]
+            held = (quantity > 0) & ~np.isnan(price)
+            snapshot = pd.DataFrame({
+                'Portfolio': 'Backtest',
+                'Security': securities[held],
+                'Sector': book['Sector'].to_numpy()[held],
+                'Quantity': quantity[held],
+                'Average_Cost': cost_basis[held] / quantity[held],
+                'Current_Price': price[held],
+                'Cost_Basis': cost_basis[held],
+                'Market_Value': quantity[held] * price[held]
+            })
+            snapshot['Gain_Loss'] = snapshot['Market_Value'] - snapshot['Cost_Basis']
+            snapshot['Return'] = (snapshot['Gain_Loss'] / snapshot['Cost_Basis'] * 100).round(2)
+
+            if point_in_time:
+                # An intraday bar only knows the previous day's close
+                strategy.as_of = index[start] if self.bars_per_year == TRADING_DAYS \
+                    else index[start].normalize() - pd.Timedelta(days=1)
+            orders = strategy.orders(snapshot, strategy.analyze(snapshot))
+            orders = orders.reindex(securities, fill_value=0).to_numpy(dtype=np.float64)
+            orders[np.isnan(price)] = 0
+            cash = self._fill(orders, price, quantity, cost_basis, cash, cost)
+            for position in np.flatnonzero(orders):
+                fills.append((index[start], securities[position], orders[position], price[position],
+                              abs(orders[position]) * price[position] * cost))
+
+            equity[start:end] = cash + np.nan_to_num(prices[start:end]) @ quantity
+
+        fills = pd.DataFrame(fills, columns=['Date', 'Security', 'Shares', 'Price', 'Cost'])
+        traded = (fills['Shares'].abs() * fills['Price']).groupby(fills['Date']).sum()
+        turnover = traded.reindex(index[rows], fill_value=0.0).to_numpy(dtype=np.float64) / equity[rows]
+        summary = {name: float(value) for name, value in summarize(equity, turnover, self.bars_per_year).items()}
+        return BacktestResult(pd.Series(equity, index=index, name='Equity'), fills, summary)
+
+    @staticmethod
+    def _fill(orders, price, quantity, cost_basis, cash, cost):
+        """
+        Execute orders at price in place, sells first, paying cost per unit traded
+
+        Sells are capped at the shares held. Buys are scaled down to whole
+        shares the cash can pay for.
+
+        Returns:
+            float: Cash after the fills
+        """
+        sells = np.minimum(np.maximum(-orders, 0), quantity)
+        # Sold shares leave the cost basis at the average cost
+        cost_basis -= np.divide(cost_basis * sells, quantity, out=np.zeros_like(cost_basis), where=quantity > 0)
+        quantity -= sells
+        cash += (sells * price).sum() * (1 - cost)
+
+        buys = np.maximum(orders, 0)
+        spend = (buys * price).sum() * (1 + cost)
+        if spend > cash:
+            buys = np.floor(buys * max(cash, 0) / spend)
+        quantity += buys
+        cost_basis += buys * price
+        cash -= (buys * price).sum() * (1 + cost)
+        orders[:] = buys - sells
+        return cash
@@ -1,6 +1,31 @@
 from abc import ABC, abstractmethod
+from collections.abc import Mapping
+import numpy as np
 import pandas as pd
 
+class StrategyResult(Mapping):
+    """
+    Strategy output whose display text is only built when it is read
+
+    Behaves like the dict returned by analyze: 'metrics' is available right
+    away, while 'summary' and 'recommendations' are formatted on first access.
+    """
+
+    def __init__(self, metrics, formatter):
+        self._values = {'metrics': metrics}
+        self._formatter = formatter
+
+    def __getitem__(self, key):
+        if key not in self._values and key in ('summary', 'recommendations'):
+            self._values['summary'], self._values['recommendations'] = self._formatter(self._values['metrics'])
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(('summary', 'recommendations', 'metrics'))
+
+    def __len__(self):
+        return 3
+
 class BaseStrategy(ABC):
     """Base class for all portfolio strategies"""
     
@@ -20,4 +45,52 @@ class BaseStrategy(ABC):
         Returns:
             dict: Analysis results including recommendations and metrics
         """
-        pass
\ No newline at end of file
+        pass
+    
+    def analyze_many(self, holdings, by='Portfolio'):
+        """
+        Analyze every group of holdings in one call
+
+        The default runs analyze once per group. Strategies override it with
+        grouped pandas/NumPy operations over the whole frame.
+
+        Args:
+            holdings (pd.DataFrame): Holdings for all groups
+            by (str or array-like): Column name, or group label per row
+
+        Returns:
+            dict: Group label mapped to that group's analysis results
+        """
+        return {group: self.analyze(group_data)
+                for group, group_data in holdings.groupby(self._group_keys(holdings, by), sort=True, observed=True)}
+
+    def orders(self, holdings_data, results):
+        """
+        Share orders that act on the recommendations of analyze
+
+        Used by the backtester to trade on every analysis. Strategies that
+        only measure, such as risk, place no orders.
+
+        Args:
+            holdings_data (pd.DataFrame): Holdings that were analyzed
+            results (dict): What analyze returned for them
+
+        Returns:
+            pd.Series: Signed number of shares per Security, negative to sell
+        """
+        return pd.Series(dtype=np.float64)
+
+    @staticmethod
+    def _group_keys(holdings, by):
+        """Resolve a column name or label array into a Series of group labels"""
+        if isinstance(by, str):
+            return holdings[by]
+        return pd.Series(by, index=holdings.index)
+
+    @staticmethod
+    def _records_by_group(frame, columns, group_column='_Group'):
+        """Split frame rows into per-group lists of record dicts in one pass"""
+        records = {}
+        for key, record in zip(frame[group_column], frame[columns].to_dict('records')):
+            records.setdefault(key, []).append(record)
+        return records
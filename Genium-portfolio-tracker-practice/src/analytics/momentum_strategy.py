@@ -1,39 +1,72 @@
-from .base_strategy import BaseStrategy
+from .base_strategy import BaseStrategy, StrategyResult
+import numpy as np
 import pandas as pd
 
 class MomentumStrategy(BaseStrategy):
     """Simple momentum strategy based on returns"""
     
-    def __init__(self):
+    def __init__(self, trim=0.5):
+        """
+        Args:
+            trim (float): Fraction of each underperformer sold by orders, with
+                          the proceeds spread over the top performers
+        """
         super().__init__(
             name="Momentum Strategy",
             description="Identifies top and bottom performers based on returns"
         )
+        self.trim = trim
     
     def analyze(self, holdings_data):
-        # Sort holdings by return
-        sorted_holdings = holdings_data.sort_values('Return', ascending=False)
+        return self.analyze_many(holdings_data, by=[0] * len(holdings_data)).get(0, self._empty_result())
+    
+    def analyze_many(self, holdings, by='Portfolio'):
+        keys = self._group_keys(holdings, by)
         
-        # Get top and bottom performers
-        top_performers = sorted_holdings.head(2)
-        bottom_performers = sorted_holdings.tail(2)
+        # Sort every group by return in one pass, then take each group's ends
+        sorted_holdings = holdings.assign(_Group=keys).sort_values(
+            ['_Group', 'Return'], ascending=[True, False], kind='stable')
+        grouped = sorted_holdings.groupby('_Group', sort=False, observed=True)
+        top_performers = self._records_by_group(grouped.head(2), ['Security', 'Return'])
+        bottom_performers = self._records_by_group(grouped.tail(2), ['Security', 'Return'])
         
         # Calculate average return
-        avg_return = holdings_data['Return'].mean()
+        avg_returns = holdings['Return'].groupby(keys, observed=True).mean()
         
         return {
-            'summary': f"Average portfolio return: {avg_return:.2f}%",
-            'recommendations': [
-                "Consider increasing positions in top performers:",
-                *[f"- {row['Security']} ({row['Return']:.2f}%)" 
-                  for _, row in top_performers.iterrows()],
-                "\nConsider reducing exposure to underperformers:",
-                *[f"- {row['Security']} ({row['Return']:.2f}%)" 
-                  for _, row in bottom_performers.iterrows()]
-            ],
-            'metrics': {
+            group: StrategyResult({
                 'avg_return': avg_return,
-                'top_performers': top_performers[['Security', 'Return']].to_dict('records'),
-                'bottom_performers': bottom_performers[['Security', 'Return']].to_dict('records')
-            }
-        }
\ No newline at end of file
+                'top_performers': top_performers.get(group, []),
+                'bottom_performers': bottom_performers.get(group, [])
+            }, self.format_results)
+            for group, avg_return in avg_returns.items()
+        }
+    
+    def orders(self, holdings_data, results):
+        metrics = results['metrics']
+        top = [row['Security'] for row in metrics['top_performers']]
+        # In books of three or fewer holdings a security can be on both lists
+        bottom = [row['Security'] for row in metrics['bottom_performers'] if row['Security'] not in top]
+        positions = holdings_data.set_index('Security')
+        sells = np.floor(positions.loc[bottom, 'Quantity'] * self.trim)
+        proceeds = (sells * positions.loc[bottom, 'Current_Price']).sum()
+        buys = np.floor(proceeds / len(top) / positions.loc[top, 'Current_Price']) if top else sells.iloc[:0]
+        return pd.concat([-sells, buys]).astype(np.float64)
+    
+    def _empty_result(self):
+        return StrategyResult({'avg_return': float('nan'), 'top_performers': [],
+                               'bottom_performers': []}, self.format_results)
+    
+    @staticmethod
+    def format_results(metrics):
+        """Format the summary and recommendation lines for display"""
+        summary = f"Average portfolio return: {metrics['avg_return']:.2f}%"
+        recommendations = [
+            "Consider increasing positions in top performers:",
+            *[f"- {row['Security']} ({row['Return']:.2f}%)"
+              for row in metrics['top_performers']],
+            "\nConsider reducing exposure to underperformers:",
+            *[f"- {row['Security']} ({row['Return']:.2f}%)"
+              for row in metrics['bottom_performers']]
+        ]
+        return summary, recommendations
@@ -0,0 +1,362 @@
+from collections import namedtuple
+
+import numpy as np
+
+OBJECTIVES = ('min_variance', 'risk_parity')
+
+# weights: target weight per security. sector_cap and max_turnover: the limits
+# actually applied, after any relaxation. state: pass back as warm_start on the
+# next solve over the same securities to continue from this solution.
+Solution = namedtuple('Solution', ['weights', 'iterations', 'converged', 'sector_cap', 'max_turnover', 'state'])
+
+
+def shrunk_covariance(factor, shrinkage=0.1):
+    """
+    Covariance from a factor F (F @ F.T the sample covariance), shrunk towards its diagonal
+
+    The sample covariance of more securities than days is singular, and
+    minimum variance would pile into the spurious zero-variance directions.
+    Shrinking keeps the matrix positive definite.
+    """
+    factor = np.asarray(factor, dtype=np.float64)
+    sample = factor @ factor.T
+    return (1 - shrinkage) * sample + shrinkage * np.diag(np.diag(sample))
+
+
+class PortfolioOptimizer:
+    """
+    Target weights by minimum variance or risk parity under position, sector and turnover limits
+
+    Minimum variance minimises w' C w. Risk parity first finds the weights
+    at which every security contributes equally to variance and then stays
+    as close to them as the limits allow, measured in w' C w terms, so both
+    objectives are the same quadratic program:
+
+        minimise (w - t)' C (w - t)
+        subject to  sum(w) = 1, lower <= w <= upper,
+                    sum of w per sector <= sector cap,
+                    sum(|w - current|) <= max turnover
+
+    Limits that can't all be met are relaxed in a fixed order: the sector
+    cap first, then the turnover limit (see _feasible_limits).
+
+    It is solved by ADMM with one copy of w per constraint set, each of
+    which has a cheap exact projection. C is eigendecomposed once, so every
+    iteration is two matrix-vector products and the step size can adapt
+    without refactoring. Passing the previous Solution.state as warm_start
+    resumes from that solution, which makes re-solving after small price
+    moves a handful of iterations.
+    """
+
+    def __init__(self, objective='min_variance', max_weight=0.1, sector_cap=0.3, max_turnover=0.25,
+                 tolerance=1e-6, max_iterations=2000):
+        """
+        Args:
+            objective (str): 'min_variance' or 'risk_parity'
+            max_weight (float): Largest weight of a single security
+            sector_cap (float): Largest combined weight of one sector, raised
+                                when the book has too few sectors to meet it
+                                or can't reach it within max_turnover
+            max_turnover (float): Largest sum of absolute weight changes, e.g.
+                                  0.25 moves at most an eighth of the book,
+                                  raised only when the position bounds alone
+                                  need more
+            tolerance (float): Largest constraint violation on convergence
+            max_iterations (int): ADMM iteration limit
+        """
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {objective}")
+        self.objective = objective
+        self.max_weight = max_weight
+        self.sector_cap = sector_cap
+        self.max_turnover = max_turnover
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+
+    def solve(self, covariance, current, sectors, lower=None, upper=None, warm_start=None):
+        """
+        Target weights for one portfolio
+
+        Args:
+            covariance (np.ndarray): Return covariance, one row and column per security
+            current (np.ndarray): Current weights, summing to 1
+            sectors (array-like): Sector of every security
+            lower (np.ndarray): Per-security lower bounds, 0 by default
+            upper (np.ndarray): Per-security upper bounds, max_weight by default.
+                                Setting lower == upper holds a security fixed.
+            warm_start (dict): Solution.state of an earlier solve over the same securities
+
+        Returns:
+            Solution: Target weights, the limits applied and solver
+                      diagnostics. converged is True only once the weights
+                      meet every constraint to within tolerance; otherwise
+                      they still sum to 1 and respect the position bounds,
+                      but may break the sector or turnover limits.
+        """
+        covariance = np.asarray(covariance, dtype=np.float64)
+        current = np.asarray(current, dtype=np.float64)
+        n = len(current)
+        lower = np.zeros(n) if lower is None else np.asarray(lower, dtype=np.float64)
+        upper = np.full(n, float(self.max_weight)) if upper is None else np.asarray(upper, dtype=np.float64)
+        if lower.sum() > 1 + 1e-9 or upper.sum() < 1 - 1e-9:
+            raise ValueError("Position bounds cannot sum to 1")
+        sector_codes, sector_names = self._codes(sectors)
+        sector_cap, sector_caps, max_turnover = self._feasible_limits(current, sector_codes, len(sector_names),
+                                                                      lower, upper)
+
+        # Work on a unit-scale matrix so one step size suits any book
+        scale = np.mean(np.diag(covariance))
+        covariance = covariance / scale if scale > 0 else np.eye(n)
+        state = dict(warm_start) if warm_start is not None and len(warm_start['x']) == n else {}
+        if 'covariance' in state and np.array_equal(state['covariance'], covariance):
+            # Only prices moved since the last solve, e.g. a live rebalance
+            eigenvalues, eigenvectors = state['eigenvalues'], state['eigenvectors']
+        else:
+            eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+            eigenvalues = np.clip(eigenvalues, 0, None)
+        target = np.zeros(n)
+        if self.objective == 'risk_parity':
+            target = self.risk_parity_weights(covariance, lower, upper, state.get('target'))
+        pull = 2 * (covariance @ target)
+
+        blocks = [
+            lambda v: self._project_box_simplex(v, lower, upper),
+            lambda v: self._project_sector_caps(v, sector_codes, sector_caps),
+            lambda v: self._project_turnover(v, current, max_turnover)
+        ]
+        x = state.get('x', current.copy())
+        z = state.get('z', np.tile(x, (len(blocks), 1)))
+        u = state.get('u', np.zeros((len(blocks), n)))
+        rho = state.get('rho', 1.0)
+
+        converged = False
+        iteration = 0
+        for iteration in range(1, self.max_iterations + 1):
+            # x minimises the objective plus the penalty towards every copy
+            rhs = pull + rho * (z - u).sum(axis=0)
+            x = eigenvectors @ ((eigenvectors.T @ rhs) / (2 * eigenvalues + len(blocks) * rho))
+            previous = z
+            z = np.stack([project(x + u[i]) for i, project in enumerate(blocks)])
+            u = u + x - z
+
+            # Residuals in L1, the norm the sector and turnover limits are measured in
+            primal = np.abs(x - z).sum(axis=1).max()
+            dual = rho * np.abs(z - previous).sum(axis=1).max()
+            # The copies agreeing isn't enough: check the returned weights against every limit
+            if (primal < self.tolerance and dual < self.tolerance
+                    and self._violation(z[0], current, sector_codes, sector_caps, max_turnover) < self.tolerance):
+                converged = True
+                break
+            if iteration % 25 == 0:
+                # Balance the residuals; u is scaled by 1 / rho, so rescale it too
+                if primal > 10 * dual:
+                    rho, u = rho * 2, u / 2
+                elif dual > 10 * primal:
+                    rho, u = rho / 2, u * 2
+
+        weights = z[0]
+        return Solution(weights, iteration, converged, sector_cap, max_turnover,
+                        {'x': x, 'z': z, 'u': u, 'rho': rho, 'target': target, 'covariance': covariance,
+                         'eigenvalues': eigenvalues, 'eigenvectors': eigenvectors})
+
+    @staticmethod
+    def risk_parity_weights(covariance, lower=None, upper=None, initial=None, max_iterations=100):
+        """
+        Weights at which every free security contributes equally to variance
+
+        Newton's method on the convex form min y'Cy / 2 - sum(log y), whose
+        minimiser normalised to sum 1 is the equal risk contribution
+        portfolio. Securities held fixed (lower == upper) keep their bound
+        and the rest share what remains.
+        """
+        n = len(covariance)
+        fixed = np.zeros(n, dtype=bool) if lower is None else np.isclose(lower, upper)
+        free = ~fixed & (np.diag(covariance) > 0)
+        weights = np.zeros(n)
+        if lower is not None:
+            weights[fixed] = lower[fixed]
+        budget = 1 - weights.sum()
+        if not free.any() or budget <= 0:
+            return weights
+
+        matrix = covariance[np.ix_(free, free)]
+        y = (initial[free] if initial is not None and np.all(initial[free] > 0)
+             else 1 / np.sqrt(np.diag(matrix)))
+        # Scale onto the solution's level set y'Cy = count, where Newton steps are well behaved
+        y = y * np.sqrt(len(y) / (y @ matrix @ y))
+
+        def loss(values):
+            return values @ matrix @ values / 2 - np.log(values).sum()
+
+        for _ in range(max_iterations):
+            gradient = matrix @ y - 1 / y
+            step = np.linalg.solve(matrix + np.diag(1 / y ** 2), gradient)
+            if gradient @ step < 1e-12 * len(y):  # Newton decrement: within rounding of the minimum
+                break
+            # Backtrack to stay positive and decrease the loss
+            size = 1.0
+            while np.any(y - size * step <= 0) or loss(y - size * step) > loss(y):
+                size /= 2
+                if size < 1e-12:
+                    break
+            y = y - size * step
+
+        weights[free] = budget * y / y.sum()
+        return weights
+
+    def _feasible_limits(self, current, codes, n_sectors, lower, upper):
+        """
+        Sector caps and turnover limit, relaxed in that order until they can all be met
+
+        The sector cap is raised to the lowest level at which the book can be
+        fully invested, e.g. three sectors at a 30% cap, and then further
+        until the caps can be reached from the current weights within
+        max_turnover. Only if the position bounds alone need more turnover
+        is the turnover limit raised to what they need. A sector's fixed
+        weight (its lower bounds) is always allowed.
+
+        Returns:
+            tuple: (sector cap, cap per sector, turnover limit)
+        """
+        floors = np.bincount(codes, weights=lower, minlength=n_sectors)
+        ceilings = np.bincount(codes, weights=upper, minlength=n_sectors)
+
+        def investable(cap):
+            return np.clip(np.maximum(cap, floors), None, ceilings).sum() >= 1
+
+        def reachable(cap):
+            needed = self._required_turnover(current, codes, np.maximum(cap, floors), lower, upper)
+            return needed <= self.max_turnover
+
+        cap = float(self.sector_cap)
+        for feasible in (investable, reachable):
+            if feasible(cap):
+                continue
+            low, high = cap, 1.0
+            for _ in range(50):
+                middle = (low + high) / 2
+                if feasible(middle):
+                    high = middle
+                else:
+                    low = middle
+            cap = high
+        caps = np.maximum(cap, floors)
+        return cap, caps, max(self.max_turnover, self._required_turnover(current, codes, caps, lower, upper))
+
+    @staticmethod
+    def _required_turnover(current, codes, caps, lower, upper):
+        """
+        Least turnover that brings the current weights within the position bounds and sector caps
+
+        Weight above an upper bound or a sector cap has to be sold and weight
+        below a lower bound bought. Every sale funds a purchase, so the
+        turnover is twice the larger of the two.
+        """
+        within_bounds = np.clip(current, lower, upper)
+        over_caps = np.maximum(np.bincount(codes, weights=within_bounds, minlength=len(caps)) - caps, 0).sum()
+        sold = np.maximum(current - upper, 0).sum() + over_caps
+        bought = np.maximum(lower - current, 0).sum()
+        return 2 * max(sold, bought)
+
+    @staticmethod
+    def _violation(weights, current, codes, caps, max_turnover):
+        """Largest breach of the sector caps or the turnover limit"""
+        over_caps = (np.bincount(codes, weights=weights, minlength=len(caps)) - caps).max()
+        over_turnover = np.abs(weights - current).sum() - max_turnover
+        return max(over_caps, over_turnover, 0.0)
+
+    @staticmethod
+    def _codes(labels):
+        names, codes = np.unique(np.asarray(labels).astype(str), return_inverse=True)
+        return codes, names
+
+    @staticmethod
+    def _project_box_simplex(values, lower, upper):
+        """
+        Closest point with weights in [lower, upper] summing to 1
+
+        The projection is clip(values - shift, lower, upper) for the shift at
+        which it sums to 1. That sum is piecewise linear in the shift, with
+        breakpoints where a weight reaches a bound, so it is evaluated at
+        every breakpoint from prefix sums and interpolated exactly.
+        """
+        leave_upper = values - upper  # Above this shift a weight drops off its upper bound
+        reach_lower = values - lower  # and from this shift on it sits at its lower bound
+        upper_order, lower_order = np.argsort(leave_upper), np.argsort(reach_lower)
+        leave_sorted, reach_sorted = leave_upper[upper_order], reach_lower[lower_order]
+        upper_sums = np.concatenate([[0], np.cumsum(upper[upper_order])])
+        free_value_sums = np.concatenate([[0], np.cumsum(values[upper_order])])
+        lower_sums = np.concatenate([[0], np.cumsum(lower[lower_order])])
+        lower_value_sums = np.concatenate([[0], np.cumsum(values[lower_order])])
+
+        def total(shift):
+            off_upper = np.searchsorted(leave_sorted, shift, side='right')
+            at_lower = np.searchsorted(reach_sorted, shift, side='right')
+            free = off_upper - at_lower
+            return (upper_sums[-1] - upper_sums[off_upper] + lower_sums[at_lower]
+                    + free_value_sums[off_upper] - lower_value_sums[at_lower] - free * shift)
+
+        breakpoints = np.concatenate([leave_sorted, reach_sorted])
+        breakpoints.sort()
+        totals = total(breakpoints)  # Decreasing in the shift
+        index = np.searchsorted(-totals, -1.0)
+        if index == 0 or index == len(breakpoints):
+            shift = breakpoints[min(index, len(breakpoints) - 1)]
+        else:
+            left, right = breakpoints[index - 1], breakpoints[index]
+            fraction = (totals[index - 1] - 1) / (totals[index - 1] - totals[index])
+            shift = left + fraction * (right - left) if totals[index - 1] != totals[index] else left
+        return np.clip(values - shift, lower, upper)
+
+    @staticmethod
+    def _project_sector_caps(values, codes, caps):
+        """Closest point within the sector caps: over-cap sectors shift every member down equally"""
+        excess = np.bincount(codes, weights=values, minlength=len(caps)) - caps
+        counts = np.bincount(codes, minlength=len(caps))
+        shift = np.where(excess > 0, excess / np.maximum(counts, 1), 0.0)
+        return values - shift[codes]
+
+    @staticmethod
+    def _project_turnover(values, current, max_turnover):
+        """Closest point within max_turnover of current in L1, by soft thresholding the changes"""
+        change = values - current
+        magnitude = np.abs(change)
+        if magnitude.sum() <= max_turnover:
+            return values
+        # Threshold at which the shrunk changes sum to max_turnover
+        ordered = np.sort(magnitude)[::-1]
+        thresholds = (np.cumsum(ordered) - max_turnover) / np.arange(1, len(ordered) + 1)
+        threshold = thresholds[np.nonzero(ordered > thresholds)[0][-1]]
+        return current + np.sign(change) * np.maximum(magnitude - threshold, 0)
+
+
+def round_to_shares(weights, quantities, prices, total_value):
+    """
+    Whole-share trades that move current quantities towards target weights
+
+    Each trade is rounded towards zero, so no security trades past its
+    target. If that leaves the trades needing more cash than they raise,
+    sells with the largest remainders are rounded up; leftover cash then
+    buys single shares for the buys with the largest remainders.
+
+    Returns:
+        tuple: (np.ndarray of signed share trades, leftover cash)
+    """
+    exact = weights * total_value / prices - quantities
+    trades = np.trunc(exact)
+    remainders = np.abs(exact - trades)
+    cash = -(trades * prices).sum()
+
+    if cash < 0:
+        sells = np.nonzero((exact < 0) & (remainders > 0))[0]
+        sells = sells[np.argsort(-remainders[sells], kind='stable')]
+        needed = np.searchsorted(np.cumsum(prices[sells]), -cash) + 1
+        trades[sells[:needed]] -= 1
+        cash += prices[sells[:needed]].sum()
+
+    buys = np.nonzero((exact > 0) & (remainders > 0))[0]
+    buys = buys[np.argsort(-remainders[buys], kind='stable')]
+    affordable = int(np.searchsorted(np.cumsum(prices[buys]), cash, side='right'))
+    trades[buys[:affordable]] += 1
+    cash -= prices[buys[:affordable]].sum()
+    return trades.astype(np.int64), float(cash)
@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+class PerformanceResult:
+    """Daily portfolio time series from PerformanceEngine, one column per portfolio"""
+
+    def __init__(self, nav, flows, returns, missing_history=()):
+        self.nav = nav
+        self.flows = flows
+        self.returns = returns
+        self.missing_history = list(missing_history)  # Tickers left out for lack of any close
+
+    @property
+    def cumulative_returns(self):
+        """Time-weighted return since inception"""
+        return (1 + self.returns).cumprod() - 1
+
+    @property
+    def drawdowns(self):
+        """Fall of the time-weighted wealth index from its running peak"""
+        wealth = (1 + self.returns).cumprod()
+        return wealth / wealth.cummax() - 1
+
+    def volatility(self, window=None):
+        """Annualized volatility of daily returns, rolling over window days if given"""
+        returns = self.returns.where(self.nav.shift() > 0)
+        if window:
+            return returns.rolling(window).std() * np.sqrt(TRADING_DAYS)
+        return returns.std() * np.sqrt(TRADING_DAYS)
+
+    def summary(self):
+        """
+        Headline statistics per portfolio
+
+        Returns:
+            pd.DataFrame: One row per portfolio with nav, invested, twr,
+                          annualized_return, volatility and max_drawdown
+        """
+        invested = self.nav.gt(0)
+        days = invested.sum()
+        twr = self.cumulative_returns.iloc[-1]
+        return pd.DataFrame({
+            'nav': self.nav.iloc[-1],
+            'invested': self.flows.sum(),
+            'twr': twr,
+            'annualized_return': (1 + twr) ** (TRADING_DAYS / days.clip(lower=1)) - 1,
+            'volatility': self.volatility(),
+            'max_drawdown': self.drawdowns.min()
+        })
+
+
+class PerformanceEngine:
+    """
+    Vectorized NAV and time-weighted returns from purchase lots and daily closes
+
+    Lots are netted into one column per (portfolio, security) pair. Share
+    purchases are scattered onto their purchase dates and cumulatively summed
+    down the date axis, giving the position held on every day without a
+    per-day loop. Values are then reduced to one column per portfolio.
+    Tickers without a single close are left out and listed in
+    missing_history: they would otherwise enter at cost and be valued at
+    0, a spurious -100% return.
+    """
+
+    def __init__(self, history_store=None):
+        self.history_store = history_store
+
+    def compute(self, holdings, start=None, end=None, prices=None):
+        """
+        Compute daily NAV and returns for every portfolio in holdings
+
+        Args:
+            holdings (pd.DataFrame): Lots with Portfolio, Security, Purchase_Date,
+                                     Quantity and Purchase_Price
+            start: First date, the earliest purchase by default
+            end: Last date, today by default
+            prices (pd.DataFrame): Daily closes by date and ticker. Fetched from
+                                   the history store if not given.
+
+        Returns:
+            PerformanceResult: nav, flows and returns frames indexed by date,
+                               and the tickers left out for lack of history
+        """
+        purchase_dates = pd.to_datetime(holdings['Purchase_Date'])
+        if prices is None:
+            tickers = list(pd.unique(holdings['Security']))
+            prices = self.history_store.get_history(tickers, start or purchase_dates.min(), end)
+        elif start is not None or end is not None:
+            prices = prices.loc[start:end]
+
+        # Every portfolio keeps its column, even if none of its tickers can be valued
+        portfolios = pd.Index(np.sort(pd.unique(holdings['Portfolio'].astype(str))))
+        securities = holdings['Security'].astype(str)
+        priced = prices.columns[prices.notna().any().to_numpy()].astype(str)
+        has_history = securities.isin(priced).to_numpy()
+        missing = sorted(set(securities[~has_history]))
+        holdings, purchase_dates = holdings[has_history], purchase_dates[has_history]
+
+        dates = prices.index
+        n_dates = len(dates)
+        # Lots bought on a weekend or holiday start counting on the next trading day
+        date_rows = dates.searchsorted(purchase_dates.to_numpy())
+
+        portfolio_codes = portfolios.get_indexer(holdings['Portfolio'].astype(str))
+        ticker_codes, tickers = pd.factorize(holdings['Security'], sort=True)
+        n_portfolios, n_tickers = len(portfolios), len(tickers)
+        # Pairs sort by portfolio first, so each portfolio's pairs are one contiguous block
+        pair_keys, pair_codes = np.unique(portfolio_codes * n_tickers + ticker_codes, return_inverse=True)
+        pair_tickers = pair_keys % n_tickers
+        portfolio_starts = np.searchsorted(pair_keys // n_tickers, np.arange(n_portfolios))
+        held = np.diff(np.append(portfolio_starts, len(pair_keys))) > 0
+
+        # Before a ticker's first close its value is carried at the first close we have
+        ticker_prices = prices.reindex(columns=tickers).bfill().fillna(0.0).to_numpy(dtype=np.float64)
+
+        quantity = holdings['Quantity'].to_numpy(dtype=np.float64)
+        # Shares bought per (date, pair); purchases after the last date land in an extra row
+        share_flows = np.bincount(date_rows * len(pair_keys) + pair_codes, weights=quantity,
+                                  minlength=(n_dates + 1) * len(pair_keys)).reshape(n_dates + 1, len(pair_keys))
+        # Running totals and values are computed in place: the matrix is dates x pairs
+        positions = np.cumsum(share_flows[:-1], axis=0, out=share_flows[:-1])
+        positions *= ticker_prices[:, pair_tickers]
+        nav = np.zeros((n_dates, n_portfolios))
+        if held.any():
+            # reduceat needs a pair in every block, so portfolios holding nothing stay at 0
+            nav[:, held] = np.add.reduceat(positions, portfolio_starts[held], axis=1)
+
+        # Lots bought before the first date enter at that day's close rather than their cost
+        cost = quantity * holdings['Purchase_Price'].to_numpy(dtype=np.float64)
+        if n_dates:
+            held_before = (purchase_dates < dates[0]).to_numpy()
+            cost[held_before] = quantity[held_before] * ticker_prices[0, ticker_codes[held_before]]
+        flows = np.bincount(date_rows * n_portfolios + portfolio_codes, weights=cost,
+                            minlength=(n_dates + 1) * n_portfolios).reshape(n_dates + 1, n_portfolios)[:-1]
+
+        # New money arrives at the start of the day it is invested
+        previous = np.vstack([np.zeros((1, n_portfolios)), nav[:-1]])
+        base = previous + flows
+        returns = np.divide(nav, base, out=np.ones_like(nav), where=base > 0) - 1
+
+        columns = pd.Index(np.asarray(portfolios), name='Portfolio')
+        return PerformanceResult(pd.DataFrame(nav, index=dates, columns=columns),
+                                 pd.DataFrame(flows, index=dates, columns=columns),
+                                 pd.DataFrame(returns, index=dates, columns=columns), missing)
@@ -1,49 +1,219 @@
-from .base_strategy import BaseStrategy
+import os
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 
+from .base_strategy import BaseStrategy, StrategyResult
+from .optimizer import PortfolioOptimizer, round_to_shares, shrunk_covariance
+from .risk import MonteCarloRiskEngine
+
+OBJECTIVE_NAMES = {
+    'min_variance': 'Minimum variance',
+    'risk_parity': 'Risk parity',
+    'equal_weight': 'Equal weight'
+}
+
 class RebalancingStrategy(BaseStrategy):
-    """Simple equal-weight rebalancing strategy"""
-    
-    def __init__(self):
+    """Whole-share trades towards minimum variance or risk parity weights within position, sector and turnover limits"""
+
+    def __init__(self, optimizer=None, history_store=None, lookback_days=504, shrinkage=0.1, max_warm_starts=64):
+        """
+        Args:
+            optimizer (PortfolioOptimizer): Objective and limits, read from
+                                            REBALANCE_OBJECTIVE, REBALANCE_MAX_WEIGHT,
+                                            REBALANCE_SECTOR_CAP and
+                                            REBALANCE_MAX_TURNOVER by default
+            history_store (PriceHistoryStore): Source of daily closes, a store
+                                               at PRICE_HISTORY_PATH by default
+            lookback_days (int): Business days of history the covariance is estimated from
+            shrinkage (float): Weight of the diagonal in the shrunk covariance
+            max_warm_starts (int): Solutions kept to warm-start the next solve of the same book
+        """
         super().__init__(
             name="Rebalancing Strategy",
-            description="Suggests portfolio rebalancing to maintain equal weights"
+            description="Suggests share trades towards minimum variance or risk parity weights "
+                        "within position, sector and turnover limits"
+        )
+        self.optimizer = optimizer or PortfolioOptimizer(
+            objective=os.environ.get('REBALANCE_OBJECTIVE', 'min_variance'),
+            max_weight=float(os.environ.get('REBALANCE_MAX_WEIGHT', 0.1)),
+            sector_cap=float(os.environ.get('REBALANCE_SECTOR_CAP', 0.3)),
+            max_turnover=float(os.environ.get('REBALANCE_MAX_TURNOVER', 0.25))
         )
-    
+        self.history_store = history_store
+        self.as_of = None  # Date analyses are run for, today by default; the backtester steps it through history
+        self.lookback_days = lookback_days
+        self.shrinkage = shrinkage
+        self.max_warm_starts = max_warm_starts
+        self._estimate = None  # (securities, end date, factor) of the last history fetch
+        self._warm_starts = OrderedDict()  # Securities of a book -> last Solution.state
+
     def analyze(self, holdings_data):
+        return self.analyze_many(holdings_data, by=[0] * len(holdings_data)).get(0, self._empty_result())
+
+    def analyze_many(self, holdings, by='Portfolio'):
+        keys = self._group_keys(holdings, by)
+        if holdings.empty:
+            return {}
+
+        frame = pd.DataFrame({
+            '_Group': keys.to_numpy(),
+            'Security': holdings['Security'].astype(str).to_numpy(),
+            'Sector': holdings['Sector'].astype(str).to_numpy(),
+            'Quantity': holdings['Quantity'].to_numpy(dtype=np.float64),
+            'Current_Price': holdings['Current_Price'].to_numpy(dtype=np.float64),
+            'Market_Value': holdings['Market_Value'].to_numpy(dtype=np.float64)
+        })
+        # One row per security within each group
+        frame = frame.groupby(['_Group', 'Security'], sort=True, observed=True).agg(
+            {'Sector': 'first', 'Quantity': 'sum', 'Current_Price': 'last', 'Market_Value': 'sum'}).reset_index()
+        factor = self._get_factor(frame['Security'].unique().tolist())
+
+        return {group: self._rebalance(group_frame.reset_index(drop=True), factor)
+                for group, group_frame in frame.groupby('_Group', sort=True)}
+
+    def _rebalance(self, book, factor):
+        """Optimize one book and turn its target weights into share trades"""
+        priced = book['Current_Price'].notna() & (book['Current_Price'] > 0)
+        unpriced = book.loc[~priced, 'Security'].tolist()
+        book = book[priced].reset_index(drop=True)
+        total_value = book['Market_Value'].sum()
+        if book.empty or total_value <= 0:
+            return self._empty_result(unpriced)
+
+        securities = book['Security'].tolist()
+        current = book['Market_Value'].to_numpy() / total_value
+        has_history = book['Security'].isin(factor.index).to_numpy()
+        objective = self.optimizer.objective
+        if has_history.any():
+            covariance = np.zeros((len(book), len(book)))
+            covariance[np.ix_(has_history, has_history)] = shrunk_covariance(
+                factor.loc[book.loc[has_history, 'Security']], self.shrinkage)
+            missing = [security for security, known in zip(securities, has_history) if not known]
+        else:
+            # Without any history every security looks alike, which targets equal weights.
+            # Volatility is unknown and not reported.
+            covariance = np.eye(len(book))
+            has_history[:] = True
+            objective = 'equal_weight'
+            missing = securities
+
+        # Securities without history can't be optimized and keep their current weight
+        fixed = current.sum(where=~has_history)
+        max_weight = max(self.optimizer.max_weight, (1 - fixed) / has_history.sum())
+        lower = np.where(has_history, 0.0, current)
+        upper = np.where(has_history, max_weight, current)
+
+        key = tuple(securities)
+        solution = self.optimizer.solve(covariance, current, book['Sector'], lower, upper,
+                                        warm_start=self._warm_starts.get(key))
+        self._warm_starts[key] = solution.state
+        self._warm_starts.move_to_end(key)
+        while len(self._warm_starts) > self.max_warm_starts:
+            self._warm_starts.popitem(last=False)
+
+        weights = solution.weights
+        prices = book['Current_Price'].to_numpy()
+        shares, cash = round_to_shares(weights, book['Quantity'].to_numpy(), prices, total_value)
+        if not solution.converged:
+            # Weights that may break the limits are never published as trades
+            weights, shares, cash = current, np.zeros(len(book), dtype=np.int64), 0.0
+        trades = pd.DataFrame({
+            'Security': book['Security'],
+            'Shares': shares,
+            'Price': prices,
+            'Value': shares * prices,
+            'Current_Weight': (current * 100).round(2),
+            'Target_Weight': (weights * 100).round(2)
+        })
+        trades = trades[trades['Shares'] != 0]
+        trades = trades.iloc[np.argsort(-trades['Value'].abs().to_numpy(), kind='stable')]
+
+        known_risk = objective != 'equal_weight'
+        return StrategyResult({
+            'objective': objective,
+            'current_volatility': self._volatility(current, covariance) if known_risk else float('nan'),
+            'target_volatility': self._volatility(weights, covariance) if known_risk else float('nan'),
+            'turnover': float(np.abs(weights - current).sum() * 100),
+            'converged': solution.converged,
+            'sector_cap': solution.sector_cap * 100,
+            'max_turnover': solution.max_turnover * 100,
+            'trades': trades.to_dict('records'),
+            'cash': cash,
+            'missing_history': missing if known_risk else [],
+            'unpriced': unpriced
+        }, self.format_results)
+
+    def orders(self, holdings_data, results):
+        trades = results['metrics']['trades']
+        return pd.Series([row['Shares'] for row in trades], index=[row['Security'] for row in trades],
+                         dtype=np.float64)
+
+    def _get_factor(self, securities):
+        """Covariance factor of daily returns, fetched once per day and set of securities"""
+        end = pd.Timestamp(self.as_of or pd.Timestamp.today()).normalize()
+        if self._estimate is not None and self._estimate[1] == end and set(securities) <= self._estimate[0]:
+            return self._estimate[2]
+
+        history = self._get_history_store().get_history(securities, end - pd.offsets.BDay(self.lookback_days), end)
+        # Securities need enough history for a meaningful covariance estimate
+        history = history.loc[:, history.notna().sum() > 20]
+        factor = MonteCarloRiskEngine.estimate(history)[1] if not history.empty else pd.DataFrame()
+        self._estimate = (set(securities), end, factor)
+        return factor
+
+    def _get_history_store(self):
+        if self.history_store is None:
+            from data.price_history import PriceHistoryStore
+            self.history_store = PriceHistoryStore(os.environ.get('PRICE_HISTORY_PATH', 'price_history.parquet'))
+        return self.history_store
+
+    @staticmethod
+    def _volatility(weights, covariance):
+        """Annualized volatility in percent"""
+        return float(np.sqrt(max(weights @ covariance @ weights, 0) * 252) * 100)
+
+    def _empty_result(self, unpriced=()):
+        return StrategyResult({
+            'objective': self.optimizer.objective, 'current_volatility': float('nan'),
+            'target_volatility': float('nan'), 'turnover': 0.0, 'converged': True,
+            'sector_cap': self.optimizer.sector_cap * 100, 'max_turnover': self.optimizer.max_turnover * 100,
+            'trades': [],
+            'cash': 0.0, 'missing_history': [], 'unpriced': list(unpriced)
+        }, self.format_results)
 
-        # Make copy to remove warning
-        holdings_data = holdings_data.copy()
-
-        print(holdings_data)
-
-        # Calculate current weights
-        total_value = holdings_data['Market_Value'].sum()
-        holdings_data['Current_Weight'] = (holdings_data['Market_Value'] / total_value * 100).round(2)
-        
-        # Calculate target weight (equal-weight)
-        target_weight = round(100 / len(holdings_data), 2)
-        
-        # Calculate weight difference
-        holdings_data['Weight_Diff'] = holdings_data['Current_Weight'] - target_weight
-        
-        # Sort by absolute weight difference
-        rebalance_needs = holdings_data.sort_values('Weight_Diff', key=abs, ascending=False)
-        
-        # Get positions needing significant rebalancing (>2% difference)
-        significant_diff = rebalance_needs[abs(rebalance_needs['Weight_Diff']) > 2]
-        
-        return {
-            'summary': f"Target weight per position: {target_weight:.2f}%",
-            'recommendations': [
-                "Positions requiring rebalancing:",
-                *[f"- {row['Security']}: {row['Current_Weight']:.2f}% "
-                  f"({'increase' if row['Weight_Diff'] < 0 else 'decrease'} "
-                  f"by {abs(row['Weight_Diff']):.2f}%)"
-                  for _, row in significant_diff.iterrows()]
-            ],
-            'metrics': {
-                'target_weight': target_weight,
-                'rebalance_needs': significant_diff[['Security', 'Current_Weight', 'Weight_Diff']].to_dict('records')
-            }
-        }
\ No newline at end of file
+    def format_results(self, metrics):
+        """Format the summary and recommendation lines for display"""
+        if not metrics['converged']:
+            return (f"{OBJECTIVE_NAMES[metrics['objective']]} target: no trades suggested",
+                    ["The optimizer could not meet the position, sector and turnover limits "
+                     "to within tolerance, so no trades are suggested. Try a looser sector cap "
+                     "(REBALANCE_SECTOR_CAP) or turnover limit (REBALANCE_MAX_TURNOVER)."])
+        if np.isnan(metrics['target_volatility']):
+            summary = f"{OBJECTIVE_NAMES[metrics['objective']]} target: turnover {metrics['turnover']:.2f}%"
+        else:
+            summary = (f"{OBJECTIVE_NAMES[metrics['objective']]} target: "
+                       f"volatility {metrics['target_volatility']:.2f}% "
+                       f"(currently {metrics['current_volatility']:.2f}%), turnover {metrics['turnover']:.2f}%")
+        recommendations = [
+            "Trades:",
+            *[f"- {'Buy' if row['Shares'] > 0 else 'Sell'} {abs(row['Shares']):,} {row['Security']} "
+              f"at ${row['Price']:,.2f} (${abs(row['Value']):,.2f}): "
+              f"{row['Current_Weight']:.2f}% to {row['Target_Weight']:.2f}%"
+              for row in metrics['trades']],
+            f"\nCash left after rounding to whole shares: ${metrics['cash']:,.2f}"
+        ]
+        # Limits that couldn't be met were relaxed, sector cap first
+        if metrics['sector_cap'] > self.optimizer.sector_cap * 100 + 1e-9:
+            recommendations.append(f"\nSector cap raised from {self.optimizer.sector_cap * 100:.2f}% to "
+                                   f"{metrics['sector_cap']:.2f}%, the lowest the book can be fully invested "
+                                   f"at and reach within the turnover limit")
+        if metrics['max_turnover'] > self.optimizer.max_turnover * 100 + 1e-9:
+            recommendations.append(f"\nTurnover limit raised from {self.optimizer.max_turnover * 100:.2f}% to "
+                                   f"{metrics['max_turnover']:.2f}%, the least the position limits need")
+        if metrics['missing_history']:
+            recommendations.append(f"\nHeld at current weight, no price history: {', '.join(metrics['missing_history'])}")
+        if metrics['unpriced']:
+            recommendations.append(f"\nNo current price for: {', '.join(metrics['unpriced'])}")
+        return summary, recommendations
@@ -0,0 +1,119 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class MonteCarloRiskEngine:
+    """
+    Value at risk and expected shortfall from simulated correlated returns
+
+    Daily log returns are modelled as multivariate normal with the sample
+    mean and covariance of the history, scaled to the horizon. Paths are
+    simulated chunk_size at a time: each chunk draws standard normals,
+    correlates them through a factor of the covariance matrix and revalues
+    every group's exposures with one matrix product. With more securities
+    than days of history the factor is the demeaned returns themselves, so
+    a path costs O(days x securities) rather than O(securities^2). Only
+    the worst losses needed for the lowest confidence level are kept
+    between chunks, so memory is bounded by chunk_size and the tail, not
+    by n_paths. Results are reproducible for a given seed and chunk_size.
+    """
+
+    def __init__(self, n_paths=100000, horizon=1, confidence=(0.95, 0.99), chunk_size=10000, seed=0,
+                 dtype=np.float32):
+        """
+        Args:
+            n_paths (int): Number of simulated paths
+            horizon (int): Holding period in trading days
+            confidence (tuple): Confidence levels to report, e.g. 0.99 for 99% VaR
+            chunk_size (int): Paths simulated per batch
+            seed (int): Random seed
+            dtype: Precision of the simulated returns. float32 halves memory
+                   and time per path and is ample for tail quantiles.
+        """
+        self.n_paths = n_paths
+        self.horizon = horizon
+        self.confidence = tuple(sorted(confidence))
+        self.chunk_size = chunk_size
+        self.seed = seed
+        self.dtype = dtype
+
+    @staticmethod
+    def estimate(history):
+        """
+        Mean and covariance factor of daily log returns
+
+        Args:
+            history (pd.DataFrame): Daily closes, one column per security
+
+        Returns:
+            tuple: (pd.Series of mean returns, pd.DataFrame factor F with one
+                    row per security and F @ F.T the covariance matrix)
+        """
+        returns = np.log(history).diff().iloc[1:]
+        mean = returns.mean()
+        # Days a security wasn't trading count as average days
+        deviations = (returns - mean).fillna(0.0).to_numpy()
+        n_days, n_securities = deviations.shape
+        if n_days - 1 < n_securities:
+            factor = deviations.T / np.sqrt(max(n_days - 1, 1))
+        else:
+            factor = MonteCarloRiskEngine._cholesky(deviations.T @ deviations / (n_days - 1))
+        return mean, pd.DataFrame(factor, index=returns.columns)
+
+    def run(self, exposures, mean, factor):
+        """
+        Simulate the P&L of every group and measure its loss tail
+
+        Args:
+            exposures (pd.DataFrame): Market value held per group (rows) and
+                                      security (columns), e.g. one row per
+                                      portfolio and one per sector
+            mean (pd.Series): Daily mean log return per security
+            factor (pd.DataFrame): Covariance factor from estimate
+
+        Returns:
+            pd.DataFrame: One row per group with its market value, and VaR and
+                          expected shortfall as positive losses in currency,
+                          in columns var_95, es_95, var_99, es_99 etc.
+        """
+        securities = list(exposures.columns)
+        drift = mean.reindex(securities).to_numpy(dtype=np.float64) * self.horizon
+        drift = drift.astype(self.dtype)
+        factor = (factor.reindex(securities).to_numpy(dtype=np.float64) * np.sqrt(self.horizon)).astype(self.dtype)
+        values = exposures.to_numpy(dtype=np.float64).T  # securities x groups
+        simulated_values = values.astype(self.dtype)
+
+        tail_size = max(1, math.ceil(self.n_paths * (1 - self.confidence[0])))
+        tail = np.full((0, values.shape[1]), -np.inf)
+        rng = np.random.default_rng(self.seed)
+        for start in range(0, self.n_paths, self.chunk_size):
+            size = min(self.chunk_size, self.n_paths - start)
+            shocks = rng.standard_normal((size, factor.shape[1]), dtype=self.dtype)
+            returns = np.expm1(shocks @ factor.T + drift)
+            losses = -(returns @ simulated_values).astype(np.float64)
+            # Keep the worst tail_size losses per group seen so far
+            losses = np.vstack([tail, losses])
+            if len(losses) > tail_size:
+                losses = np.partition(losses, len(losses) - tail_size, axis=0)[-tail_size:]
+            tail = losses
+
+        tail = -np.sort(-tail, axis=0)  # Worst loss first
+        result = pd.DataFrame({'market_value': values.sum(axis=0)}, index=exposures.index)
+        for level in self.confidence:
+            count = max(1, math.ceil(self.n_paths * (1 - level)))
+            label = f"{level * 100:g}".replace('.', '_')
+            result[f"var_{label}"] = tail[count - 1]
+            result[f"es_{label}"] = tail[:count].mean(axis=0)
+        return result
+
+    @staticmethod
+    def _cholesky(covariance):
+        """Matrix F with F @ F.T == covariance, tolerating singular estimates"""
+        try:
+            return np.linalg.cholesky(covariance)
+        except np.linalg.LinAlgError:
+            # Perfectly correlated securities
+            eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+            return eigenvectors * np.sqrt(np.clip(eigenvalues, 0, None))
@@ -0,0 +1,142 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .base_strategy import BaseStrategy, StrategyResult
+from .risk import MonteCarloRiskEngine
+
+class MonteCarloRiskStrategy(BaseStrategy):
+    """Value at risk and expected shortfall per portfolio and sector by Monte Carlo simulation"""
+
+    def __init__(self, history_store=None, lookback_days=504, engine=None):
+        """
+        Args:
+            history_store (PriceHistoryStore): Source of daily closes, a store
+                                               at PRICE_HISTORY_PATH by default.
+                                               Anything with get_history(tickers,
+                                               start, end) works.
+            lookback_days (int): Business days of history the covariance is estimated from
+            engine (MonteCarloRiskEngine): Simulation settings, 100k one-day paths by default
+        """
+        super().__init__(
+            name="Monte Carlo Risk",
+            description="Simulates correlated returns to estimate value at risk and expected shortfall"
+        )
+        self.history_store = history_store
+        self.as_of = None  # Date analyses are run for, today by default; the backtester steps it through history
+        self.lookback_days = lookback_days
+        self.engine = engine or MonteCarloRiskEngine()
+
+    def analyze(self, holdings_data):
+        return self.analyze_many(holdings_data, by=[0] * len(holdings_data)).get(0, self._empty_result())
+
+    def analyze_many(self, holdings, by='Portfolio'):
+        keys = self._group_keys(holdings, by)
+        if holdings.empty:
+            return {}
+
+        securities = list(dict.fromkeys(holdings['Security'].astype(str)))
+        end = pd.Timestamp(self.as_of or pd.Timestamp.today()).normalize()
+        history = self._get_history_store().get_history(securities, end - pd.offsets.BDay(self.lookback_days), end)
+        # Securities need enough history for a meaningful covariance estimate
+        history = history.loc[:, history.notna().sum() > 20]
+        priced = [security for security in securities if security in history.columns]
+        missing = [security for security in securities if security not in history.columns]
+
+        frame = pd.DataFrame({
+            '_Group': keys.to_numpy(),
+            'Sector': holdings['Sector'].astype(str).to_numpy(),
+            'Security': holdings['Security'].astype(str).to_numpy(),
+            'Market_Value': holdings['Market_Value'].to_numpy(dtype=np.float64)
+        })
+        frame = frame[frame['Security'].isin(priced)]
+        groups = sorted(keys.unique())
+        if frame.empty:
+            return {group: self._empty_result(missing) for group in groups}
+
+        # One exposure row per group total and per (group, sector), simulated on shared paths
+        totals = frame.pivot_table(index='_Group', columns='Security', values='Market_Value',
+                                   aggfunc='sum', fill_value=0.0, observed=True)
+        sectors = frame.pivot_table(index=['_Group', 'Sector'], columns='Security', values='Market_Value',
+                                    aggfunc='sum', fill_value=0.0, observed=True)
+        exposures = pd.DataFrame(np.vstack([totals.reindex(columns=priced, fill_value=0.0).to_numpy(),
+                                            sectors.reindex(columns=priced, fill_value=0.0).to_numpy()]),
+                                 columns=priced)
+
+        mean, factor = self.engine.estimate(history[priced])
+        risk = self.engine.run(exposures, mean, factor)
+        total_risk = risk.iloc[:len(totals)].set_axis(totals.index)
+        sector_risk = risk.iloc[len(totals):].set_axis(sectors.index)
+
+        level = self.engine.confidence[-1]
+        label = self._label(level)
+        results = {}
+        for group in groups:
+            if group not in total_risk.index:
+                results[group] = self._empty_result(missing)
+                continue
+            total = total_risk.loc[group]
+            sector_rows = sector_risk.xs(group, level='_Group')
+            results[group] = StrategyResult({
+                'horizon_days': self.engine.horizon,
+                'n_paths': self.engine.n_paths,
+                'confidence': level,
+                'market_value': float(total['market_value']),
+                'var': {confidence: float(total[f"var_{self._label(confidence)}"])
+                        for confidence in self.engine.confidence},
+                'es': {confidence: float(total[f"es_{self._label(confidence)}"])
+                       for confidence in self.engine.confidence},
+                'sectors': [
+                    {'Sector': sector, 'Market_Value': float(row['market_value']),
+                     'VaR': float(row[f"var_{label}"]), 'ES': float(row[f"es_{label}"])}
+                    for sector, row in sector_rows.sort_values(f"es_{label}", ascending=False).iterrows()
+                ],
+                'missing_history': missing
+            }, self.format_results)
+        return results
+
+    def _get_history_store(self):
+        if self.history_store is None:
+            from data.price_history import PriceHistoryStore
+            self.history_store = PriceHistoryStore(os.environ.get('PRICE_HISTORY_PATH', 'price_history.parquet'))
+        return self.history_store
+
+    @staticmethod
+    def _label(confidence):
+        return f"{confidence * 100:g}".replace('.', '_')
+
+    def _empty_result(self, missing=()):
+        return StrategyResult({
+            'horizon_days': self.engine.horizon, 'n_paths': self.engine.n_paths,
+            'confidence': self.engine.confidence[-1], 'market_value': 0.0,
+            'var': {}, 'es': {}, 'sectors': [], 'missing_history': list(missing)
+        }, self.format_results)
+
+    @staticmethod
+    def _share(amount, value):
+        """amount as a percentage of value, n/a when nothing is held, e.g. every price fell back to 0"""
+        return f"{amount / value:.2%}" if value else "n/a"
+
+    @staticmethod
+    def format_results(metrics):
+        """Format the summary and recommendation lines for display"""
+        level = metrics['confidence']
+        if level not in metrics['var']:
+            summary = "No price history available to estimate risk"
+            recommendations = []
+        else:
+            value = metrics['market_value']
+            var, es = metrics['var'][level], metrics['es'][level]
+            summary = (f"{metrics['horizon_days']}-day {level:.0%} VaR: ${var:,.2f} "
+                       f"({MonteCarloRiskStrategy._share(var, value)} of value), expected shortfall ${es:,.2f} "
+                       f"over {metrics['n_paths']:,} simulated paths")
+            recommendations = [
+                "Sectors by expected shortfall:",
+                *[f"- {row['Sector']}: VaR ${row['VaR']:,.2f}, ES ${row['ES']:,.2f} "
+                  f"({MonteCarloRiskStrategy._share(row['ES'], row['Market_Value'])} of ${row['Market_Value']:,.0f})"
+                  for row in metrics['sectors']]
+            ]
+        if metrics['missing_history']:
+            recommendations.append(f"\nNo price history for: {', '.join(metrics['missing_history'])}")
+        return summary, recommendations
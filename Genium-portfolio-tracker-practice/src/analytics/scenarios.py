@@ -0,0 +1,166 @@
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+SHOCK_DIMENSIONS = ('Security', 'Sector', 'Factor')
+
+# pnl: scenario x portfolio P&L in currency. returns: the same as a percentage
+# of each portfolio's market value. market_value: pd.Series per portfolio.
+ScenarioResult = namedtuple('ScenarioResult', ['pnl', 'returns', 'market_value'])
+
+
+def make_shocks(scenarios):
+    """
+    Shock matrix from nested dicts
+
+    Args:
+        scenarios (dict): Scenario name to {dimension: {key: shock}}, with
+                          dimensions from SHOCK_DIMENSIONS and shocks as
+                          fractional price changes, e.g.
+                          {'Tech sell-off': {'Sector': {'Technology': -0.2},
+                                             'Factor': {'Rates': 1.0}}}
+
+    Returns:
+        pd.DataFrame: One row per scenario and one column per (dimension, key);
+                      shocks a scenario doesn't set are 0
+    """
+    shocks = pd.DataFrame.from_dict({
+        name: {(dimension, key): shock for dimension, values in scenario.items() for key, shock in values.items()}
+        for name, scenario in scenarios.items()
+    }, orient='index').reindex(list(scenarios)).fillna(0.0)
+    unknown = set(shocks.columns.get_level_values(0)) - set(SHOCK_DIMENSIONS) if len(shocks.columns) else set()
+    if unknown:
+        raise ValueError(f"Unknown shock dimension: {', '.join(sorted(unknown))}")
+    return shocks
+
+
+def load_shocks(path):
+    """Read scenarios from a JSON file in the nested layout of make_shocks"""
+    with open(path) as f:
+        return make_shocks(json.load(f))
+
+
+def load_exposures(path):
+    """Read factor exposures from a .csv or .parquet file with a Security column and one column per factor"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        exposures = pd.read_parquet(path)
+    elif extension == '.csv':
+        exposures = pd.read_csv(path)
+    else:
+        raise ValueError(f"Unsupported exposures file: {path}")
+    return exposures.set_index('Security')
+
+
+# Every security moves one for one with the market unless exposures say otherwise
+DEFAULT_SCENARIOS = make_shocks({
+    'Market -20%': {'Factor': {'Market': -0.2}},
+    'Market -10%': {'Factor': {'Market': -0.1}},
+    'Market +10%': {'Factor': {'Market': 0.1}},
+    'Technology -20%': {'Sector': {'Technology': -0.2}},
+    'Tech sell-off, market -5%': {'Sector': {'Technology': -0.15}, 'Factor': {'Market': -0.05}},
+    'Consumer -15%': {'Sector': {'Consumer': -0.15}},
+    'Healthcare +10%': {'Sector': {'Healthcare': 0.1}}
+})
+
+
+class ScenarioEngine:
+    """
+    Stress tests every portfolio under every scenario at once
+
+    A scenario's price change for a security is the sum of its own shock,
+    its sector's shock and the factor shocks times its exposures to them.
+    Those are gathered and multiplied out into a scenarios x securities
+    matrix of price changes. One product with the portfolios x securities
+    matrix of market values then gives the P&L of every pair. Large scenario
+    sets are priced in chunks of rows. Prices can fall at most 100%.
+    """
+
+    def __init__(self, factor_exposures=None, chunk_size=1024):
+        """
+        Args:
+            factor_exposures (pd.DataFrame): Price change per unit of factor
+                                             shock, indexed by Security with one
+                                             column per factor, e.g. a Rates
+                                             column of -0.05 for a 5% fall per
+                                             1% rise in rates. A Market factor
+                                             with exposure 1 is added if absent.
+            chunk_size (int): Scenarios priced per pass, which bounds the
+                              scenarios x securities matrix held in memory
+        """
+        exposures = factor_exposures if factor_exposures is not None else pd.DataFrame()
+        if 'Market' not in exposures.columns:
+            exposures = exposures.assign(Market=1.0)
+        self.factor_exposures = exposures
+        self.chunk_size = chunk_size
+
+    def evaluate(self, holdings, shocks=DEFAULT_SCENARIOS):
+        """
+        P&L of every portfolio under every scenario
+
+        Args:
+            holdings (pd.DataFrame): Aggregated holdings with Portfolio,
+                                     Security, Sector and Market_Value
+            shocks (pd.DataFrame): Scenario shocks as built by make_shocks
+
+        Returns:
+            ScenarioResult: Scenario x portfolio P&L and returns
+        """
+        portfolio_codes, portfolios = pd.factorize(holdings['Portfolio'], sort=True)
+        security_codes, securities = pd.factorize(holdings['Security'], sort=True)
+        market_value = np.nan_to_num(holdings['Market_Value'].to_numpy(dtype=np.float64))
+        # Market value per portfolio and security
+        values = np.zeros((len(portfolios), len(securities)))
+        np.add.at(values, (portfolio_codes, security_codes), market_value)
+        # One sector per security, as in the holdings
+        sectors = holdings['Sector'].astype(str).to_numpy()[np.unique(security_codes, return_index=True)[1]]
+
+        securities = pd.Index(securities)
+        pnl = np.empty((len(shocks), len(portfolios)))
+        for start in range(0, len(shocks), self.chunk_size):
+            chunk = shocks.iloc[start:start + self.chunk_size]
+            pnl[start:start + len(chunk)] = self.price_changes(chunk, securities, sectors) @ values.T
+        totals = values.sum(axis=1)
+        returns = np.divide(pnl, totals, out=np.full_like(pnl, np.nan), where=totals > 0) * 100
+
+        columns = pd.Index(np.asarray(portfolios), name='Portfolio')
+        index = pd.Index(shocks.index, name='Scenario')
+        return ScenarioResult(pd.DataFrame(pnl, index=index, columns=columns),
+                              pd.DataFrame(returns, index=index, columns=columns),
+                              pd.Series(totals, index=columns, name='Market_Value'))
+
+    def price_changes(self, shocks, securities, sectors):
+        """
+        Fractional price change of every security under every scenario
+
+        Args:
+            shocks (pd.DataFrame): Scenario shocks as built by make_shocks
+            securities (pd.Index): Securities to price
+            sectors (np.ndarray): Sector of each security
+
+        Returns:
+            np.ndarray: Scenarios x securities, floored at -1
+        """
+        changes = np.zeros((len(shocks), len(securities)))
+        for dimension in SHOCK_DIMENSIONS:
+            if dimension not in shocks.columns.get_level_values(0):
+                continue
+            block = shocks[dimension]
+            if dimension == 'Security':
+                changes += block.reindex(columns=securities, fill_value=0.0).to_numpy(dtype=np.float64)
+            elif dimension == 'Sector':
+                # Scatter each sector's shock onto its securities by gathering on sector codes
+                sector_codes = pd.Index(block.columns).get_indexer(sectors)
+                sector_shocks = np.hstack([block.to_numpy(dtype=np.float64), np.zeros((len(shocks), 1))])
+                changes += sector_shocks[:, sector_codes]  # -1 (no shock) picks the zero column
+            else:
+                missing = set(block.columns) - set(self.factor_exposures.columns)
+                if missing:
+                    raise ValueError(f"No exposures to factor: {', '.join(sorted(missing))}")
+                exposures = self.factor_exposures.reindex(index=securities, columns=block.columns).fillna(
+                    {'Market': 1.0}).fillna(0.0)
+                changes += block.to_numpy(dtype=np.float64) @ exposures.to_numpy(dtype=np.float64).T
+        return np.maximum(changes, -1.0)
@@ -1,9 +1,9 @@
-from .momentum_strategy import MomentumStrategy
-from .rebalancing_strategy import RebalancingStrategy
-
 class StrategyFactory:
     """Factory class for creating strategy instances"""
     
+    # Shared instances handed out by get_strategy
+    _instances = {}
+    
     @staticmethod
     def get_available_strategies():
         """Returns list of available strategies"""
@@ -14,20 +14,38 @@ class StrategyFactory:
             },
             'rebalancing': {
                 'name': 'Rebalancing Strategy',
-                'description': 'Suggests portfolio rebalancing to maintain equal weights'
+                'description': 'Suggests share trades towards minimum variance or risk parity weights '
+                               'within position, sector and turnover limits'
+            },
+            'risk': {
+                'name': 'Monte Carlo Risk',
+                'description': 'Simulates correlated returns to estimate value at risk and expected shortfall'
             }
         }
     
     @staticmethod
     def create_strategy(strategy_id):
         """Creates and returns a strategy instance"""
+        # Imported here so listing strategies doesn't load the optimizer and risk engine
+        from .momentum_strategy import MomentumStrategy
+        from .rebalancing_strategy import RebalancingStrategy
+        from .risk_strategy import MonteCarloRiskStrategy
+
         strategies = {
             'momentum': MomentumStrategy,
-            'rebalancing': RebalancingStrategy
+            'rebalancing': RebalancingStrategy,
+            'risk': MonteCarloRiskStrategy
         }
         
         strategy_class = strategies.get(strategy_id)
         if not strategy_class:
             raise ValueError(f"Unknown strategy: {strategy_id}")
         
-        return strategy_class()
\ No newline at end of file
+        return strategy_class()
+    
+    @classmethod
+    def get_strategy(cls, strategy_id):
+        """Returns a shared strategy instance, creating it on first use"""
+        if strategy_id not in cls._instances:
+            cls._instances[strategy_id] = cls.create_strategy(strategy_id)
+        return cls._instances[strategy_id]
@@ -0,0 +1,85 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from .strategy_factory import StrategyFactory
+
+
+def _run_strategy(strategy_id, holdings_data):
+    """Worker entry point: run one strategy and return plain, picklable results"""
+    results = StrategyFactory.get_strategy(strategy_id).analyze(holdings_data)
+    return dict(results)
+
+
+class StrategyRunner:
+    """
+    Runs strategy analysis in a process pool with memoized results
+
+    Results are keyed by (strategy id, portfolio, data version) and kept in
+    an LRU. Identical requests that arrive while an analysis is running
+    share its future instead of starting another one.
+    """
+
+    def __init__(self, max_workers=None, max_entries=256):
+        self.max_workers = max_workers
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def submit(self, strategy_id, portfolio, version, holdings_data):
+        """
+        Start (or reuse) an analysis
+
+        Returns:
+            concurrent.futures.Future: Resolves to the strategy results dict
+        """
+        key = (strategy_id, portfolio, version)
+        with self._lock:
+            self._reset_after_fork()
+            future = self._results.get(key)
+            if future is not None:
+                self._results.move_to_end(key)
+                return future
+
+            future = self._get_executor().submit(_run_strategy, strategy_id, holdings_data)
+            self._results[key] = future
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+        future.add_done_callback(lambda done: self._on_done(key, done))
+        return future
+
+    def run(self, strategy_id, portfolio, version, holdings_data, timeout=None):
+        """Run an analysis and wait for its results"""
+        return self.submit(strategy_id, portfolio, version, holdings_data).result(timeout)
+
+    def shutdown(self, wait=True):
+        """Stop the worker processes"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._pid = os.getpid()
+        return self._executor
+
+    def _reset_after_fork(self):
+        """A forked child (e.g. a Dash background callback) can't reuse the parent's pool"""
+        if self._pid is not None and self._pid != os.getpid():
+            self._executor = None
+            self._pid = None
+            self._results.clear()
+
+    def _on_done(self, key, future):
+        """Failed or cancelled analyses are not memoized"""
+        if not future.cancelled() and future.exception() is None:
+            return
+        with self._lock:
+            if self._results.get(key) is future:
+                del self._results[key]
@@ -1,9 +1,22 @@
+import os
+import threading
 import dash
-from dash import html, Input, Output
+from dash import html, dcc, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
+from flask import Response, jsonify, request
 from components.dashboard_components import DashboardComponents
+from data.live_prices import LivePriceUpdater, SimulatedTickProvider
+from data.holdings_sources import open_holdings_source
 from data.portfolio_data import PortfolioData
+from data.portfolio_snapshot import SnapshotStore
+from data.price_cache import CachedPriceProvider
+from data.price_providers import YFinancePriceProvider
+from data.replay_prices import ReplayPriceProvider
+from data.shared_prices import SharedPriceProvider
 from analytics.strategy_factory import StrategyFactory
+from analytics.strategy_runner import StrategyRunner
+from monitoring.metrics import MetricsRegistry, instrument_callbacks
+from monitoring.profiler import SamplingProfiler
 
 # Initialize the Dash app
 app = dash.Dash(__name__, 
@@ -14,6 +27,7 @@ app = dash.Dash(__name__,
                 meta_tags=[{'name': 'viewport',
                           'content': 'width=device-width, initial-scale=1.0'}]
                 )
+server = app.server  # WSGI entry point, e.g. gunicorn -w 4 app:server
 
 # Chart theme settings
 chart_theme = {
@@ -34,14 +48,128 @@ chart_theme = {
 }
 
 # Initialize components
-portfolio_data = PortfolioData()
+# SHARED_PRICES points every worker at the file published by `python -m data.shared_prices`,
+# so only that one process talks to the price API. PRICE_REPLAY replays a
+# .csv or .parquet tick file instead, PRICE_REPLAY_SPEED times faster than real time
+shared_prices_path = os.environ.get('SHARED_PRICES')
+replay_path = os.environ.get('PRICE_REPLAY')
+if shared_prices_path:
+    price_provider = SharedPriceProvider(shared_prices_path)
+elif replay_path:
+    price_provider = ReplayPriceProvider(replay_path, speed=float(os.environ.get('PRICE_REPLAY_SPEED', 1)))
+else:
+    price_provider = CachedPriceProvider(
+        YFinancePriceProvider(),
+        ttl=float(os.environ.get('PRICE_CACHE_TTL', 300)),
+        path=os.environ.get('PRICE_CACHE_PATH', 'price_cache.sqlite')
+    )
+# HOLDINGS_SOURCE points at a .parquet, .feather or .sqlite book of lots;
+# HOLDINGS_PORTFOLIOS limits loading to a comma-separated list of portfolios;
+# HOLDINGS_COMPACT=1 keeps large books in the compact memory layout;
+# FAST_STARTUP=1 serves the first page from cached (or sample) prices and
+# loads current prices in the background, pushing them once they arrive
+fast_startup = bool(os.environ.get('FAST_STARTUP'))
+holdings_path = os.environ.get('HOLDINGS_SOURCE')
+holdings_portfolios = os.environ.get('HOLDINGS_PORTFOLIOS')
+portfolio_data = PortfolioData(
+    price_provider=price_provider,
+    holdings_source=open_holdings_source(holdings_path) if holdings_path else None,
+    portfolios=holdings_portfolios.split(',') if holdings_portfolios else None,
+    compact=bool(os.environ.get('HOLDINGS_COMPACT')),
+    defer_prices=fast_startup
+)
+
+# Timing spans on the data methods behind every callback, exported on /metrics
+metrics = MetricsRegistry()
+metrics.instrument(price_provider, ['get_prices'])
+metrics.instrument(portfolio_data, ['update_prices', 'apply_price_updates', '_calculate_metrics',
+                                    'get_portfolio_summary', 'get_holdings_summary', 'get_holdings_detail',
+                                    'get_sector_allocation', 'get_sector_performance', 'get_holdings_page'])
+# Pick up prices refreshed in the background after a stale cache hit
+if isinstance(price_provider, CachedPriceProvider):
+    price_provider.on_refresh = portfolio_data.apply_price_updates
+# SECTOR_WEIGHTING=value weights the sector performance chart by market value
+snapshot_store = SnapshotStore(portfolio_data, sector_weighting=os.environ.get('SECTOR_WEIGHTING', 'equal'))
+metrics.instrument(snapshot_store, ['_build'])
+
+# Strategy analysis runs in worker processes, memoized per portfolio and data version
+strategy_runner = StrategyRunner(max_workers=int(os.environ.get('STRATEGY_WORKERS', 2)))
+metrics.instrument(strategy_runner, ['run'])
+
+# STRATEGY_BACKGROUND=1 also moves the strategy callback off the web worker
+# with a Dash background callback (requires dash[diskcache])
+strategy_callback_options = {}
+if os.environ.get('STRATEGY_BACKGROUND'):
+    import diskcache
+    strategy_callback_options = {
+        'background': True,
+        'manager': dash.DiskcacheManager(diskcache.Cache(os.environ.get('STRATEGY_CACHE_DIR', './strategy-cache'))),
+        'running': [(Output('strategy-results', 'style'), {'opacity': 0.5}, {'opacity': 1})]
+    }
+
+# Stress scenarios: SCENARIOS_PATH is a JSON file of shocks by security, sector
+# and factor, and FACTOR_EXPOSURES_PATH a .csv or .parquet file of each
+# security's exposure to factors other than the market. Both are read, and the
+# engine built, when the scenario section is first drawn
+scenarios_path = os.environ.get('SCENARIOS_PATH')
+exposures_path = os.environ.get('FACTOR_EXPOSURES_PATH')
+_scenarios = None
+_scenarios_lock = threading.Lock()
+
+def get_scenarios():
+    """The scenario engine and shocks, created on first use"""
+    global _scenarios
+    with _scenarios_lock:
+        if _scenarios is None:
+            from analytics.scenarios import DEFAULT_SCENARIOS, ScenarioEngine, load_exposures, load_shocks
+            engine = ScenarioEngine(load_exposures(exposures_path) if exposures_path else None)
+            metrics.instrument(engine, ['evaluate'])
+            _scenarios = (engine, load_shocks(scenarios_path) if scenarios_path else DEFAULT_SCENARIOS)
+        return _scenarios
+
+# TABLE_MODE=paginated serves holdings tables one page at a time from the server
+table_mode = os.environ.get('TABLE_MODE', 'html').lower()
+table_page_size = int(os.environ.get('TABLE_PAGE_SIZE', 25))
+
+# Live mode: LIVE_PRICES=yfinance polls the price cache, LIVE_PRICES=simulated
+# runs an offline random-walk feed. With shared prices the updater process owns
+# the feed and workers follow the shared file instead; a replayed feed is always live
+if shared_prices_path:
+    live_source = 'shared'
+elif replay_path:
+    live_source = 'replay'
+else:
+    live_source = os.environ.get('LIVE_PRICES', '').lower()
+live_interval = float(os.environ.get('LIVE_PRICE_INTERVAL', 5))
+if live_source:
+    if live_source == 'simulated':
+        live_provider = SimulatedTickProvider(portfolio_data.get_current_prices())
+    else:
+        live_provider = price_provider
+    live_updater = LivePriceUpdater(portfolio_data, live_provider, interval=live_interval)
+    live_updater.start()
 dashboard_components = DashboardComponents(chart_theme)
+metrics.instrument(dashboard_components, [name for name in dir(dashboard_components)
+                                          if name.startswith(('create_', 'patch_'))])
+
+# PROFILER=1 samples every thread's stack in the background; read it from /debug/profile
+profiler = None
+if os.environ.get('PROFILER'):
+    profiler = SamplingProfiler(interval=float(os.environ.get('PROFILER_INTERVAL', 0.005)))
+    profiler.start()
 
 # Create layout
 app.layout = dbc.Container([
     # Header with Portfolio Selector
     dashboard_components.create_header(portfolio_data.get_portfolios()),
     
+    # Key of the snapshot shared by every portfolio callback
+    dcc.Store(id='portfolio-snapshot'),
+    
+    # Live price updates: last version pushed to the browser, and the poll timer
+    dcc.Store(id='live-version'),
+    dcc.Interval(id='live-interval', interval=live_interval * 1000, disabled=not (live_source or fast_startup)),
+    
     # Portfolio Summary Cards
     html.Div(id='summary-cards'),
 
@@ -51,38 +179,165 @@ app.layout = dbc.Container([
     # Strategy Section
     html.Div(id='strategy-section'),
     
+    # Stress Scenarios across every portfolio
+    html.Div(id='scenario-section'),
+    
     # Holdings Tables
     html.Div(id='holdings-tables'),
     
+    # Downloads of the selected portfolio
+    html.Div(id='export-section'),
+    
 ], fluid=True, style={'backgroundColor': '#16282d', 'minHeight': '100vh', 'color': '#FFFFFF'})
 
+# Callback for computing the selected portfolio's snapshot once per selection
+@app.callback(
+    Output('portfolio-snapshot', 'data'),
+    [Input('portfolio-selector', 'value')]
+)
+def update_portfolio_snapshot(selected_portfolio):
+    snapshot = snapshot_store.get(selected_portfolio)
+    return {'portfolio': snapshot.portfolio, 'version': snapshot.version, 'worker': snapshot_store.worker_id}
+
+def get_snapshot(snapshot_key):
+    """Look up the snapshot referenced by the portfolio-snapshot store"""
+    if not snapshot_key:
+        return snapshot_store.get(None)
+    # Versions from another worker name different data here, so use the latest instead
+    version = snapshot_key['version'] if snapshot_key.get('worker') == snapshot_store.worker_id else None
+    return snapshot_store.get(snapshot_key['portfolio'], version)
+
 # Callback for updating summary cards
 @app.callback(
     Output('summary-cards', 'children'),
-    [Input('portfolio-selector', 'value')]
+    [Input('portfolio-snapshot', 'data')]
 )
-def update_summary_cards(selected_portfolio):
-    summary = portfolio_data.get_portfolio_summary(selected_portfolio)
-    return dashboard_components.create_summary_cards(summary)
+def update_summary_cards(snapshot_key):
+    snapshot = get_snapshot(snapshot_key)
+    return dashboard_components.create_summary_cards(snapshot.summary)
 
 # Callback for updating charts
 @app.callback(
     Output('charts-row', 'children'),
-    [Input('portfolio-selector', 'value')]
+    [Input('portfolio-snapshot', 'data')]
 )
-def update_charts(selected_portfolio):
-    holdings_data = portfolio_data.get_holdings_summary(selected_portfolio)
-    return dashboard_components.create_charts_row(holdings_data)
+def update_charts(snapshot_key):
+    snapshot = get_snapshot(snapshot_key)
+    return dashboard_components.create_charts_row(snapshot.holdings_summary,
+                                                  cache_key=(snapshot.portfolio, snapshot.version),
+                                                  sector_performance=snapshot.sector_performance)
 
 # Callback for updating holdings tables
 @app.callback(
     Output('holdings-tables', 'children'),
-    [Input('portfolio-selector', 'value')]
+    [Input('portfolio-snapshot', 'data')]
 )
-def update_holdings_tables(selected_portfolio):
-    holdings_summary = portfolio_data.get_holdings_summary(selected_portfolio)
-    holdings_detail = portfolio_data.get_holdings_detail(selected_portfolio)
-    return dashboard_components.create_holdings_tables(holdings_summary, holdings_detail)
+def update_holdings_tables(snapshot_key):
+    if table_mode == 'paginated':
+        return dashboard_components.create_paginated_holdings_tables(table_page_size)
+    snapshot = get_snapshot(snapshot_key)
+    return dashboard_components.create_holdings_tables(snapshot.holdings_summary,
+                                                       snapshot.holdings_detail)
+
+def update_table_page(view, page_current, page_size, sort_by, filter_query, snapshot_key):
+    """Fetch the visible page of a paginated holdings table"""
+    sort_column = sort_by[0]['column_id'] if sort_by else None
+    ascending = not sort_by or sort_by[0]['direction'] == 'asc'
+    page_data, total_rows = portfolio_data.get_holdings_page(
+        portfolio=(snapshot_key or {}).get('portfolio'),
+        view=view,
+        page=page_current or 0,
+        page_size=page_size,
+        sort_by=sort_column,
+        ascending=ascending,
+        filters=dashboard_components.parse_filter_query(filter_query)
+    )
+    columns = (dashboard_components.SUMMARY_TABLE_COLUMNS if view == 'summary'
+               else dashboard_components.DETAIL_TABLE_COLUMNS)
+    page_count = max(1, -(-total_rows // page_size))
+    return dashboard_components.create_table_page(page_data[columns]), page_count
+
+# Callbacks for paginated holdings tables, also refreshed on live price updates
+@app.callback(
+    [Output('holdings-summary-table', 'data'),
+     Output('holdings-summary-table', 'page_count')],
+    [Input('holdings-summary-table', 'page_current'),
+     Input('holdings-summary-table', 'page_size'),
+     Input('holdings-summary-table', 'sort_by'),
+     Input('holdings-summary-table', 'filter_query'),
+     Input('portfolio-snapshot', 'data'),
+     Input('live-version', 'data')]
+)
+def update_summary_table_page(page_current, page_size, sort_by, filter_query, snapshot_key, live_version):
+    return update_table_page('summary', page_current, page_size, sort_by, filter_query, snapshot_key)
+
+@app.callback(
+    [Output('holdings-detail-table', 'data'),
+     Output('holdings-detail-table', 'page_count')],
+    [Input('holdings-detail-table', 'page_current'),
+     Input('holdings-detail-table', 'page_size'),
+     Input('holdings-detail-table', 'sort_by'),
+     Input('holdings-detail-table', 'filter_query'),
+     Input('portfolio-snapshot', 'data'),
+     Input('live-version', 'data')]
+)
+def update_detail_table_page(page_current, page_size, sort_by, filter_query, snapshot_key, live_version):
+    return update_table_page('detail', page_current, page_size, sort_by, filter_query, snapshot_key)
+
+# Callback for pushing live price changes as patches to the rendered cards, charts and tables
+@app.callback(
+    [Output('summary-cards', 'children', allow_duplicate=True),
+     Output('portfolio-composition', 'figure'),
+     Output('sector-performance', 'figure'),
+     Output('holdings-tables', 'children', allow_duplicate=True),
+     Output('live-version', 'data')],
+    [Input('live-interval', 'n_intervals')],
+    [State('portfolio-snapshot', 'data'),
+     State('live-version', 'data')],
+    prevent_initial_call=True
+)
+def push_live_updates(n_intervals, snapshot_key, live_version):
+    if not snapshot_key:
+        return no_update, no_update, no_update, no_update, no_update
+    
+    # Data currently rendered in the browser: the last push since the snapshot was taken, if any
+    rendered = live_version if live_version and live_version.get('snapshot') == snapshot_key else snapshot_key
+    # A version from another worker can't be compared with ours, so there is nothing to diff against
+    rendered_version = rendered['version'] if rendered.get('worker') == snapshot_store.worker_id else None
+    if portfolio_data.version == rendered_version:
+        return no_update, no_update, no_update, no_update, no_update
+    
+    current = snapshot_store.get(snapshot_key['portfolio'])
+    previous = current if rendered_version is None else snapshot_store.get(snapshot_key['portfolio'], rendered_version)
+    new_live_version = {'portfolio': current.portfolio, 'version': current.version,
+                        'worker': snapshot_store.worker_id, 'snapshot': snapshot_key}
+    
+    if table_mode == 'paginated':
+        # Paginated tables refetch their visible page when live-version changes
+        tables = no_update
+    elif previous.version != rendered_version:
+        # Rendered snapshot was evicted or came from another worker, so there is nothing to diff against
+        tables = dashboard_components.create_holdings_tables(current.holdings_summary,
+                                                             current.holdings_detail)
+    else:
+        tables = dashboard_components.patch_holdings_tables(previous.holdings_summary,
+                                                            current.holdings_summary,
+                                                            previous.holdings_detail,
+                                                            current.holdings_detail) or no_update
+    
+    if previous.version != rendered_version:
+        cards = dashboard_components.create_summary_cards(current.summary)
+        composition = dashboard_components.create_composition_chart(current.holdings_summary)
+        sector_performance = dashboard_components.create_sector_performance_chart(current.holdings_summary,
+                                                                                  current.sector_performance)
+    else:
+        cards = dashboard_components.patch_summary_cards(previous.summary, current.summary) or no_update
+        composition, sector_performance = dashboard_components.patch_charts(previous.holdings_summary,
+                                                                            current.holdings_summary,
+                                                                            previous.sector_performance,
+                                                                            current.sector_performance)
+    return (cards, composition or no_update, sector_performance or no_update,
+            tables, new_live_version)
 
 # Callbacks for strategy section
 @app.callback(
@@ -106,20 +361,87 @@ def update_strategy_description(selected_strategy):
 @app.callback(
     Output('strategy-results', 'children'),
     [Input('strategy-selector', 'value'),
-     Input('portfolio-selector', 'value')]
+     Input('portfolio-snapshot', 'data')],
+    **strategy_callback_options
 )
-def update_strategy_results(selected_strategy, selected_portfolio):
-    if not selected_strategy or not selected_portfolio:
+def update_strategy_results(selected_strategy, snapshot_key):
+    if not selected_strategy or not snapshot_key or not snapshot_key['portfolio']:
         return html.Div()
     
     # Get holdings data
-    holdings_data = portfolio_data.get_holdings_summary(selected_portfolio)
+    snapshot = get_snapshot(snapshot_key)
     
-    # Create and run strategy
-    strategy = StrategyFactory.create_strategy(selected_strategy)
-    results = strategy.analyze(holdings_data)
+    # Run strategy in the worker pool, reusing results for this data version
+    results = strategy_runner.run(selected_strategy, snapshot.portfolio, snapshot.version,
+                                  snapshot.holdings_summary)
     
     return dashboard_components.create_strategy_results(results)
 
+# Callback for the stress scenario heatmap, redrawn when prices change
+@app.callback(
+    Output('scenario-section', 'children'),
+    [Input('portfolio-snapshot', 'data'),
+     Input('live-version', 'data')]
+)
+def update_scenario_section(snapshot_key, live_version):
+    # Copied under the lock, since live updates rewrite prices and market values in place
+    with portfolio_data.lock:
+        version = portfolio_data.version
+        holdings = portfolio_data.get_holdings_summary()[['Portfolio', 'Security', 'Sector', 'Market_Value']].copy()
+    scenario_engine, scenario_shocks = get_scenarios()
+    # Every portfolio is on the grid, so the figure only depends on the data version
+    figure = dashboard_components.figure_cache.get_or_create(
+        ('scenario_heatmap', version),
+        lambda: dashboard_components.create_scenario_heatmap(scenario_engine.evaluate(holdings, scenario_shocks)))
+    return dashboard_components.create_scenario_section(figure)
+
+# Callback for the download links of the selected portfolio
+@app.callback(
+    Output('export-section', 'children'),
+    [Input('portfolio-selector', 'value')]
+)
+def update_export_section(selected_portfolio):
+    return dashboard_components.create_export_section(selected_portfolio, app.get_relative_path('/export'))
+
+@app.server.route('/export/<dataset>')
+def export_dataset(dataset):
+    from data.export import EXPORT_MIMETYPES, Exporter, export_filename
+
+    # Strategies are created per download, so concurrent exports never share their state
+    exporter = Exporter(portfolio_data, strategies={
+        strategy_id: StrategyFactory.create_strategy(strategy_id)
+        for strategy_id in StrategyFactory.get_available_strategies()
+    }, chunk_size=int(os.environ.get('EXPORT_CHUNK_SIZE', 100000)))
+    portfolio = request.args.get('portfolio') or None
+    fmt = request.args.get('format', 'csv')
+    compression = request.args.get('compression') or None
+    try:
+        chunks = exporter.stream(dataset, portfolio, fmt, compression)
+    except ValueError as e:
+        return Response(f"{e}\n", status=400, mimetype='text/plain')
+    filename = export_filename(f"{dataset}-{portfolio}" if portfolio else dataset, fmt, compression)
+    return Response(chunks, mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.server.route('/stats/figure-cache')
+def figure_cache_stats():
+    return jsonify(dashboard_components.figure_cache.stats())
+
+# Per-callback latency and payload histograms; registered last so every callback is wrapped
+instrument_callbacks(app, metrics)
+
+@app.server.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.server.route('/debug/profile')
+def sampled_profile():
+    if profiler is None:
+        return Response("Profiler is off, start the app with PROFILER=1\n", status=404, mimetype='text/plain')
+    folded = profiler.folded()
+    if request.args.get('reset'):
+        profiler.reset()
+    return Response(folded, mimetype='text/plain')
+
 if __name__ == '__main__':
     app.run_server(debug=True)
\ No newline at end of file
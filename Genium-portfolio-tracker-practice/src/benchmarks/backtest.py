@@ -0,0 +1,61 @@
+"""
+Backtester throughput: momentum parameter sweeps and strategy replays
+
+Sweeps momentum_weights over a lookback x top-n x rebalance frequency grid
+on synthetic daily closes, once per worker count, then replays every
+registered strategy over the same history on a synthetic book. No market
+data access is needed. Run from the src directory:
+
+    python -m benchmarks.backtest --years 10 --securities 500
+"""
+import argparse
+import time
+
+from analytics.backtest import Backtester, momentum_weights
+from analytics.performance import TRADING_DAYS
+from analytics.risk import MonteCarloRiskEngine
+from analytics.risk_strategy import MonteCarloRiskStrategy
+from analytics.strategy_factory import StrategyFactory
+from benchmarks.synthetic import make_holdings, make_price_history, make_tickers
+
+
+def run(years, n_securities, workers, lookbacks, top_ns, frequencies, book_size):
+    history = make_price_history(make_tickers(n_securities), int(years * TRADING_DAYS))
+    grid = {'lookback': lookbacks, 'top_n': top_ns, 'frequency': frequencies}
+    n_combinations = len(lookbacks) * len(top_ns) * len(frequencies)
+    print(f"Sweep: {n_combinations} combinations, {len(history):,} days x {n_securities} securities")
+    print(f"{'workers':>8} {'time (s)':>9} {'combinations/s':>15} {'best sharpe':>12}")
+    for max_workers in workers:
+        backtester = Backtester(history, max_workers=max_workers)
+        start = time.perf_counter()
+        result = backtester.sweep(momentum_weights, grid)
+        elapsed = time.perf_counter() - start
+        print(f"{max_workers:>8} {elapsed:>9.2f} {n_combinations / elapsed:>15,.1f} "
+              f"{result.summary['sharpe'].max():>12.2f}")
+
+    holdings = make_holdings(book_size, n_tickers=n_securities, n_portfolios=1)
+    backtester = Backtester(history)
+    print(f"\nReplay: {holdings['Security'].nunique()} holdings, monthly rebalances")
+    print(f"{'strategy':>24} {'time (s)':>9} {'fills':>7} {'return':>8} {'sharpe':>7}")
+    for strategy_id in StrategyFactory.get_available_strategies():
+        strategy = StrategyFactory.create_strategy(strategy_id)
+        if isinstance(strategy, MonteCarloRiskStrategy):
+            strategy.engine = MonteCarloRiskEngine(n_paths=10000)
+        start = time.perf_counter()
+        result = backtester.run(strategy, holdings, frequency='M')
+        elapsed = time.perf_counter() - start
+        print(f"{type(strategy).__name__:>24} {elapsed:>9.2f} {len(result.fills):>7} "
+              f"{result.summary['total_return']:>8.1%} {result.summary['sharpe']:>7.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--securities', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--lookbacks', type=int, nargs='+', default=list(range(20, 260, 20)))
+    parser.add_argument('--top-n', type=int, nargs='+', default=list(range(1, 41, 2)))
+    parser.add_argument('--frequencies', nargs='+', default=['W', 'M'])
+    parser.add_argument('--book-size', type=int, default=1000, help='lots in the replayed book')
+    args = parser.parse_args()
+    run(args.years, args.securities, args.workers, args.lookbacks, args.top_n, args.frequencies, args.book_size)
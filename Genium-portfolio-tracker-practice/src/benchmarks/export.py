@@ -0,0 +1,50 @@
+"""
+Bulk export throughput and peak memory per format and book size
+
+Exports the lots of a synthetic book to a temporary directory, one file
+per portfolio. Peak memory is traced per run to show it depends on the
+chunk size, not the number of lots. Run from the src directory:
+
+    python -m benchmarks.export --lots 100000 1000000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from data.export import Exporter
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+from benchmarks.synthetic import make_holdings, make_prices, make_tickers
+
+
+def run(lot_counts, n_portfolios, formats, compression, chunk_size, workers):
+    print(f"{'lots':>10} {'format':>8} {'workers':>8} {'time (s)':>9} {'lots/s':>11} {'peak (MB)':>10}")
+    for n_lots in lot_counts:
+        holdings = make_holdings(n_lots, n_portfolios=n_portfolios)
+        prices = make_prices(make_tickers(holdings['Security'].nunique()))
+        portfolio_data = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings)
+        for fmt in formats:
+            for max_workers in workers:
+                exporter = Exporter(portfolio_data, chunk_size=chunk_size, max_workers=max_workers)
+                with tempfile.TemporaryDirectory() as directory:
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    exporter.export(directory, ['holdings_detail'], fmt=fmt, compression=compression)
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                    tracemalloc.stop()
+                print(f"{n_lots:>10,} {fmt:>8} {max_workers:>8} {elapsed:>9.2f} {n_lots / elapsed:>11,.0f} "
+                      f"{peak:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--portfolios', type=int, default=20)
+    parser.add_argument('--formats', nargs='+', default=['csv', 'parquet', 'jsonl'])
+    parser.add_argument('--compression', default='gzip')
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    args = parser.parse_args()
+    run(args.lots, args.portfolios, args.formats, args.compression, args.chunk_size, args.workers)
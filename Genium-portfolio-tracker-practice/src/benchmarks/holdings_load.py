@@ -0,0 +1,55 @@
+"""
+Load time of each holdings source for a large book, in full and for one portfolio
+
+Run from the src directory:
+
+    python -m benchmarks.holdings_load
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from data.holdings_sources import FeatherHoldingsSource, ParquetHoldingsSource, SQLiteHoldingsSource
+from benchmarks.synthetic import make_holdings
+
+
+def run(n_lots, n_portfolios, repeats):
+    holdings = make_holdings(n_lots, n_portfolios=n_portfolios)
+    selected = [holdings['Portfolio'].iloc[0]]
+
+    print(f"{n_lots} lots across {n_portfolios} portfolios")
+    print(f"{'source':>8} {'size (MB)':>10} {'write (s)':>10} {'load all (s)':>13} {'load one (s)':>13}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        sources = {
+            'parquet': ParquetHoldingsSource(os.path.join(directory, 'holdings.parquet')),
+            'feather': FeatherHoldingsSource(os.path.join(directory, 'holdings.feather')),
+            'sqlite': SQLiteHoldingsSource(os.path.join(directory, 'holdings.sqlite'))
+        }
+
+        for name, source in sources.items():
+            start = time.perf_counter()
+            source.write(holdings)
+            write_time = time.perf_counter() - start
+
+            timings = {}
+            for label, portfolios in [('all', None), ('one', selected)]:
+                best = float('inf')
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    source.load(portfolios)
+                    best = min(best, time.perf_counter() - start)
+                timings[label] = best
+
+            size = os.path.getsize(source.path) / 1e6
+            print(f"{name:>8} {size:>10.1f} {write_time:>10.2f} {timings['all']:>13.3f} {timings['one']:>13.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=1000000)
+    parser.add_argument('--portfolios', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    run(args.lots, args.portfolios, args.repeats)
@@ -0,0 +1,55 @@
+"""
+Compares PortfolioData.apply_price_updates against a full metrics rebuild
+
+Run from the src directory:
+
+    python -m benchmarks.incremental_metrics
+"""
+import argparse
+import time
+
+import numpy as np
+
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+from benchmarks.synthetic import make_holdings, make_prices, make_tickers
+
+
+def run(n_lots, n_tickers, tick_sizes, repeats):
+    prices = make_prices(make_tickers(n_tickers))
+    holdings = make_holdings(n_lots, n_tickers=n_tickers)
+    portfolio_data = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings)
+    rng = np.random.default_rng(1)
+
+    print(f"{n_lots} lots, {n_tickers} tickers")
+    print(f"{'changed':>8} {'full (ms)':>10} {'incremental (ms)':>17} {'speedup':>8}")
+
+    for tick_size in tick_sizes:
+        full, incremental = [], []
+        for _ in range(repeats):
+            tickers = rng.choice(list(prices), tick_size, replace=False)
+            ticks = {ticker: prices[ticker] * rng.uniform(0.99, 1.01) for ticker in tickers}
+
+            start = time.perf_counter()
+            portfolio_data._current_prices = {**prices, **ticks}
+            portfolio_data._calculate_metrics()
+            full.append(time.perf_counter() - start)
+
+            ticks = {ticker: price * 1.001 for ticker, price in ticks.items()}
+            start = time.perf_counter()
+            portfolio_data.apply_price_updates(ticks)
+            incremental.append(time.perf_counter() - start)
+
+        full_ms = np.median(full) * 1000
+        incremental_ms = np.median(incremental) * 1000
+        print(f"{tick_size:>8} {full_ms:>10.2f} {incremental_ms:>17.2f} {full_ms / incremental_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=50000)
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--changed', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    run(args.lots, args.tickers, args.changed, args.repeats)
@@ -0,0 +1,95 @@
+"""
+Replay time of a large transaction ledger through the tax-lot engine
+
+Run from the src directory:
+
+    python -m benchmarks.ledger_replay
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.tax_lots import TaxLotLedger
+from benchmarks.synthetic import make_prices, make_tickers
+
+
+def make_ledger(n_rows, n_tickers, n_portfolios, seed=0):
+    """
+    Generate a valid ledger: sells never exceed the open quantity
+
+    Roughly 60% buys and 38% sells, with dividends and rare splits.
+    """
+    rng = np.random.default_rng(seed)
+    tickers = make_tickers(n_tickers)
+    prices = make_prices(tickers, seed)
+    portfolios = [f"Portfolio {i + 1}" for i in range(n_portfolios)]
+
+    books = rng.integers(0, n_tickers * n_portfolios, n_rows)
+    draws = rng.random(n_rows)
+    quantities = rng.integers(1, 200, n_rows)
+    moves = np.exp(np.cumsum(rng.normal(0, 0.001, n_rows)))
+    dates = pd.Timestamp('2015-01-01') + pd.to_timedelta(np.arange(n_rows) * 3000 // n_rows, unit='D')
+
+    open_quantity = np.zeros(n_tickers * n_portfolios)
+    types, rows_quantity = [], []
+    for book, draw, quantity in zip(books.tolist(), draws.tolist(), quantities.tolist()):
+        if draw < 0.002:
+            types.append('split')
+            rows_quantity.append(2.0)
+            open_quantity[book % n_tickers::n_tickers] *= 2
+        elif draw < 0.02:
+            types.append('dividend')
+            rows_quantity.append(None)
+        elif draw < 0.4 and open_quantity[book] >= 1:
+            quantity = min(quantity, open_quantity[book])
+            types.append('sell')
+            rows_quantity.append(float(quantity))
+            open_quantity[book] -= quantity
+        else:
+            types.append('buy')
+            rows_quantity.append(float(quantity))
+            open_quantity[book] += quantity
+
+    ticker_index = books % n_tickers
+    base_prices = np.array([prices[ticker] for ticker in tickers])[ticker_index] * moves
+    types = np.array(types)
+    return pd.DataFrame({
+        'Date': dates,
+        'Portfolio': np.array(portfolios)[books // n_tickers],
+        'Security': np.array(tickers)[ticker_index],
+        'Type': types,
+        'Quantity': rows_quantity,
+        'Price': np.where(types == 'dividend', 0.5, base_prices.round(2))
+    })
+
+
+def run(n_rows, n_tickers, n_portfolios):
+    start = time.perf_counter()
+    ledger_rows = make_ledger(n_rows, n_tickers, n_portfolios)
+    print(f"Generated {n_rows} rows in {time.perf_counter() - start:.1f}s: "
+          f"{ledger_rows['Type'].value_counts().to_dict()}")
+
+    for method in ['fifo', 'lifo']:
+        ledger = TaxLotLedger(method)
+        start = time.perf_counter()
+        realized = ledger.replay(ledger_rows)
+        elapsed = time.perf_counter() - start
+
+        ledger.update_prices(ledger_rows.groupby('Security')['Price'].last().to_dict())
+        start = time.perf_counter()
+        unrealized = ledger.unrealized()
+        unrealized_ms = (time.perf_counter() - start) * 1000
+        print(f"{method:>5}: {elapsed:6.2f}s ({n_rows / elapsed:,.0f} rows/s), "
+              f"{len(ledger.realized_lots):,} realized lots, realized {realized:,.0f}, "
+              f"unrealized {unrealized:,.0f} in {unrealized_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--portfolios', type=int, default=10)
+    args = parser.parse_args()
+    run(args.rows, args.tickers, args.portfolios)
@@ -0,0 +1,44 @@
+"""
+Throughput of live mode: simulated ticks applied to PortfolioData per second
+
+Run from the src directory:
+
+    python -m benchmarks.live_ticks
+"""
+import argparse
+import time
+
+from data.live_prices import LivePriceUpdater, SimulatedTickProvider
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+from benchmarks.synthetic import make_holdings, make_prices, make_tickers
+
+
+def run(n_lots, n_tickers, tick_fractions, duration):
+    prices = make_prices(make_tickers(n_tickers))
+    holdings = make_holdings(n_lots, n_tickers=n_tickers)
+
+    print(f"{n_lots} lots, {n_tickers} tickers, {duration:.0f}s per run")
+    print(f"{'tick %':>7} {'polls/s':>9} {'ticks/s':>10}")
+
+    for tick_fraction in tick_fractions:
+        portfolio_data = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings)
+        provider = SimulatedTickProvider(prices, tick_fraction=tick_fraction, seed=0)
+        updater = LivePriceUpdater(portfolio_data, provider, interval=0)
+
+        updater.start()
+        time.sleep(duration)
+        updater.stop()
+
+        print(f"{tick_fraction * 100:>6.1f}% {updater.polls / duration:>9.1f} "
+              f"{updater.ticks_applied / duration:>10.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=50000)
+    parser.add_argument('--tickers', type=int, default=2000)
+    parser.add_argument('--tick-fractions', type=float, nargs='+', default=[0.001, 0.01, 0.1])
+    parser.add_argument('--duration', type=float, default=3.0)
+    args = parser.parse_args()
+    run(args.lots, args.tickers, args.tick_fractions, args.duration)
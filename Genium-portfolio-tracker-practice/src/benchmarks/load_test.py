@@ -0,0 +1,201 @@
+"""
+Load generator: concurrent dashboard users switching portfolios and strategies
+
+Each simulated user drives the Dash callback endpoints the way the browser
+does: a portfolio switch requests the snapshot and then the cards, charts,
+tables and strategy panels that depend on it; a strategy switch requests
+the strategy description and results. Without --url a dashboard is started
+on a local port with prices replayed from a synthetic tick file, so runs are
+offline and repeatable. Run from the src directory:
+
+    python -m benchmarks.load_test --users 20 --duration 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+import requests
+
+from data.holdings_sources import SampleHoldingsSource, open_holdings_source
+from data.replay_prices import save_ticks
+from benchmarks.synthetic import make_price_ticks, make_prices
+
+
+class DashClient:
+    """Calls Dash callbacks over HTTP, recording the latency of each one"""
+
+    def __init__(self, url, latencies, errors):
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+        self.latencies = latencies  # Callback name -> list of seconds, shared by every user
+        self.errors = errors
+
+    def layout(self):
+        return self.session.get(f"{self.url}/_dash-layout", timeout=60).json()
+
+    def callback(self, output, inputs):
+        """
+        Call the callback behind one output
+
+        Args:
+            output (str): 'component-id.property' of a single-output callback
+            inputs (dict): 'component-id.property' to value for every input
+        """
+        component_id, prop = output.split('.')
+        body = {
+            'output': output,
+            'outputs': {'id': component_id, 'property': prop},
+            'inputs': [{'id': key.split('.')[0], 'property': key.split('.')[1], 'value': value}
+                       for key, value in inputs.items()],
+            'changedPropIds': list(inputs),
+            'state': []
+        }
+        start = time.perf_counter()
+        try:
+            response = self.session.post(f"{self.url}/_dash-update-component", json=body, timeout=60)
+        except requests.RequestException:
+            self.errors[output] += 1
+            return None
+        self.latencies[output].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            self.errors[output] += 1
+            return None
+        return response.json()['response'][component_id][prop]
+
+
+def find_component(tree, component_id):
+    """Find a component by id in a serialized Dash layout"""
+    if isinstance(tree, list):
+        for child in tree:
+            found = find_component(child, component_id)
+            if found is not None:
+                return found
+    elif isinstance(tree, dict):
+        props = tree.get('props', {})
+        if props.get('id') == component_id:
+            return tree
+        return find_component(props.get('children'), component_id)
+    return None
+
+
+def simulate_user(client, portfolios, seed, deadline, think_time, actions):
+    rng = np.random.default_rng(seed)
+    snapshot, strategy, strategies = None, None, []
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        if snapshot is None or strategy is None or rng.random() < 0.7:
+            portfolio = portfolios[rng.integers(len(portfolios))]
+            snapshot = client.callback('portfolio-snapshot.data', {'portfolio-selector.value': portfolio})
+            if snapshot is None:
+                continue
+            for output in ['summary-cards.children', 'charts-row.children', 'holdings-tables.children']:
+                client.callback(output, {'portfolio-snapshot.data': snapshot})
+            section = client.callback('strategy-section.children', {'portfolio-selector.value': portfolio})
+            selector = find_component(section, 'strategy-selector')
+            strategies = [option['value'] for option in selector['props']['options']] if selector else []
+            strategy = strategy or (strategies[0] if strategies else None)
+            name = 'switch portfolio'
+        else:
+            strategy = strategies[rng.integers(len(strategies))]
+            client.callback('strategy-description.children', {'strategy-selector.value': strategy})
+            name = 'switch strategy'
+        if strategy is not None:
+            client.callback('strategy-results.children', {'strategy-selector.value': strategy,
+                                                          'portfolio-snapshot.data': snapshot})
+        actions[name].append(time.perf_counter() - start)
+        if think_time:
+            time.sleep(rng.exponential(think_time))
+
+
+def start_server(port, replay_path, replay_speed):
+    """Start the dashboard on a local port, replaying prices from replay_path"""
+    env = {key: value for key, value in os.environ.items() if key not in ('SHARED_PRICES', 'LIVE_PRICES')}
+    env.update({'PRICE_REPLAY': replay_path, 'PRICE_REPLAY_SPEED': str(replay_speed)})
+    server = subprocess.Popen(
+        [sys.executable, '-c', f"import app; app.server.run(host='127.0.0.1', port={port}, threaded=True)"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Dashboard exited with code {server.returncode}")
+        try:
+            if requests.get(f"{url}/_dash-layout", timeout=1).status_code == 200:
+                return server, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Dashboard did not start within 120s")
+
+
+def write_replay_file(path, n_ticks, duration):
+    """Synthetic ticks for every security of the book the dashboard will load"""
+    holdings_path = os.environ.get('HOLDINGS_SOURCE')
+    holdings_source = open_holdings_source(holdings_path) if holdings_path else SampleHoldingsSource()
+    tickers = sorted(holdings_source.load()['Security'].unique())
+    save_ticks(make_price_ticks(make_prices(tickers), n_ticks, duration=duration), path)
+
+
+def report(latencies, actions, errors, elapsed):
+    total = sum(len(values) for values in latencies.values())
+    print(f"{total:,} requests in {elapsed:.1f}s: {total / elapsed:,.1f} requests/s, "
+          f"{sum(len(values) for values in actions.values()) / elapsed:,.1f} actions/s, "
+          f"{sum(errors.values())} errors")
+    print(f"{'':<32} {'count':>7} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9} {'max (ms)':>9}")
+    for name, values in [*sorted(latencies.items()), *sorted(actions.items())]:
+        p50, p95, p99, maximum = np.percentile(np.array(values) * 1000, [50, 95, 99, 100])
+        print(f"{name:<32} {len(values):>7} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} {maximum:>9.1f}")
+
+
+def run(users, duration, url, think_time, replay, replay_speed, port, seed):
+    server = None
+    with tempfile.TemporaryDirectory() as directory:
+        if url is None:
+            if replay is None:
+                replay = os.path.join(directory, 'ticks.parquet')
+                write_replay_file(replay, n_ticks=200000, duration=6.5 * 3600)
+            server, url = start_server(port, replay, replay_speed)
+
+        try:
+            layout = DashClient(url, defaultdict(list), defaultdict(int)).layout()
+            selector = find_component(layout, 'portfolio-selector')
+            portfolios = [option['value'] for option in selector['props']['options']]
+
+            latencies, actions, errors = defaultdict(list), defaultdict(list), defaultdict(int)
+            deadline = time.perf_counter() + duration
+            threads = [
+                threading.Thread(target=simulate_user, args=(DashClient(url, latencies, errors), portfolios,
+                                                             seed + user, deadline, think_time, actions))
+                for user in range(users)
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            report(latencies, actions, errors, time.perf_counter() - start)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of load')
+    parser.add_argument('--url', help='load an already running dashboard instead of starting one')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between user actions')
+    parser.add_argument('--replay', help='tick file for the started dashboard, synthetic if omitted')
+    parser.add_argument('--replay-speed', type=float, default=60.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    run(args.users, args.duration, args.url, args.think_time, args.replay, args.replay_speed, args.port, args.seed)
@@ -0,0 +1,71 @@
+"""
+Bytes per lot of the holdings frames in the original, typed and compact layouts
+
+Run from the src directory:
+
+    python -m benchmarks.memory_profile
+"""
+import argparse
+
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+from benchmarks.synthetic import make_holdings, make_prices, make_tickers
+
+STRING_COLUMNS = ['Portfolio', 'Security', 'Sector']
+
+
+def frame_bytes(frame):
+    """Deep memory usage of a frame, including string payloads"""
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def index_bytes(portfolio_data):
+    """Memory held by the row indexes PortfolioData keeps for slicing and updates"""
+    indexes = [portfolio_data._portfolio_rows, portfolio_data._portfolio_agg_rows,
+               portfolio_data._ticker_agg_rows]
+    if not portfolio_data.compact:
+        indexes.append(portfolio_data._ticker_rows)
+    return sum(rows.nbytes for index in indexes for rows in index.values())
+
+
+def run(n_lots, n_tickers, n_portfolios):
+    prices = make_prices(make_tickers(n_tickers))
+    holdings = make_holdings(n_lots, n_tickers=n_tickers, n_portfolios=n_portfolios)
+    typed = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings)
+    compact = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings, compact=True)
+
+    # The layout before typed columns: object strings and every derived column stored per lot
+    original = {
+        'holdings': typed.holdings.astype({column: object for column in STRING_COLUMNS}),
+        'aggregated': typed.aggregated_holdings.astype({column: object for column in STRING_COLUMNS})
+    }
+    layouts = {
+        'original': (original['holdings'], original['aggregated'], index_bytes(typed)),
+        'typed': (typed.holdings, typed.aggregated_holdings, index_bytes(typed)),
+        'compact': (compact.holdings, compact.aggregated_holdings, index_bytes(compact))
+    }
+
+    print(f"{n_lots} lots, {n_tickers} tickers, {n_portfolios} portfolios")
+    print(f"{'layout':>9} {'lots (B/lot)':>13} {'aggregated (B/lot)':>19} {'indexes (B/lot)':>16} "
+          f"{'total (MB)':>11}")
+
+    baseline = None
+    for name, (lots, aggregated, indexes) in layouts.items():
+        sizes = [frame_bytes(lots), frame_bytes(aggregated), indexes]
+        total = sum(sizes)
+        baseline = baseline or total
+        print(f"{name:>9} {sizes[0] / n_lots:>13.1f} {sizes[1] / n_lots:>19.1f} {sizes[2] / n_lots:>16.1f} "
+              f"{total / 1e6:>11.1f}  ({total / baseline:.0%})")
+
+    print("\ncompact lot columns:")
+    for column, dtype in compact.holdings.dtypes.items():
+        print(f"  {column:<15} {str(dtype):<15} {compact.holdings[column].memory_usage(deep=True, index=False) / n_lots:.2f} B/lot")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=1000000)
+    parser.add_argument('--tickers', type=int, default=5000)
+    parser.add_argument('--portfolios', type=int, default=50)
+    args = parser.parse_args()
+    run(args.lots, args.tickers, args.portfolios)
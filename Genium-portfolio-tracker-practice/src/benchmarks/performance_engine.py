@@ -0,0 +1,46 @@
+"""
+Time to compute daily NAV, TWR, drawdowns and volatility over a long price history
+
+Run from the src directory:
+
+    python -m benchmarks.performance_engine
+"""
+import argparse
+import time
+
+from analytics.performance import PerformanceEngine
+from benchmarks.synthetic import make_holdings, make_price_history
+
+
+def run(n_lots, n_tickers, n_portfolios, years, repeats):
+    holdings = make_holdings(n_lots, n_tickers=n_tickers, n_portfolios=n_portfolios)
+    n_days = years * 252
+    history = make_price_history(sorted(holdings['Security'].unique()), n_days)
+    # Spread purchases over the whole history
+    holdings['Purchase_Date'] = history.index[(holdings.index.to_numpy() * 7919) % n_days]
+    engine = PerformanceEngine()
+
+    print(f"{n_lots} lots, {n_tickers} tickers, {n_portfolios} portfolios, {n_days} days")
+    timings = {'nav + returns': [], 'summary': []}
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = engine.compute(holdings, prices=history)
+        timings['nav + returns'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result.summary()
+        timings['summary'].append(time.perf_counter() - start)
+
+    for name, values in timings.items():
+        print(f"{name:>14}: {min(values) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=100000)
+    parser.add_argument('--tickers', type=int, default=500)
+    parser.add_argument('--portfolios', type=int, default=10)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    run(args.lots, args.tickers, args.portfolios, args.years, args.repeats)
@@ -0,0 +1,53 @@
+"""
+Wall-clock benchmark for PortfolioData.update_prices against ticker count
+
+Simulates network latency with local fake feeds, so no market data access
+is needed. Run from the src directory:
+
+    python -m benchmarks.price_refresh
+"""
+import argparse
+import time
+
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider, ThreadedPriceProvider
+from benchmarks.synthetic import make_holdings, make_prices, make_tickers
+
+
+def run(ticker_counts, latency, max_workers):
+    print(f"{'tickers':>8} {'serial (s)':>12} {'threaded (s)':>13} {'bulk (s)':>10}")
+
+    for n_tickers in ticker_counts:
+        prices = make_prices(make_tickers(n_tickers))
+
+        def fetch_price(ticker):
+            time.sleep(latency)
+            return prices[ticker]
+
+        providers = {
+            # max_workers=1 is equivalent to the old one-ticker-at-a-time loop
+            'serial': ThreadedPriceProvider(fetch_price, max_workers=1, timeout=None),
+            'threaded': ThreadedPriceProvider(fetch_price, max_workers=max_workers, timeout=None),
+            'bulk': StaticPriceProvider(prices, latency=latency)
+        }
+
+        holdings = make_holdings(n_tickers * 5, n_tickers=n_tickers)
+        portfolio_data = PortfolioData(price_provider=providers['bulk'], holdings=holdings)
+
+        timings = {}
+        for name, provider in providers.items():
+            portfolio_data.price_provider = provider
+            start = time.perf_counter()
+            portfolio_data.update_prices()
+            timings[name] = time.perf_counter() - start
+
+        print(f"{n_tickers:>8} {timings['serial']:>12.3f} {timings['threaded']:>13.3f} {timings['bulk']:>10.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tickers', type=int, nargs='+', default=[10, 50, 100, 250])
+    parser.add_argument('--latency', type=float, default=0.02, help='simulated seconds per request')
+    parser.add_argument('--workers', type=int, default=16)
+    args = parser.parse_args()
+    run(args.tickers, args.latency, args.workers)
@@ -0,0 +1,51 @@
+"""
+Monte Carlo risk engine throughput in simulated paths per second
+
+Uses synthetic daily closes, so no market data access is needed. Peak
+memory is traced per run to show it depends on the chunk size, not the
+number of paths. Run from the src directory:
+
+    python -m benchmarks.risk_engine
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from analytics.risk import MonteCarloRiskEngine
+from benchmarks.synthetic import make_price_history, make_tickers
+
+
+def run(security_counts, n_paths, chunk_sizes, n_days, n_groups):
+    print(f"{'securities':>10} {'chunk':>7} {'paths':>9} {'time (s)':>9} {'paths/s':>11} {'peak (MB)':>10}")
+    rng = np.random.default_rng(0)
+    for n_securities in security_counts:
+        tickers = make_tickers(n_securities)
+        mean, factor = MonteCarloRiskEngine.estimate(make_price_history(tickers, n_days))
+        # Random exposures for n_groups portfolios or sectors
+        exposures = pd.DataFrame(rng.uniform(0, 1e5, (n_groups, n_securities)) * (rng.random((n_groups, n_securities)) < 0.3),
+                                 columns=tickers)
+
+        for chunk_size in chunk_sizes:
+            engine = MonteCarloRiskEngine(n_paths=n_paths, chunk_size=chunk_size)
+            tracemalloc.start()
+            start = time.perf_counter()
+            engine.run(exposures, mean, factor)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+            tracemalloc.stop()
+            print(f"{n_securities:>10} {chunk_size:>7} {n_paths:>9} {elapsed:>9.2f} {n_paths / elapsed:>11,.0f} "
+                  f"{peak:>10.1f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--securities', type=int, nargs='+', default=[50, 500, 2000])
+    parser.add_argument('--paths', type=int, default=100000)
+    parser.add_argument('--chunks', type=int, nargs='+', default=[2000, 10000, 50000])
+    parser.add_argument('--days', type=int, default=504, help='days of history behind the covariance')
+    parser.add_argument('--groups', type=int, default=50, help='portfolios and sectors valued per path')
+    args = parser.parse_args()
+    run(args.securities, args.paths, args.chunks, args.days, args.groups)
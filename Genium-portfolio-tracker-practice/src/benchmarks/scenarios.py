@@ -0,0 +1,62 @@
+"""
+Scenario engine time for the full scenario x portfolio P&L grid
+
+Builds random security, sector and factor shocks and values a synthetic
+book at its purchase prices, so no market data access is needed. Run from
+the src directory:
+
+    python -m benchmarks.scenarios --scenarios 100 1000 10000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analytics.scenarios import ScenarioEngine
+from benchmarks.synthetic import make_holdings
+
+FACTORS = ['Market', 'Rates', 'Credit', 'Oil', 'Dollar']
+
+
+def make_scenarios(n_scenarios, securities, sectors, seed=0):
+    """Random shocks to every factor and sector and to one security in ten"""
+    rng = np.random.default_rng(seed)
+    shocked = securities[::10]
+    columns = pd.MultiIndex.from_tuples([('Security', security) for security in shocked]
+                                        + [('Sector', sector) for sector in sectors]
+                                        + [('Factor', factor) for factor in FACTORS])
+    shocks = np.hstack([rng.normal(0, 0.05, (n_scenarios, len(shocked))),
+                        rng.normal(0, 0.1, (n_scenarios, len(sectors))),
+                        rng.normal(0, 1.0, (n_scenarios, len(FACTORS)))])
+    return pd.DataFrame(shocks, index=[f"Scenario {i}" for i in range(n_scenarios)], columns=columns)
+
+
+def run(scenario_counts, lot_counts, n_portfolios):
+    print(f"{'lots':>10} {'portfolios':>10} {'scenarios':>10} {'time (ms)':>10} {'cells/s':>14}")
+    for n_lots in lot_counts:
+        holdings = make_holdings(n_lots, n_portfolios=n_portfolios)
+        holdings['Market_Value'] = holdings['Quantity'] * holdings['Purchase_Price']
+        securities = holdings['Security'].unique()
+        rng = np.random.default_rng(1)
+        exposures = pd.DataFrame(rng.normal(0, 0.02, (len(securities), len(FACTORS))),
+                                 index=pd.Index(securities, name='Security'), columns=FACTORS).assign(
+            Market=rng.uniform(0.5, 1.5, len(securities)))
+        engine = ScenarioEngine(exposures)
+        for n_scenarios in scenario_counts:
+            shocks = make_scenarios(n_scenarios, securities, holdings['Sector'].unique())
+            start = time.perf_counter()
+            result = engine.evaluate(holdings, shocks)
+            elapsed = time.perf_counter() - start
+            cells = result.pnl.size
+            print(f"{n_lots:>10,} {result.pnl.shape[1]:>10} {n_scenarios:>10,} {elapsed * 1000:>10.1f} "
+                  f"{cells / elapsed:>14,.0f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--lots', type=int, nargs='+', default=[10000, 1000000])
+    parser.add_argument('--portfolios', type=int, default=50)
+    args = parser.parse_args()
+    run(args.scenarios, args.lots, args.portfolios)
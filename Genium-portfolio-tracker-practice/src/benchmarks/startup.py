@@ -0,0 +1,100 @@
+"""
+Dashboard startup time: importing app, first responses, and current prices
+
+Each run starts a fresh interpreter with yfinance replaced by a fake feed that
+sleeps for --latency seconds, so no market data access is needed. Compares
+the default startup with FAST_STARTUP=1, against an empty (cold) and a
+populated (warm) price cache. Run from the src directory:
+
+    python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(latency):
+    """Runs inside the measured interpreter and prints its timings as JSON"""
+    start = time.perf_counter()
+    from data.price_providers import YFinancePriceProvider
+
+    def get_prices(self, tickers):
+        time.sleep(latency)
+        return {ticker: 100.0 for ticker in tickers}
+
+    YFinancePriceProvider.get_prices = get_prices
+
+    import app
+    imported = time.perf_counter()
+    client = app.server.test_client()
+    assert client.get('/').status_code == 200
+    first_page = time.perf_counter()
+    assert client.get('/_dash-layout').status_code == 200
+    layout = time.perf_counter()
+    app.portfolio_data.prices_loaded.wait()
+    prices_loaded = time.perf_counter()
+
+    print(json.dumps({
+        'import': imported - start,
+        'first_page': first_page - start,
+        'layout': layout - start,
+        'prices': prices_loaded - start
+    }))
+
+
+def warm_cache(path):
+    """Populate a price cache file with every ticker of the sample book"""
+    from data.holdings_sources import SampleHoldingsSource
+    from data.price_cache import CachedPriceProvider
+    from data.price_providers import StaticPriceProvider
+
+    tickers = SampleHoldingsSource().load()['Security'].unique().tolist()
+    CachedPriceProvider(StaticPriceProvider({ticker: 100.0 for ticker in tickers}), path=path).get_prices(tickers)
+
+
+def measure(fast_startup, warm, latency, runs):
+    timings = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {key: value for key, value in os.environ.items()
+                   if key not in ('FAST_STARTUP', 'LIVE_PRICES', 'SHARED_PRICES', 'PROFILER')}
+            env['PRICE_CACHE_PATH'] = os.path.join(directory, 'price_cache.sqlite')
+            if fast_startup:
+                env['FAST_STARTUP'] = '1'
+            if warm:
+                warm_cache(env['PRICE_CACHE_PATH'])
+
+            start = time.perf_counter()
+            output = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--child', '--latency', str(latency)],
+                                    env=env, capture_output=True, text=True, check=True).stdout
+            total = time.perf_counter() - start
+            timings.append({**json.loads(output.strip().splitlines()[-1]), 'process': total})
+    return {key: statistics.median(run[key] for run in timings) for key in timings[0]}
+
+
+def run(latency, runs):
+    print(f"{'mode':>8} {'cache':>6} {'import (s)':>11} {'first page (s)':>15} {'layout (s)':>11} "
+          f"{'prices (s)':>11} {'process (s)':>12}")
+    for warm in (False, True):
+        for fast_startup in (False, True):
+            timings = measure(fast_startup, warm, latency, runs)
+            print(f"{'fast' if fast_startup else 'default':>8} {'warm' if warm else 'cold':>6} "
+                  f"{timings['import']:>11.3f} {timings['first_page']:>15.3f} {timings['layout']:>11.3f} "
+                  f"{timings['prices']:>11.3f} {timings['process']:>12.3f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--latency', type=float, default=2.0, help='simulated seconds per price request')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.latency)
+    else:
+        run(args.latency, args.runs)
@@ -0,0 +1,226 @@
+"""
+Benchmark suite for data refresh, dashboard builders and strategies, written as JSON
+
+Times PortfolioData construction and metrics, every get_* accessor, every
+DashboardComponents.create_* builder (with its serialized payload size) and
+every strategy at several book sizes, using synthetic holdings and a fake
+price feed. Run from the src directory:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare baseline.json results.json
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from analytics.risk import MonteCarloRiskEngine
+from analytics.rebalancing_strategy import RebalancingStrategy
+from analytics.risk_strategy import MonteCarloRiskStrategy
+from analytics.scenarios import DEFAULT_SCENARIOS, ScenarioEngine
+from analytics.strategy_factory import StrategyFactory
+from components.dashboard_components import DashboardComponents
+from data.portfolio_data import PortfolioData
+from data.price_history import StaticHistoryProvider
+from data.price_providers import StaticPriceProvider
+from benchmarks.synthetic import make_holdings, make_price_history, make_prices
+
+CHART_THEME = {'paper_bgcolor': 'rgba(0,0,0,0)', 'plot_bgcolor': 'rgba(0,0,0,0)', 'font': {'color': '#FFFFFF'}}
+
+
+def payload_bytes(value):
+    """Size of a callback output once serialized the way Dash sends it"""
+    return len(json.dumps(value, cls=plotly.utils.PlotlyJSONEncoder).encode())
+
+
+def measure(func, setup=None, min_time=0.2, max_repeats=25):
+    """
+    Time func, repeating until min_time has been spent or max_repeats reached
+
+    Args:
+        func (callable): Code under test
+        setup (callable): Run before every repeat, outside the timing
+
+    Returns:
+        tuple: (timing stats dict, last return value of func)
+    """
+    times = []
+    result = None
+    while not times or (len(times) < max_repeats and sum(times) < min_time):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return {
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'repeats': len(times)
+    }, result
+
+
+class Suite:
+    """Collects benchmark results for one run"""
+
+    def __init__(self, min_time=0.2):
+        self.min_time = min_time
+        self.results = []
+
+    def bench(self, name, scale, func, setup=None, payload=False):
+        stats, result = measure(func, setup, self.min_time)
+        entry = {'name': name, 'scale': scale, **stats}
+        if payload:
+            entry['payload_bytes'] = payload_bytes(result)
+        self.results.append(entry)
+
+        size = f" {entry['payload_bytes'] / 1024:>10.1f} KB" if payload else ''
+        print(f"{scale:>9} {name:<52} {stats['median'] * 1000:>10.2f} ms{size}")
+        return result
+
+    def run_scale(self, n_lots):
+        n_tickers = min(max(n_lots // 10, 10), 5000)
+        holdings = make_holdings(n_lots, n_tickers=n_tickers, n_portfolios=10)
+        provider = StaticPriceProvider(make_prices(sorted(holdings['Security'].unique())))
+
+        data = self.bench('PortfolioData.__init__', n_lots,
+                          lambda: PortfolioData(price_provider=provider, holdings=holdings))
+        self.bench('PortfolioData._calculate_metrics', n_lots, data._calculate_metrics)
+        portfolio = data.get_portfolios()[0]
+        sector = data.get_sector_allocation(portfolio)['Sector'].iloc[0]
+
+        # Memoized accessors are timed cold (after an invalidation) and warm
+        accessors = {
+            'get_portfolios': lambda: data.get_portfolios(),
+            'get_tickers': lambda: data.get_tickers(),
+            'get_current_prices': lambda: data.get_current_prices(),
+            'get_portfolio_summary': lambda: data.get_portfolio_summary(portfolio),
+            'get_holdings_summary': lambda: data.get_holdings_summary(portfolio),
+            'get_holdings_detail': lambda: data.get_holdings_detail(portfolio),
+            'get_sector_allocation': lambda: data.get_sector_allocation(portfolio),
+            'get_sector_performance': lambda: data.get_sector_performance(portfolio),
+            'get_sector_performance[value]': lambda: data.get_sector_performance(portfolio, 'value'),
+            'get_breakdown': lambda: data.get_breakdown('Security', portfolio=portfolio, sector=sector),
+            'get_holdings_page': lambda: data.get_holdings_page(portfolio, 'detail', 0, 25, 'Return', False)
+        }
+        for name, accessor in accessors.items():
+            self.bench(f"PortfolioData.{name} (cold)", n_lots, accessor, setup=data._invalidate)
+            self.bench(f"PortfolioData.{name} (warm)", n_lots, accessor)
+
+        summary = data.get_portfolio_summary(portfolio)
+        holdings_summary = data.get_holdings_summary(portfolio)
+        holdings_detail = data.get_holdings_detail(portfolio)
+        sector_performance = data.get_sector_performance(portfolio)
+        page, _ = data.get_holdings_page(portfolio, 'detail', 0, 25)
+        strategy_results = dict(StrategyFactory.create_strategy('momentum').analyze(holdings_summary))
+        # The dashboard's heatmap covers every portfolio
+        scenario_result = ScenarioEngine().evaluate(data.aggregated_holdings, DEFAULT_SCENARIOS)
+        components = DashboardComponents(CHART_THEME)
+        scenario_heatmap = components.create_scenario_heatmap(scenario_result)
+
+        builders = {
+            'create_header': lambda: components.create_header(data.get_portfolios()),
+            'create_summary_cards': lambda: components.create_summary_cards(summary),
+            'create_charts_row': lambda: components.create_charts_row(holdings_summary,
+                                                                      sector_performance=sector_performance),
+            'create_composition_chart': lambda: components.create_composition_chart(holdings_summary),
+            'create_sector_performance_chart': lambda: components.create_sector_performance_chart(
+                holdings_summary, sector_performance),
+            'create_holdings_tables': lambda: components.create_holdings_tables(holdings_summary, holdings_detail),
+            'create_paginated_holdings_tables': lambda: components.create_paginated_holdings_tables(),
+            'create_table_page': lambda: components.create_table_page(page),
+            'create_strategy_section': lambda: components.create_strategy_section(
+                StrategyFactory.get_available_strategies()),
+            'create_strategy_results': lambda: components.create_strategy_results(strategy_results),
+            'create_scenario_heatmap': lambda: components.create_scenario_heatmap(scenario_result),
+            'create_scenario_section': lambda: components.create_scenario_section(scenario_heatmap),
+            'create_export_section': lambda: components.create_export_section(portfolio)
+        }
+        for name, builder in builders.items():
+            self.bench(f"DashboardComponents.{name}", n_lots, builder, payload=True)
+
+        history = make_price_history(sorted(holdings['Security'].unique()), 504, end=pd.Timestamp.today().normalize())
+        for strategy_id in StrategyFactory.get_available_strategies():
+            strategy = StrategyFactory.create_strategy(strategy_id)
+            if isinstance(strategy, (MonteCarloRiskStrategy, RebalancingStrategy)):
+                strategy.history_store = StaticHistoryProvider(history)
+            if isinstance(strategy, MonteCarloRiskStrategy):
+                # Fewer paths so large books finish; see benchmarks.risk_engine
+                strategy.engine = MonteCarloRiskEngine(n_paths=10000)
+            self.bench(f"{type(strategy).__name__}.analyze", n_lots,
+                       lambda: dict(strategy.analyze(holdings_summary)))
+            self.bench(f"{type(strategy).__name__}.analyze_many", n_lots,
+                       lambda: {group: dict(result)
+                                for group, result in strategy.analyze_many(data.aggregated_holdings).items()})
+
+
+def metadata():
+    """Environment details stored with every run so results are comparable"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__
+    }
+
+
+def compare(baseline_path, current_path, threshold=1.2):
+    """Print the median time ratio of every benchmark present in both runs"""
+    with open(baseline_path) as file:
+        baseline = {(r['name'], r['scale']): r for r in json.load(file)['results']}
+    with open(current_path) as file:
+        current = json.load(file)['results']
+
+    print(f"{'scale':>9} {'benchmark':<52} {'before (ms)':>12} {'after (ms)':>11} {'ratio':>7}")
+    regressions = 0
+    for result in current:
+        before = baseline.get((result['name'], result['scale']))
+        if before is None:
+            continue
+        ratio = result['median'] / max(before['median'], 1e-9)
+        flag = ''
+        if ratio > threshold:
+            flag = '  slower'
+            regressions += 1
+        elif ratio < 1 / threshold:
+            flag = '  faster'
+        print(f"{result['scale']:>9} {result['name']:<52} {before['median'] * 1000:>12.2f} "
+              f"{result['median'] * 1000:>11.2f} {ratio:>6.2f}x{flag}")
+    print(f"\n{regressions} benchmark(s) more than {threshold:.1f}x slower")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='Seconds to spend repeating each benchmark')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='Compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    args = parser.parse_args()
+
+    if args.compare:
+        raise SystemExit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    suite = Suite(min_time=args.min_time)
+    for scale in args.scales:
+        suite.run_scale(scale)
+
+    with open(args.output, 'w') as file:
+        json.dump({'meta': metadata(), 'results': suite.results}, file, indent=2)
+    print(f"\nWrote {len(suite.results)} results to {args.output}")
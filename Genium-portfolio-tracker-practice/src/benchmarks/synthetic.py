@@ -0,0 +1,93 @@
+import numpy as np
+import pandas as pd
+
+SECTORS = ['Technology', 'Healthcare', 'Consumer', 'Telecom', 'Automotive',
+           'Aerospace', 'Entertainment', 'Financials', 'Energy', 'Utilities']
+
+
+def make_tickers(n_tickers):
+    """Generate unique synthetic ticker symbols"""
+    return [f"T{i:05d}" for i in range(n_tickers)]
+
+
+def make_prices(tickers, seed=0):
+    """Generate a synthetic price for every ticker"""
+    rng = np.random.default_rng(seed)
+    return dict(zip(tickers, rng.uniform(5, 500, len(tickers)).round(2)))
+
+
+def make_holdings(n_lots, n_tickers=None, n_portfolios=3, seed=0):
+    """
+    Generate a synthetic book of purchase lots
+
+    Args:
+        n_lots (int): Number of purchase lots
+        n_tickers (int): Number of distinct securities, defaults to n_lots // 10
+        n_portfolios (int): Number of portfolios the lots are spread across
+        seed (int): Random seed so runs are comparable
+
+    Returns:
+        pd.DataFrame: Lots in the same layout as PortfolioData.holdings
+    """
+    rng = np.random.default_rng(seed)
+    n_tickers = n_tickers or max(n_lots // 10, 1)
+    tickers = np.array(make_tickers(n_tickers))
+    ticker_sectors = rng.choice(SECTORS, n_tickers)
+    ticker_idx = rng.integers(0, n_tickers, n_lots)
+
+    return pd.DataFrame({
+        'Portfolio': rng.choice([f"Portfolio {i + 1}" for i in range(n_portfolios)], n_lots),
+        'Security': tickers[ticker_idx],
+        'Purchase_Date': pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 1400, n_lots), unit='D'),
+        'Quantity': rng.integers(1, 500, n_lots),
+        'Purchase_Price': rng.uniform(5, 500, n_lots).round(2),
+        'Sector': ticker_sectors[ticker_idx]
+    })
+
+
+def make_price_history(tickers, n_days, end='2024-12-31', seed=0):
+    """
+    Generate daily closes as independent random walks
+
+    Args:
+        tickers (list): Ticker symbols, one column each
+        n_days (int): Number of business days ending at end
+        end (str): Last date
+        seed (int): Random seed so runs are comparable
+
+    Returns:
+        pd.DataFrame: Closes indexed by business day
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=end, periods=n_days)
+    moves = rng.normal(0.0003, 0.02, (n_days, len(tickers)))
+    closes = rng.uniform(5, 500, len(tickers)) * np.exp(np.cumsum(moves, axis=0))
+    return pd.DataFrame(closes.round(4), index=dates, columns=list(tickers))
+
+
+def make_price_ticks(prices, n_ticks, duration=3600, start='2024-01-02 09:30', volatility=0.001, seed=0):
+    """
+    Generate an intraday tick stream as random walks from the given prices
+
+    Every ticker opens with a tick at start; the remaining ticks land on
+    random tickers at random times over duration seconds.
+
+    Returns:
+        pd.DataFrame: Timestamp, Security and Price, in time order
+    """
+    rng = np.random.default_rng(seed)
+    tickers = np.array(list(prices))
+    opening = np.array([prices[ticker] for ticker in tickers], dtype=np.float64)
+
+    ticker_idx = np.concatenate([np.arange(len(tickers)), rng.integers(0, len(tickers), n_ticks)])
+    offsets = np.concatenate([np.zeros(len(tickers)), np.sort(rng.uniform(0, duration, n_ticks))])
+    moves = np.concatenate([np.zeros(len(tickers)), rng.normal(0, volatility, n_ticks)])
+
+    # Rows are in time order, so a per-ticker cumulative sum is each ticker's walk
+    walks = pd.Series(moves).groupby(ticker_idx).cumsum().to_numpy()
+
+    return pd.DataFrame({
+        'Timestamp': pd.Timestamp(start) + pd.to_timedelta(offsets, unit='s'),
+        'Security': tickers[ticker_idx],
+        'Price': (opening[ticker_idx] * np.exp(walks)).round(4)
+    })
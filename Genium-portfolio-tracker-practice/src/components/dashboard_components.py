@@ -1,11 +1,25 @@
+import re
+from urllib.parse import urlencode
 import dash_bootstrap_components as dbc
-from dash import html, dcc
-import plotly.express as px
+from dash import html, dcc, dash_table, Patch
+import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.colors import diverging, sequential
+from .figure_cache import FigureCache
 
 class DashboardComponents:
-    def __init__(self, chart_theme):
+    def __init__(self, chart_theme, figure_cache=None):
         self.chart_theme = chart_theme
+        self.figure_cache = figure_cache or FigureCache()
+        self._template = self._create_chart_template()
+    
+    @staticmethod
+    def _create_chart_template():
+        """plotly_dark with trace defaults trimmed to the chart types we draw"""
+        template = pio.templates['plotly_dark'].to_plotly_json()
+        template['data'] = {trace: template['data'][trace] for trace in ('pie', 'bar', 'heatmap')}
+        return template
     
     def create_header(self, portfolios):
         """Create dashboard header with portfolio selector"""
@@ -30,56 +44,65 @@ class DashboardComponents:
             ], width=4, style={'marginLeft' : 'auto'})
         ])
     
+    # (title, summary key, value format) for each summary card
+    SUMMARY_CARDS = [
+        ("Total Value", 'total_value', "${:,.2f}"),
+        ("Total Cost", 'total_cost', "${:,.2f}"),
+        ("Total Gain/Loss", 'total_gain_loss', "${:,.2f}"),
+        ("Overall Return", 'total_return', "{:,.2f}%")
+    ]
+    
+    SUMMARY_TABLE_COLUMNS = ['Security', 'Quantity', 'Average_Cost', 'Current_Price',
+                             'Market_Value', 'Cost_Basis', 'Return']
+    DETAIL_TABLE_COLUMNS = ['Security', 'Purchase_Date', 'Quantity', 'Purchase_Price',
+                            'Current_Price', 'Market_Value', 'Cost_Basis', 'Return']
+    
     def create_summary_cards(self, portfolio_summary):
         """Create summary metric cards"""
         return dbc.Row([
             dbc.Col([
                 dbc.Card([
                     dbc.CardBody([
-                        html.H4("Total Value", className="card-title text-center", style={'color': '#00FFB3'}),
-                        html.H2(f"${portfolio_summary['total_value']:,.2f}", 
-                               className="text-center",
-                               style={'color': '#FFFFFF'})
-                    ])
-                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
-            ], width=3),
-            
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardBody([
-                        html.H4("Total Cost", className="card-title text-center", style={'color': '#00FFB3'}),
-                        html.H2(f"${portfolio_summary['total_cost']:,.2f}",
-                               className="text-center",
-                               style={'color': '#FFFFFF'})
-                    ])
-                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
-            ], width=3),
-            
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardBody([
-                        html.H4("Total Gain/Loss", className="card-title text-center", style={'color': '#00FFB3'}),
-                        html.H2(f"${portfolio_summary['total_gain_loss']:,.2f}",
-                               className="text-center",
-                               style={'color': '#FFFFFF'})
-                    ])
-                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
-            ], width=3),
-            
-            dbc.Col([
-                dbc.Card([
-                    dbc.CardBody([
-                        html.H4("Overall Return", className="card-title text-center", style={'color': '#00FFB3'}),
-                        html.H2(f"{portfolio_summary['total_return']:,.2f}%",
+                        html.H4(title, className="card-title text-center", style={'color': '#00FFB3'}),
+                        html.H2(value_format.format(portfolio_summary[key]),
                                className="text-center",
                                style={'color': '#FFFFFF'})
                     ])
                 ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
             ], width=3)
+            for title, key, value_format in self.SUMMARY_CARDS
         ])
     
-    def create_charts_row(self, holdings_data):
-        """Create charts row"""
+    def patch_summary_cards(self, previous_summary, portfolio_summary):
+        """
+        Build a Patch that rewrites only the summary card values that changed
+        
+        Returns:
+            dash.Patch: Patch for the summary-cards children, or None if nothing changed
+        """
+        patch = Patch()
+        changed = False
+        for index, (_, key, value_format) in enumerate(self.SUMMARY_CARDS):
+            value = value_format.format(portfolio_summary[key])
+            if value != value_format.format(previous_summary[key]):
+                # Row > Col > Card > CardBody > H2
+                (patch['props']['children'][index]['props']['children'][0]
+                      ['props']['children'][0]['props']['children'][1]['props']['children']) = value
+                changed = True
+        return patch if changed else None
+    
+    def create_charts_row(self, holdings_data, cache_key=None, sector_performance=None):
+        """
+        Create charts row
+        
+        Args:
+            holdings_data (pd.DataFrame): Aggregated holdings to chart
+            cache_key (tuple): (portfolio, data version). When given, figures
+                               are served from the figure cache.
+            sector_performance (pd.DataFrame): Sector and Return rows, e.g. from
+                                               PortfolioData.get_sector_performance.
+                                               Averaged from holdings_data if None.
+        """
         return dbc.Row([
             # Portfolio Composition
             dbc.Col([
@@ -91,13 +114,8 @@ class DashboardComponents:
                     dbc.CardBody([
                         dcc.Graph(
                             id='portfolio-composition',
-                            figure=px.pie(holdings_data, 
-                                        values='Market_Value', 
-                                        names='Security',
-                                        title='Holdings Distribution',
-                                        template="plotly_dark",
-                                        color_discrete_sequence=px.colors.sequential.Bluyl)
-                            .update_layout(**self.chart_theme)
+                            figure=self._cached_figure('portfolio_composition', cache_key,
+                                                       self.create_composition_chart, holdings_data)
                         )
                     ])
                 ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 
@@ -114,7 +132,10 @@ class DashboardComponents:
                     dbc.CardBody([
                         dcc.Graph(
                             id='sector-performance',
-                            figure=self.create_sector_performance_chart(holdings_data)
+                            figure=self._cached_figure(
+                                'sector_performance', cache_key,
+                                lambda data: self.create_sector_performance_chart(data, sector_performance),
+                                holdings_data)
                         )
                     ])
                 ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 
@@ -134,9 +155,7 @@ class DashboardComponents:
                     dbc.CardBody([
                         html.Div([
                             dbc.Table.from_dataframe(
-                                holdings_summary[['Security', 'Quantity', 'Average_Cost',
-                                                'Current_Price', 'Market_Value', 'Cost_Basis',
-                                                'Return']].round(2),
+                                holdings_summary[self.SUMMARY_TABLE_COLUMNS].round(2),
                                 striped=True,
                                 bordered=True,
                                 hover=True,
@@ -158,10 +177,7 @@ class DashboardComponents:
                     dbc.CardBody([
                         html.Div([
                             dbc.Table.from_dataframe(
-                                holdings_detail[['Security', 'Purchase_Date', 'Quantity',
-                                               'Purchase_Price', 'Current_Price',
-                                               'Market_Value', 'Cost_Basis',
-                                               'Return']].round(2),
+                                holdings_detail[self.DETAIL_TABLE_COLUMNS].round(2),
                                 striped=True,
                                 bordered=True,
                                 hover=True,
@@ -174,17 +190,207 @@ class DashboardComponents:
             ], width=12)
         ])
     
-    def create_sector_performance_chart(self, holdings_data):
-        """Create sector performance chart"""
-        sector_perf = holdings_data.groupby('Sector')['Return'].mean().reset_index()
-        fig = px.bar(sector_perf,
-                    x='Sector',
-                    y='Return',
-                    title='Average Return by Sector',
-                    template="plotly_dark",
-                    color_discrete_sequence=px.colors.sequential.Bluyl)
+    def create_paginated_holdings_tables(self, page_size=25):
+        """Create holdings tables that fetch one page at a time from the server"""
+        tables = [
+            ("Holdings Summary", 'holdings-summary-table', self.SUMMARY_TABLE_COLUMNS),
+            ("Purchase History", 'holdings-detail-table', self.DETAIL_TABLE_COLUMNS)
+        ]
+        return dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader(title,
+                                 style={'backgroundColor': 'rgba(0,0,0,0)', 
+                                      'border-bottom': '1px solid #FFFFFF', 
+                                      'color': '#00FFB3'}),
+                    dbc.CardBody([
+                        dash_table.DataTable(
+                            id=table_id,
+                            columns=[{'name': column, 'id': column} for column in columns],
+                            page_current=0,
+                            page_size=page_size,
+                            page_action='custom',
+                            sort_action='custom',
+                            sort_mode='single',
+                            sort_by=[],
+                            filter_action='custom',
+                            filter_query='',
+                            style_header={'backgroundColor': '#212529', 'color': '#00FFB3',
+                                          'fontWeight': 'bold'},
+                            style_cell={'backgroundColor': '#2c3034', 'color': '#FFFFFF',
+                                        'border': '1px solid #495057'},
+                            style_filter={'backgroundColor': '#16282d', 'color': '#FFFFFF'}
+                        )
+                    ])
+                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 
+                                          'border': '1px solid #FFFFFF'})
+            ], width=12)
+            for title, table_id, columns in tables
+        ])
+    
+    def create_table_page(self, page_data):
+        """Convert one page of holdings into DataTable records"""
+        page_data = page_data.round(2)
+        if 'Purchase_Date' in page_data.columns:
+            page_data = page_data.assign(Purchase_Date=page_data['Purchase_Date'].dt.strftime('%Y-%m-%d'))
+        return page_data.to_dict('records')
+    
+    # DataTable filter query clause: {column} <operator> <value>, where the value
+    # is quoted or runs up to the next '&&'. Only the text right after the
+    # closing brace is read as the operator, so values may contain operators.
+    FILTER_QUERY_CLAUSE = re.compile(
+        r'\s*\{(?P<column>[^}]*)\}\s*(?P<operator>[is]?(?:[<>!]=|[<>=])|[a-z]+)'
+        r'\s*(?P<value>"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`|.*?)\s*(?:&&|$)'
+    )
+    
+    FILTER_QUERY_OPERATORS = {
+        '>=': 'ge', '<=': 'le', '<': 'lt', '>': 'gt', '!=': 'ne', '=': 'eq',
+        'ge': 'ge', 'le': 'le', 'lt': 'lt', 'gt': 'gt', 'ne': 'ne', 'eq': 'eq',
+        'contains': 'contains', 'datestartswith': 'datestartswith'
+    }
+    
+    @classmethod
+    def parse_filter_query(cls, filter_query):
+        """
+        Translate a DataTable filter_query into PortfolioData filters
+        
+        Clauses that can't be parsed, or use an unsupported operator, are dropped.
+        
+        Args:
+            filter_query (str): e.g. '{Security} contains AA && {Return} > 10'
+        
+        Returns:
+            list: (column, operator, value) tuples
+        """
+        filter_query = filter_query or ''
+        filters = []
+        position = 0
+        while position < len(filter_query.rstrip()):
+            match = cls.FILTER_QUERY_CLAUSE.match(filter_query, position)
+            if match is None:
+                next_clause = filter_query.find('&&', position)
+                if next_clause < 0:
+                    break
+                position = next_clause + 2
+                continue
+            position = match.end()
+            
+            operator = match['operator']
+            # Case-sensitive and -insensitive variants, e.g. 'scontains' or 'i='
+            if operator not in cls.FILTER_QUERY_OPERATORS and operator[0] in 'is':
+                operator = operator[1:]
+            if operator not in cls.FILTER_QUERY_OPERATORS:
+                continue
+            
+            value = match['value']
+            if value and len(value) > 1 and value[0] == value[-1] and value[0] in ('"', "'", '`'):
+                value = value[1:-1].replace('\\' + value[0], value[0])
+            else:
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            filters.append((match['column'], cls.FILTER_QUERY_OPERATORS[operator], value))
+        return filters
+    
+    def patch_holdings_tables(self, previous_summary, holdings_summary,
+                              previous_detail, holdings_detail):
+        """
+        Build a Patch that rewrites only the holdings table cells that changed
+        
+        Both snapshots must hold the same rows in the same order, i.e. come
+        from the same portfolio with only prices changed in between.
+        
+        Returns:
+            dash.Patch: Patch for the holdings-tables children, or None if nothing changed
+        """
+        patch = Patch()
+        changed = False
+        tables = [
+            (previous_summary, holdings_summary, self.SUMMARY_TABLE_COLUMNS),
+            (previous_detail, holdings_detail, self.DETAIL_TABLE_COLUMNS)
+        ]
+        for table_index, (previous, current, columns) in enumerate(tables):
+            # Row > Col > Card > CardBody > Div > Table > Tbody
+            tbody = (patch['props']['children'][table_index]['props']['children'][0]
+                          ['props']['children'][1]['props']['children'][0]['props']['children'][0]
+                          ['props']['children'][1]['props']['children'])
+            previous_values = previous[columns].round(2).to_numpy()
+            current_values = current[columns].round(2).to_numpy()
+            for row, column in zip(*np.nonzero(previous_values != current_values)):
+                tbody[int(row)]['props']['children'][int(column)]['props']['children'] = (
+                    current_values[row, column])
+                changed = True
+        return patch if changed else None
+    
+    def _cached_figure(self, chart, cache_key, create, holdings_data):
+        if cache_key is None:
+            return create(holdings_data)
+        return self.figure_cache.get_or_create((chart,) + tuple(cache_key),
+                                               lambda: create(holdings_data))
+    
+    def create_composition_chart(self, holdings_data):
+        """Create portfolio composition pie chart"""
+        fig = go.Figure(
+            go.Pie(labels=holdings_data['Security'].to_numpy(),
+                   values=holdings_data['Market_Value'].to_numpy(),
+                   hovertemplate='Security=%{label}<br>Market_Value=%{value}<extra></extra>'),
+            layout={'template': self._template,
+                    'title': {'text': 'Holdings Distribution'},
+                    'piecolorway': sequential.Bluyl}
+        )
+        fig.update_layout(**self.chart_theme)
+        return fig.to_dict()
+    
+    def create_sector_performance_chart(self, holdings_data, sector_performance=None):
+        """Create sector performance chart, from precomputed sector returns when given"""
+        sector_perf = self._sector_performance(holdings_data, sector_performance)
+        fig = go.Figure(
+            go.Bar(x=sector_perf.index.to_numpy(),
+                   y=sector_perf.to_numpy(),
+                   marker={'color': sequential.Bluyl[0]},
+                   hovertemplate='Sector=%{x}<br>Return=%{y}<extra></extra>'),
+            layout={'template': self._template,
+                    'title': {'text': 'Average Return by Sector'},
+                    'xaxis': {'title': {'text': 'Sector'}},
+                    'yaxis': {'title': {'text': 'Return'}}}
+        )
         fig.update_layout(**self.chart_theme)
-        return fig
+        return fig.to_dict()
+    
+    @staticmethod
+    def _sector_performance(holdings_data, sector_performance=None):
+        if sector_performance is not None:
+            return sector_performance.set_index('Sector')['Return']
+        return holdings_data.groupby('Sector', observed=True)['Return'].mean()
+    
+    def patch_charts(self, previous_data, holdings_data, previous_sector_performance=None,
+                     sector_performance=None):
+        """
+        Build Patches that rewrite only the chart values that changed
+        
+        Both frames must hold the same securities in the same order, i.e.
+        come from the same portfolio with only prices changed in between.
+        Precomputed sector returns are used when given for both versions.
+        
+        Returns:
+            tuple: (composition Patch, sector performance Patch); either is
+                   None if its values did not change
+        """
+        composition = None
+        market_values = holdings_data['Market_Value'].to_numpy()
+        if not np.array_equal(previous_data['Market_Value'].to_numpy(), market_values):
+            composition = Patch()
+            composition['data'][0]['values'] = market_values.tolist()
+        
+        sector_patch = None
+        returns = self._sector_performance(holdings_data, sector_performance).to_numpy()
+        previous_returns = self._sector_performance(previous_data, previous_sector_performance).to_numpy()
+        if not np.array_equal(previous_returns, returns):
+            sector_patch = Patch()
+            sector_patch['data'][0]['y'] = returns.tolist()
+        
+        return composition, sector_patch
 
     def create_strategy_section(self, available_strategies):
         """Create strategy selection and analysis section"""
@@ -215,6 +421,74 @@ class DashboardComponents:
             ], width=12)
         ])
 
+    def create_scenario_section(self, figure):
+        """Create stress scenario section around a heatmap from create_scenario_heatmap"""
+        return dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Stress Scenarios",
+                                 style={'backgroundColor': 'rgba(0,0,0,0)', 
+                                      'border-bottom': '1px solid #FFFFFF', 
+                                      'color': '#00FFB3'}),
+                    dbc.CardBody([
+                        dcc.Graph(id='scenario-heatmap', figure=figure)
+                    ])
+                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
+            ], width=12)
+        ])
+    
+    def create_export_section(self, portfolio, url_prefix='/export'):
+        """Create download links for the selected portfolio's holdings and strategy results"""
+        datasets = [("Holdings", 'holdings_summary'), ("Purchase history", 'holdings_detail'),
+                    ("Strategy results", 'strategies')]
+        formats = [("CSV", 'csv'), ("Parquet", 'parquet'), ("JSON Lines", 'jsonl')]
+        query = f"?{urlencode({'portfolio': portfolio})}&" if portfolio else '?'
+        return dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardHeader("Export",
+                                 style={'backgroundColor': 'rgba(0,0,0,0)', 
+                                      'border-bottom': '1px solid #FFFFFF', 
+                                      'color': '#00FFB3'}),
+                    dbc.CardBody([
+                        html.Div([
+                            html.Span(label, style={'display': 'inline-block', 'width': '10rem'}),
+                            *[html.A(format_label, href=f"{url_prefix}/{dataset}{query}format={fmt}",
+                                     className="btn btn-outline-light btn-sm me-2")
+                              for format_label, fmt in formats]
+                        ], className="mb-2")
+                        for label, dataset in datasets
+                    ])
+                ], className="mb-4", style={'backgroundColor': 'rgba(0,0,0,0)', 'border': '1px solid #FFFFFF'})
+            ], width=12)
+        ])
+    
+    def create_scenario_heatmap(self, scenario_result):
+        """
+        Create scenario x portfolio heatmap of returns, with P&L on hover
+        
+        Args:
+            scenario_result (ScenarioResult): From ScenarioEngine.evaluate
+        """
+        fig = go.Figure(
+            go.Heatmap(z=scenario_result.returns.to_numpy(),
+                       x=scenario_result.returns.columns.to_numpy(),
+                       y=scenario_result.returns.index.to_numpy(),
+                       customdata=scenario_result.pnl.to_numpy(),
+                       colorscale=diverging.RdYlGn, zmid=0,
+                       texttemplate='%{z:.1f}%',
+                       colorbar={'title': {'text': 'Return (%)'}},
+                       hovertemplate='Scenario=%{y}<br>Portfolio=%{x}<br>'
+                                     'P&L=$%{customdata:,.2f}<br>Return=%{z:.2f}%<extra></extra>'),
+            layout={'template': self._template,
+                    'title': {'text': 'Scenario P&L by Portfolio'},
+                    'xaxis': {'title': {'text': 'Portfolio'}},
+                    'yaxis': {'autorange': 'reversed'},
+                    'height': max(300, 60 * len(scenario_result.returns) + 120)}
+        )
+        fig.update_layout(**self.chart_theme)
+        return fig.to_dict()
+    
     def create_strategy_results(self, results):
         """Create strategy results display"""
         return html.Div([
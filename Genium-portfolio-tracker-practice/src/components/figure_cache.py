@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """LRU cache of figure dicts keyed by chart, portfolio and data version"""
+
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key, create):
+        """
+        Return the cached figure for a key, building it on a miss
+
+        Args:
+            key (tuple): e.g. ('sector_performance', portfolio, version)
+            create (callable): Builds the figure dict on a miss
+
+        Returns:
+            dict: Plotly figure dict
+        """
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                return self._figures[key]
+            self.misses += 1
+
+        figure = create()
+        with self._lock:
+            self._figures[key] = figure
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def stats(self):
+        """Get hit/miss counts and the hit rate"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'entries': len(self._figures)
+        }
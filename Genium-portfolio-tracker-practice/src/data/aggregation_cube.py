@@ -0,0 +1,145 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('Portfolio', 'Sector', 'Security')
+
+# Summed at every level. Return is summed for equal-weighted means, and
+# Weighted_Return (Return times Market_Value) for value-weighted means.
+MEASURES = ('Quantity', 'Cost_Basis', 'Market_Value', 'Gain_Loss', 'Return', 'Weighted_Return')
+
+
+class CubeLevel:
+    """Sums of one grouping of the leaf rows, e.g. by (Portfolio, Sector)"""
+
+    def __init__(self, dimensions, leaves):
+        self.dimensions = dimensions
+        if dimensions:
+            self.codes = leaves.groupby(list(dimensions), observed=True, sort=True).ngroup().to_numpy()
+            first_rows = np.unique(self.codes, return_index=True)[1]
+            self.keys = list(leaves[list(dimensions)].iloc[first_rows].itertuples(index=False, name=None))
+        else:
+            self.codes = np.zeros(len(leaves), dtype=np.intp)
+            self.keys = [()]
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+
+        size = len(self.keys)
+        self.counts = np.bincount(self.codes, minlength=size)
+        self.securities = (leaves.groupby(self.codes)['Security'].nunique().reindex(range(size), fill_value=0)
+                           .to_numpy())
+        self.sums = np.zeros((size, len(MEASURES)))
+        self._children = {}  # Dimension dropped -> parent key -> child positions
+
+    def add(self, rows, deltas):
+        np.add.at(self.sums, self.codes[rows], deltas)
+
+    def children(self, dimension, parent_key):
+        """Positions of the cells that share parent_key on every other dimension"""
+        index = self.dimensions.index(dimension)
+        by_parent = self._children.get(dimension)
+        if by_parent is None:
+            by_parent = {}
+            for position, key in enumerate(self.keys):
+                by_parent.setdefault(key[:index] + key[index + 1:], []).append(position)
+            by_parent = self._children[dimension] = {
+                key: np.array(positions, dtype=np.intp) for key, positions in by_parent.items()}
+        return by_parent.get(parent_key, np.array([], dtype=np.intp))
+
+
+class AggregationCube:
+    """
+    Precomputed rollups of the aggregated holdings over every combination
+    of Portfolio, Sector and Security
+
+    Every level keeps the sums of MEASURES, the number of positions and the
+    number of distinct securities per cell, so a rollup such as a
+    portfolio's sector totals is a dictionary lookup rather than a groupby.
+    Price changes are applied as deltas to the changed leaf rows and their
+    ancestors only.
+    """
+
+    def __init__(self, leaves):
+        """
+        Args:
+            leaves (pd.DataFrame): One row per portfolio, security and sector,
+                                   i.e. PortfolioData.aggregated_holdings
+        """
+        self.levels = {
+            dimensions: CubeLevel(dimensions, leaves)
+            for size in range(len(DIMENSIONS) + 1) for dimensions in combinations(DIMENSIONS, size)
+        }
+        self.values = np.zeros((len(leaves), len(MEASURES)))
+        self.update(np.arange(len(leaves)), leaves)
+
+    def update(self, rows, leaves):
+        """Fold the current values of the given leaf rows into every level"""
+        if len(rows) == 0:
+            return
+        values = self._leaf_values(leaves.iloc[rows])
+        deltas = values - self.values[rows]
+        self.values[rows] = values
+        for level in self.levels.values():
+            level.add(rows, deltas)
+
+    def get(self, portfolio=None, sector=None, security=None):
+        """
+        Totals of one cell; a dimension left as None is rolled up
+
+        Returns:
+            dict: Sums of MEASURES, plus 'count' (positions) and 'securities'
+                  (distinct securities). All zero for a cell with no holdings.
+        """
+        dimensions, key = self._select(Portfolio=portfolio, Sector=sector, Security=security)
+        level = self.levels[dimensions]
+        position = level.positions.get(key)
+        if position is None:
+            return {**dict.fromkeys(MEASURES, 0.0), 'count': 0, 'securities': 0}
+        return {**dict(zip(MEASURES, level.sums[position].tolist())),
+                'count': int(level.counts[position]), 'securities': int(level.securities[position])}
+
+    def breakdown(self, by, portfolio=None, sector=None, security=None):
+        """
+        Totals per value of one dimension within a cell, e.g. the sectors of a portfolio
+
+        Returns:
+            pd.DataFrame: One row per value of `by`, in sorted order, with the
+                          sums of MEASURES, 'count' and 'securities'
+        """
+        if by not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension: {by}")
+        fixed, key = self._select(Portfolio=portfolio, Sector=sector, Security=security)
+        if by in fixed:
+            raise ValueError(f"Cannot break down by {by} within a single {by}")
+
+        dimensions = tuple(dimension for dimension in DIMENSIONS if dimension in fixed or dimension == by)
+        level = self.levels[dimensions]
+        positions = level.children(by, key)
+        index = dimensions.index(by)
+        sums = level.sums[positions]
+        return pd.DataFrame({
+            by: [level.keys[position][index] for position in positions],
+            **{measure: sums[:, column] for column, measure in enumerate(MEASURES)},
+            'count': level.counts[positions],
+            'securities': level.securities[positions]
+        })
+
+    @staticmethod
+    def _leaf_values(leaves):
+        market_value = leaves['Market_Value'].to_numpy(dtype=np.float64)
+        # Positions without a cost basis have no return and are left out of the return sums
+        returns = np.nan_to_num(leaves['Return'].to_numpy(dtype=np.float64))
+        return np.column_stack([
+            leaves['Quantity'].to_numpy(dtype=np.float64),
+            leaves['Cost_Basis'].to_numpy(dtype=np.float64),
+            market_value,
+            leaves['Gain_Loss'].to_numpy(dtype=np.float64),
+            returns,
+            returns * market_value
+        ])
+
+    @staticmethod
+    def _select(**values):
+        """Level and key of the dimensions that have a value"""
+        dimensions = tuple(dimension for dimension in DIMENSIONS if values[dimension] is not None)
+        return dimensions, tuple(values[dimension] for dimension in dimensions)
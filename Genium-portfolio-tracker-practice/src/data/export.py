@@ -0,0 +1,288 @@
+"""
+Streaming bulk export of holdings and strategy results
+
+Holdings are written one file per portfolio and dataset, several portfolios
+at a time, and every file is encoded chunk by chunk so memory stays flat
+however large the book is. Run the nightly extract from the src directory:
+
+    python -m data.export extracts/ --format parquet --compression zstd
+"""
+import argparse
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Dataset name -> holdings view passed to PortfolioData.iter_holdings, None for strategy results
+EXPORT_DATASETS = {
+    'holdings_summary': 'summary',
+    'holdings_detail': 'detail',
+    'strategies': None
+}
+
+EXPORT_FORMATS = {'csv': '.csv', 'parquet': '.parquet', 'jsonl': '.jsonl'}
+
+EXPORT_MIMETYPES = {'csv': 'text/csv', 'parquet': 'application/vnd.apache.parquet', 'jsonl': 'application/jsonl'}
+
+# Codecs accepted by pyarrow. CSV and JSON Lines are compressed as a whole
+# stream and get the extension; Parquet compresses its column chunks instead.
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'bz2': '.bz2', 'zstd': '.zst', 'lz4': '.lz4', 'brotli': '.br'}
+
+
+class _ByteSink:
+    """Write-only file object whose bytes are handed on after every chunk"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def check_format(fmt, compression=None):
+    """Raise ValueError for a format or compression the exporter can't write"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if fmt == 'parquet' and compression == 'bz2':
+        raise ValueError("Parquet doesn't support bz2 compression")
+
+
+def export_filename(name, fmt, compression=None):
+    """File name for an export, e.g. holdings_detail.csv.gz"""
+    extension = EXPORT_FORMATS[fmt]
+    if compression and fmt != 'parquet':
+        extension += COMPRESSION_EXTENSIONS[compression]
+    return re.sub(r'[^\w.-]+', '_', str(name)) + extension
+
+
+def encode_chunks(chunks, fmt='csv', compression=None):
+    """
+    Encode frames as one CSV, Parquet or JSON Lines stream
+
+    Args:
+        chunks (iterable): pd.DataFrame chunks with the same columns. At least
+                           one is needed for CSV and Parquet to know the schema.
+        fmt (str): One of EXPORT_FORMATS
+        compression (str): One of COMPRESSION_EXTENSIONS, or None
+
+    Yields:
+        bytes: The encoded stream, a piece after every chunk
+    """
+    # pyarrow is only imported when something is actually exported
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    check_format(fmt, compression)
+    sink = _ByteSink()
+    stream = pa.PythonFile(sink, mode='w')
+    if compression and fmt != 'parquet':
+        stream = pa.CompressedOutputStream(stream, compression)
+
+    writer = None
+    for chunk in chunks:
+        if fmt == 'jsonl':
+            if len(chunk):
+                stream.write(chunk.to_json(orient='records', lines=True, date_format='iso').encode())
+                stream.write(b'\n')
+        else:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = (pq.ParquetWriter(stream, table.schema, compression=compression or 'snappy')
+                          if fmt == 'parquet' else pa_csv.CSVWriter(stream, table.schema))
+            writer.write_table(table)
+        yield sink.drain()
+
+    if writer is not None:
+        writer.close()
+    stream.close()
+    yield sink.drain()
+
+
+def _json_default(value):
+    """Encode NumPy scalars and other leftovers in strategy metrics"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+class Exporter:
+    """Writes holdings and strategy results of every portfolio as CSV, Parquet or JSON Lines"""
+
+    def __init__(self, portfolio_data, strategies=None, chunk_size=100000, max_workers=None):
+        """
+        Args:
+            portfolio_data (PortfolioData): Book to export
+            strategies (dict): Strategy id to strategy instance, for the strategies dataset
+            chunk_size (int): Rows encoded at a time
+            max_workers (int): Files written at once, by default one per CPU
+        """
+        self.portfolio_data = portfolio_data
+        self.strategies = strategies or {}
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count()
+
+    def iter_dataset(self, dataset, portfolio=None):
+        """
+        Yield a dataset in chunks
+
+        Strategy results are one row per portfolio and strategy, with the
+        metrics as a JSON string. Strategies analyze every portfolio in one
+        analyze_many call and each yields one chunk.
+        """
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        view = EXPORT_DATASETS[dataset]
+        if view is not None:
+            yield from self.portfolio_data.iter_holdings(view, portfolio, self.chunk_size)
+            return
+
+        # A copy, so live price updates can't change it while the strategies run
+        with self.portfolio_data.lock:
+            holdings = self.portfolio_data.get_holdings_summary(portfolio).copy()
+        columns = ['Portfolio', 'Strategy', 'Summary', 'Recommendations', 'Metrics']
+        if not self.strategies:
+            yield pd.DataFrame(columns=columns, dtype='string')
+        for strategy_id, strategy in self.strategies.items():
+            results = strategy.analyze_many(holdings, by='Portfolio')
+            # String dtype keeps the schema the same when a strategy has no results
+            yield pd.DataFrame([
+                [str(group), strategy_id, result['summary'], '\n'.join(result['recommendations']),
+                 json.dumps(result['metrics'], default=_json_default)]
+                for group, result in results.items()
+            ], columns=columns, dtype='string')
+
+    def stream(self, dataset, portfolio=None, fmt='csv', compression=None):
+        """
+        Encode a dataset for a streamed download
+
+        Arguments are checked right away, so errors surface before the first byte is sent.
+
+        Returns:
+            generator: bytes, a piece after every chunk
+        """
+        if dataset not in EXPORT_DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        check_format(fmt, compression)
+        return encode_chunks(self.iter_dataset(dataset, portfolio), fmt, compression)
+
+    def export(self, directory, datasets=tuple(EXPORT_DATASETS), portfolios=None, fmt='csv', compression=None):
+        """
+        Write datasets to files, several portfolios at once
+
+        Holdings go to <directory>/<dataset>/<portfolio>.<ext> and strategy
+        results of all portfolios to <directory>/strategies.<ext>. Each file
+        is written under a temporary name and renamed when complete.
+
+        Args:
+            directory (str): Output directory, created if missing
+            datasets (iterable): Names from EXPORT_DATASETS
+            portfolios (list): Portfolios to export, all of them by default
+            fmt (str): One of EXPORT_FORMATS
+            compression (str): One of COMPRESSION_EXTENSIONS, or None
+
+        Returns:
+            list: Paths written
+        """
+        check_format(fmt, compression)
+        unknown = set(datasets) - set(EXPORT_DATASETS)
+        if unknown:
+            raise ValueError(f"Unknown dataset: {', '.join(sorted(unknown))}")
+        portfolios = portfolios or self.portfolio_data.get_portfolios()
+
+        jobs = []
+        for dataset in datasets:
+            if EXPORT_DATASETS[dataset] is None:
+                jobs.append((dataset, None, os.path.join(directory, export_filename(dataset, fmt, compression))))
+            else:
+                os.makedirs(os.path.join(directory, dataset), exist_ok=True)
+                jobs.extend((dataset, portfolio, os.path.join(directory, dataset,
+                                                              export_filename(portfolio, fmt, compression)))
+                            for portfolio in portfolios)
+        os.makedirs(directory, exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._write, path, dataset, portfolio, fmt, compression)
+                       for dataset, portfolio, path in jobs]
+            return [future.result() for future in futures]
+
+    def _write(self, path, dataset, portfolio, fmt, compression):
+        """Encode one dataset into a file"""
+        partial = path + '.partial'
+        try:
+            with open(partial, 'wb') as file:
+                for data in self.stream(dataset, portfolio, fmt, compression):
+                    file.write(data)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        return path
+
+
+def main():
+    """Export holdings and strategy results of every portfolio"""
+    from analytics.strategy_factory import StrategyFactory
+
+    from .holdings_sources import open_holdings_source
+    from .portfolio_data import PortfolioData
+    from .price_cache import CachedPriceProvider
+    from .price_providers import YFinancePriceProvider
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('directory')
+    parser.add_argument('--datasets', nargs='+', choices=list(EXPORT_DATASETS), default=list(EXPORT_DATASETS))
+    parser.add_argument('--format', choices=list(EXPORT_FORMATS), default='csv')
+    parser.add_argument('--compression', choices=list(COMPRESSION_EXTENSIONS))
+    parser.add_argument('--holdings', default=os.environ.get('HOLDINGS_SOURCE'))
+    parser.add_argument('--portfolios', default=os.environ.get('HOLDINGS_PORTFOLIOS'))
+    parser.add_argument('--strategies', nargs='+', choices=list(StrategyFactory.get_available_strategies()),
+                        default=list(StrategyFactory.get_available_strategies()))
+    parser.add_argument('--chunk-size', type=int, default=100000)
+    parser.add_argument('--workers', type=int, help='files written at once, one per CPU by default')
+    args = parser.parse_args()
+
+    price_provider = CachedPriceProvider(
+        YFinancePriceProvider(),
+        ttl=float(os.environ.get('PRICE_CACHE_TTL', 300)),
+        path=os.environ.get('PRICE_CACHE_PATH', 'price_cache.sqlite')
+    )
+    portfolio_data = PortfolioData(
+        price_provider=price_provider,
+        holdings_source=open_holdings_source(args.holdings) if args.holdings else None,
+        portfolios=args.portfolios.split(',') if args.portfolios else None,
+        compact=bool(os.environ.get('HOLDINGS_COMPACT'))
+    )
+    exporter = Exporter(portfolio_data,
+                        strategies={strategy_id: StrategyFactory.create_strategy(strategy_id)
+                                    for strategy_id in args.strategies},
+                        chunk_size=args.chunk_size, max_workers=args.workers)
+    paths = exporter.export(args.directory, args.datasets, fmt=args.format, compression=args.compression)
+    print(f"Wrote {len(paths)} files to {args.directory}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import functools
+import operator
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import closing
+
+import pandas as pd
+
+HOLDINGS_COLUMNS = ['Portfolio', 'Security', 'Purchase_Date', 'Quantity', 'Purchase_Price', 'Sector']
+
+HOLDINGS_DTYPES = {
+    'Portfolio': 'category',
+    'Security': 'category',
+    'Quantity': 'int64',
+    'Purchase_Price': 'float64',
+    'Sector': 'category'
+}
+
+
+def normalize_holdings(frame):
+    """Give a frame of lots the standard column order and typed columns"""
+    frame = frame[HOLDINGS_COLUMNS].astype(HOLDINGS_DTYPES)
+    frame['Purchase_Date'] = pd.to_datetime(frame['Purchase_Date'])
+    for column in ['Portfolio', 'Security', 'Sector']:
+        frame[column] = frame[column].cat.remove_unused_categories()
+    return frame.reset_index(drop=True)
+
+
+def _portfolio_filter(portfolios):
+    """Arrow filter on Portfolio, built from equality tests so row groups can be pruned by statistics"""
+    import pyarrow.dataset as ds
+    return functools.reduce(operator.or_, [ds.field('Portfolio') == portfolio for portfolio in portfolios],
+                            ds.scalar(False))
+
+
+def compact_holdings(frame):
+    """Downcast the numeric lot columns to the smallest dtypes that hold their values"""
+    frame = frame.copy()
+    frame['Quantity'] = pd.to_numeric(frame['Quantity'], downcast='integer')
+    # Prices stay float64 so cost basis remains exact to the cent
+    return frame
+
+
+class BaseHoldingsSource(ABC):
+    """Base class for all holdings sources"""
+
+    @abstractmethod
+    def load(self, portfolios=None):
+        """
+        Load purchase lots
+
+        Args:
+            portfolios (list): Only load lots of these portfolios. The filter
+                               is pushed down to the storage layer where the
+                               backend supports it. Loads everything if None.
+
+        Returns:
+            pd.DataFrame: Lots with the HOLDINGS_COLUMNS, typed as HOLDINGS_DTYPES
+        """
+        pass
+
+    def write(self, holdings):
+        """Store purchase lots, replacing what the source holds"""
+        raise NotImplementedError(f"{type(self).__name__} is read-only")
+
+
+class SampleHoldingsSource(BaseHoldingsSource):
+    """Built-in sample book with multiple portfolios and purchase history"""
+
+    def load(self, portfolios=None):
+        holdings = pd.DataFrame({
+            'Portfolio': [
+                'Growth', 'Growth', 'Growth', 'Growth', 'Growth', 'Growth',
+                'Income', 'Income', 'Income', 'Income', 'Income', 'Income',
+                'Speculative', 'Speculative', 'Speculative', 'Speculative', 'Speculative', 'Speculative'
+            ],
+            'Security': [
+                'AAPL', 'AAPL', 'GOOGL', 'META', 'NVDA', 'NFLX',            # Growth
+                'MSFT', 'JNJ', 'PEP', 'PG', 'T', 'VZ',                       # Income
+                'TSLA', 'AMZN', 'RIVN', 'SPCE', 'PLTR', 'BYND'              # Speculative
+            ],
+            'Purchase_Date': [
+                '2023-01-15', '2023-06-20', '2023-03-10', '2023-07-12', '2023-02-25', '2023-04-18',   # Growth
+                '2023-02-01', '2023-05-20', '2023-09-15', '2023-08-12', '2023-06-05', '2023-03-22',   # Income
+                '2023-04-01', '2023-05-15', '2023-07-01', '2023-09-07', '2023-10-02', '2023-08-11'    # Speculative
+            ],
+            'Quantity': [
+                50, 50, 50, 40, 75, 30,           # Growth
+                50, 100, 80, 60, 200, 120,        # Income
+                150, 25, 60, 500, 300, 80         # Speculative
+            ],
+            'Purchase_Price': [
+                150.2, 175.5, 250.5, 320.7, 180.3, 450.6,        # Growth
+                100.2, 175.8, 160.4, 143.2, 27.5, 35.1,          # Income
+                150.5, 500.8, 70.2, 6.5, 22.3, 105.5             # Speculative
+            ],
+            'Sector': [
+                'Technology', 'Technology', 'Technology', 'Technology', 'Technology', 'Entertainment',  # Growth
+                'Technology', 'Healthcare', 'Consumer', 'Consumer', 'Telecom', 'Telecom',              # Income
+                'Automotive', 'Consumer', 'Automotive', 'Aerospace', 'Technology', 'Consumer'         # Speculative
+            ]
+        })
+        if portfolios is not None:
+            holdings = holdings[holdings['Portfolio'].isin(portfolios)]
+        return normalize_holdings(holdings)
+
+
+class DataFrameHoldingsSource(BaseHoldingsSource):
+    """Holdings already in memory, e.g. generated or built by another tool"""
+
+    def __init__(self, holdings):
+        self.holdings = holdings
+
+    def load(self, portfolios=None):
+        holdings = self.holdings
+        if portfolios is not None:
+            holdings = holdings[holdings['Portfolio'].isin(portfolios)]
+        return normalize_holdings(holdings)
+
+    def write(self, holdings):
+        self.holdings = holdings
+
+
+class ParquetHoldingsSource(BaseHoldingsSource):
+    """Parquet file, sorted by portfolio so row-group statistics can skip other portfolios"""
+
+    def __init__(self, path, row_group_size=100000):
+        self.path = path
+        self.row_group_size = row_group_size
+
+    def load(self, portfolios=None):
+        # pyarrow is only imported when a file-backed source is actually read
+        import pyarrow.dataset as ds
+        filter_expression = _portfolio_filter(portfolios) if portfolios is not None else None
+        table = ds.dataset(self.path, format='parquet').to_table(columns=HOLDINGS_COLUMNS,
+                                                                 filter=filter_expression)
+        return normalize_holdings(table.to_pandas())
+
+    def write(self, holdings):
+        # Portfolio is stored as plain strings: Arrow can't prune dictionary columns by statistics
+        holdings = normalize_holdings(holdings).sort_values('Portfolio', kind='stable')
+        holdings.astype({'Portfolio': str}).to_parquet(self.path, index=False,
+                                                       row_group_size=self.row_group_size)
+
+
+class FeatherHoldingsSource(BaseHoldingsSource):
+    """Uncompressed Feather (Arrow IPC) file, memory-mapped on load"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self, portfolios=None):
+        import pyarrow.dataset as ds
+        from pyarrow import fs
+        dataset = ds.dataset(self.path, format='ipc', filesystem=fs.LocalFileSystem(use_mmap=True))
+        filter_expression = _portfolio_filter(portfolios) if portfolios is not None else None
+        table = dataset.to_table(columns=HOLDINGS_COLUMNS, filter=filter_expression)
+        return normalize_holdings(table.to_pandas())
+
+    def write(self, holdings):
+        normalize_holdings(holdings).to_feather(self.path, compression='uncompressed')
+
+
+class SQLiteHoldingsSource(BaseHoldingsSource):
+    """Table of lots in a SQLite database, indexed by portfolio"""
+
+    def __init__(self, path, table='holdings'):
+        self.path = path
+        self.table = table
+
+    def load(self, portfolios=None):
+        query = f"SELECT {', '.join(HOLDINGS_COLUMNS)} FROM {self.table}"
+        params = []
+        if portfolios is not None:
+            portfolios = list(portfolios)
+            query += f" WHERE Portfolio IN ({', '.join('?' * len(portfolios))})"
+            params = portfolios
+
+        with closing(sqlite3.connect(self.path)) as connection:
+            holdings = pd.read_sql_query(query, connection, params=params)
+        return normalize_holdings(holdings)
+
+    def write(self, holdings):
+        holdings = normalize_holdings(holdings)
+        holdings['Purchase_Date'] = holdings['Purchase_Date'].dt.strftime('%Y-%m-%d')
+
+        with closing(sqlite3.connect(self.path)) as connection, connection:
+            holdings.astype({'Portfolio': str, 'Security': str, 'Sector': str}).to_sql(
+                self.table, connection, if_exists='replace', index=False, chunksize=100000)
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_portfolio ON {self.table} (Portfolio)")
+
+
+def open_holdings_source(path):
+    """Pick a holdings source for a file by its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        return ParquetHoldingsSource(path)
+    if extension in ('.feather', '.arrow'):
+        return FeatherHoldingsSource(path)
+    if extension in ('.sqlite', '.db'):
+        return SQLiteHoldingsSource(path)
+    raise ValueError(f"Unsupported holdings file: {path}")
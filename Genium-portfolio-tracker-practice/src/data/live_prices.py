@@ -0,0 +1,84 @@
+import threading
+import time
+
+import numpy as np
+
+from .price_providers import BasePriceProvider
+
+
+class SimulatedTickProvider(BasePriceProvider):
+    """Local random-walk price feed for running live mode offline"""
+
+    def __init__(self, prices, volatility=0.001, tick_fraction=0.2, seed=None):
+        self.prices = {ticker: float(price) for ticker, price in prices.items()}
+        self.volatility = volatility
+        self.tick_fraction = tick_fraction
+        self._rng = np.random.default_rng(seed)
+
+    def get_prices(self, tickers):
+        tickers = [ticker for ticker in tickers if ticker in self.prices]
+        if not tickers:
+            return {}
+
+        # Only a fraction of the book ticks on each poll, like a real feed
+        n_ticks = max(1, int(len(tickers) * self.tick_fraction))
+        ticking = self._rng.choice(len(tickers), n_ticks, replace=False)
+        moves = np.exp(self._rng.normal(0, self.volatility, n_ticks))
+
+        for index, move in zip(ticking, moves):
+            ticker = tickers[index]
+            self.prices[ticker] = round(self.prices[ticker] * move, 4)
+        return {tickers[index]: self.prices[tickers[index]] for index in ticking}
+
+
+class LivePriceUpdater:
+    """
+    Background worker that polls a price provider and applies deltas
+
+    Each poll goes through PortfolioData.apply_price_updates, so only the
+    rows of tickers that moved are recomputed and the data version is bumped
+    only when something changed.
+    """
+
+    def __init__(self, portfolio_data, provider, interval=1.0):
+        self.portfolio_data = portfolio_data
+        self.provider = provider
+        self.interval = interval
+        self.polls = 0
+        self.ticks_applied = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='live-prices', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop polling and wait for the worker to exit"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poll(self):
+        """Fetch one round of prices and apply them, returning the tickers that changed"""
+        tickers = list(self.portfolio_data.get_tickers())
+        try:
+            prices = self.provider.get_prices(tickers)
+        except Exception as e:
+            print(f"Error polling live prices: {e}")
+            return []
+
+        changed = self.portfolio_data.apply_price_updates(prices)
+        self.polls += 1
+        self.ticks_applied += len(changed)
+        return changed
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            self.poll()
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
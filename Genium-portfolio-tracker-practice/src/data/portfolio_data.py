@@ -1,73 +1,191 @@
+import threading
+import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import datetime
+from .aggregation_cube import AggregationCube
+from .holdings_sources import HOLDINGS_COLUMNS, DataFrameHoldingsSource, SampleHoldingsSource, compact_holdings
+from .price_providers import YFinancePriceProvider
+
+# Server-side filter operators, as emitted by dash_table.DataTable filter queries
+FILTER_OPERATORS = {
+    'eq': lambda column, value: column == value,
+    'ne': lambda column, value: column != value,
+    'gt': lambda column, value: column > value,
+    'ge': lambda column, value: column >= value,
+    'lt': lambda column, value: column < value,
+    'le': lambda column, value: column <= value,
+    'contains': lambda column, value: column.astype(str).str.contains(str(value), case=False, regex=False),
+    'datestartswith': lambda column, value: column.astype(str).str.startswith(str(value))
+}
+
+def _filter_mask(column, operator, value):
+    """
+    Rows of a column matching one filter, or None if the value can't be compared with the column
+
+    Numbers are compared as numbers and dates as dates; text and categorical
+    columns are compared as strings, so order comparisons work on them too.
+    """
+    text = f"{value:g}" if isinstance(value, float) else str(value)
+    if operator in ('contains', 'datestartswith'):
+        return FILTER_OPERATORS[operator](column, text)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        try:
+            value = pd.Timestamp(text)
+        except ValueError:
+            return None
+        if pd.isna(value):
+            return None
+    elif pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+    else:
+        column, value = column.astype(str), text
+    return FILTER_OPERATORS[operator](column, value)
 
 class PortfolioData:
-    def __init__(self):
-        # Sample data structure with multiple portfolios and purchase history
-        self.holdings = pd.DataFrame({
-            'Portfolio': [
-                'Growth', 'Growth', 'Growth', 'Growth', 'Growth', 'Growth',
-                'Income', 'Income', 'Income', 'Income', 'Income', 'Income',
-                'Speculative', 'Speculative', 'Speculative', 'Speculative', 'Speculative', 'Speculative'
-            ],
-            'Security': [
-                'AAPL', 'AAPL', 'GOOGL', 'META', 'NVDA', 'NFLX',            # Growth
-                'MSFT', 'JNJ', 'PEP', 'PG', 'T', 'VZ',                       # Income
-                'TSLA', 'AMZN', 'RIVN', 'SPCE', 'PLTR', 'BYND'              # Speculative
-            ],
-            'Purchase_Date': [
-                '2023-01-15', '2023-06-20', '2023-03-10', '2023-07-12', '2023-02-25', '2023-04-18',   # Growth
-                '2023-02-01', '2023-05-20', '2023-09-15', '2023-08-12', '2023-06-05', '2023-03-22',   # Income
-                '2023-04-01', '2023-05-15', '2023-07-01', '2023-09-07', '2023-10-02', '2023-08-11'    # Speculative
-            ],
-            'Quantity': [
-                50, 50, 50, 40, 75, 30,           # Growth
-                50, 100, 80, 60, 200, 120,        # Income
-                150, 25, 60, 500, 300, 80         # Speculative
-            ],
-            'Purchase_Price': [
-                150.2, 175.5, 250.5, 320.7, 180.3, 450.6,        # Growth
-                100.2, 175.8, 160.4, 143.2, 27.5, 35.1,          # Income
-                150.5, 500.8, 70.2, 6.5, 22.3, 105.5             # Speculative
-            ],
-            'Sector': [
-                'Technology', 'Technology', 'Technology', 'Technology', 'Technology', 'Entertainment',  # Growth
-                'Technology', 'Healthcare', 'Consumer', 'Consumer', 'Telecom', 'Telecom',              # Income
-                'Automotive', 'Consumer', 'Automotive', 'Aerospace', 'Technology', 'Consumer'         # Speculative
-            ]
-        })
-        
-        # Convert date string to datetime
-        self.holdings['Purchase_Date'] = pd.to_datetime(self.holdings['Purchase_Date'])
-        
-        # Calculate cost basis for each purchase
-        self.holdings['Cost_Basis'] = self.holdings['Quantity'] * self.holdings['Purchase_Price']
-        
-        self.update_prices()
-    
-    def update_prices(self):
-        """Update current prices using yfinance"""
-        unique_tickers = self.holdings['Security'].unique()
-        current_prices = {}
+    def __init__(self, price_provider=None, holdings=None, holdings_source=None, portfolios=None,
+                 compact=False, defer_prices=False):
+        """
+        Args:
+            price_provider (BasePriceProvider): Source of current prices, yfinance by default
+            holdings (pd.DataFrame): Purchase lots to use directly
+            holdings_source (BaseHoldingsSource): Where to load lots from when
+                                                  holdings isn't given, the sample book by default
+            portfolios (list): Only load these portfolios from the holdings source
+            compact (bool): Keep lots in a compact layout: downcast numeric
+                            columns, and price-dependent columns computed per
+                            portfolio on demand instead of stored for every lot
+            defer_prices (bool): Start from cached or sample prices and fetch
+                                 current prices on a background thread, so the
+                                 constructor never waits on the price feed
+        """
+        self.price_provider = price_provider or YFinancePriceProvider()
+        self.version = 0  # Bumped whenever prices or holdings change
+        self.lock = threading.RLock()  # Held while prices are written, for consistent reads
+        self.prices_loaded = threading.Event()  # Set once prices have come from the provider
+        
+        if holdings is not None:
+            holdings_source = DataFrameHoldingsSource(holdings)
+        self.holdings_source = holdings_source or SampleHoldingsSource()
+        self.holdings = self.holdings_source.load(portfolios)
+        
+        self.compact = compact
+        if compact:
+            self.holdings = compact_holdings(self.holdings)
+        
+        if defer_prices:
+            self.update_prices(cached_only=True)
+            self.load_prices_in_background()
+        else:
+            self.update_prices()
+    
+    def update_prices(self, cached_only=False):
+        """
+        Update current prices from the price provider
+        
+        Args:
+            cached_only (bool): Only use prices the provider already holds
+                                locally, without any network request
+        """
+        unique_tickers = list(self.holdings['Security'].unique())
+        
+        try:
+            if cached_only:
+                current_prices = self.price_provider.get_cached_prices(unique_tickers)
+            else:
+                current_prices = self.price_provider.get_prices(unique_tickers)
+        except Exception as e:
+            print(f"Error fetching prices: {e}")
+            current_prices = {}
         
         for ticker in unique_tickers:
-            try:
-                stock = yf.Ticker(ticker)
-                current_price = stock.info.get('regularMarketPrice', None)
-                
-                if current_price is None:
-                    historical_data = stock.history(period='1d')
-                    current_price = historical_data['Close'].iloc[-1] if not historical_data.empty else 0
-                
-                current_prices[ticker] = current_price
-            except Exception as e:
-                print(f"Error fetching data for {ticker}: {e}")
+            if current_prices.get(ticker) is None:
                 current_prices[ticker] = self._get_sample_price(ticker)
         
-        # Add current prices to holdings
-        self.holdings['Current_Price'] = self.holdings['Security'].map(current_prices)
-        self._calculate_metrics()
+        with self.lock:
+            self._current_prices = {ticker: float(current_prices[ticker]) for ticker in unique_tickers}
+            self._calculate_metrics()
+        if not cached_only:
+            self.prices_loaded.set()
+    
+    def load_prices_in_background(self):
+        """
+        Fetch current prices on a background thread
+        
+        Fetched prices go through apply_price_updates, so only the tickers
+        whose price moved are recomputed and the version is bumped for open
+        dashboards to pick up. prices_loaded is set when the fetch finishes.
+        
+        Returns:
+            threading.Thread: The loading thread
+        """
+        thread = threading.Thread(target=self._load_prices, name='price-loader', daemon=True)
+        thread.start()
+        return thread
+    
+    def _load_prices(self):
+        try:
+            prices = self.price_provider.get_prices(self.get_tickers())
+        except Exception as e:
+            print(f"Error fetching prices: {e}")
+            prices = {}
+        try:
+            self.apply_price_updates(prices)
+        finally:
+            self.prices_loaded.set()
+    
+    def apply_price_updates(self, prices):
+        """
+        Apply new prices for a subset of tickers without a full rebuild
+        
+        Only the lot rows and aggregated rows of the changed tickers are
+        touched, located through the ticker index maps built by
+        _calculate_metrics.
+        
+        Args:
+            prices (dict): Mapping of ticker to new price
+        
+        Returns:
+            list: Tickers whose price actually changed
+        """
+        with self.lock:
+            changed = {
+                ticker: float(price) for ticker, price in prices.items()
+                if price is not None and ticker in self._current_prices
+                and self._current_prices[ticker] != float(price)
+            }
+            if not changed:
+                return []
+            
+            if not self.compact:
+                self._update_rows(self.holdings, self._ticker_rows, changed)
+            self._update_rows(self.aggregated_holdings, self._ticker_agg_rows, changed)
+            self._current_prices.update(changed)
+            
+            affected_rows = np.concatenate([self._ticker_agg_rows[ticker] for ticker in changed])
+            self.cube.update(affected_rows, self.aggregated_holdings)
+            self._invalidate(set(self.aggregated_holdings['Portfolio'].to_numpy()[affected_rows]))
+            return list(changed)
+    
+    @staticmethod
+    def _update_rows(frame, ticker_rows, prices):
+        """Recompute price-dependent columns for the rows of the given tickers"""
+        rows = np.concatenate([ticker_rows[ticker] for ticker in prices])
+        new_prices = np.concatenate([
+            np.full(len(ticker_rows[ticker]), price) for ticker, price in prices.items()
+        ])
+        
+        market_value = frame['Quantity'].to_numpy()[rows] * new_prices
+        cost_basis = frame['Cost_Basis'].to_numpy()[rows]
+        gain_loss = market_value - cost_basis
+        
+        columns = [frame.columns.get_loc(column)
+                   for column in ['Current_Price', 'Market_Value', 'Gain_Loss', 'Return']]
+        frame.iloc[rows, columns] = np.column_stack([
+            new_prices, market_value, gain_loss, np.round(gain_loss / cost_basis * 100, 2)
+        ])
     
     def _get_sample_price(self, ticker):
         """Fallback sample prices"""
@@ -80,14 +198,27 @@ class PortfolioData:
         }
         return sample_prices.get(ticker, 0)
     
+    def _with_metrics(self, lots, prices=None):
+        """Add cost basis and the price-dependent columns to a frame of lots, at current prices by default"""
+        lots = lots[HOLDINGS_COLUMNS].copy()
+        # Widen compact quantities so aggregated sums can't overflow
+        lots['Quantity'] = lots['Quantity'].astype(np.int64)
+        quantity = lots['Quantity'].to_numpy(dtype=np.float64)
+        lots['Cost_Basis'] = quantity * lots['Purchase_Price'].to_numpy(dtype=np.float64)
+        lots['Current_Price'] = lots['Security'].map(self._current_prices if prices is None else prices).astype(float)
+        lots['Market_Value'] = quantity * lots['Current_Price']
+        lots['Gain_Loss'] = lots['Market_Value'] - lots['Cost_Basis']
+        lots['Return'] = (lots['Gain_Loss'] / lots['Cost_Basis'] * 100).round(2)
+        return lots
+    
     def _calculate_metrics(self):
         """Calculate portfolio metrics"""
-        self.holdings['Market_Value'] = self.holdings['Quantity'] * self.holdings['Current_Price']
-        self.holdings['Gain_Loss'] = self.holdings['Market_Value'] - self.holdings['Cost_Basis']
-        self.holdings['Return'] = (self.holdings['Gain_Loss'] / self.holdings['Cost_Basis'] * 100).round(2)
+        lots = self._with_metrics(self.holdings)
+        if not self.compact:
+            self.holdings = lots
         
         # Calculate aggregated holdings by security and portfolio
-        self.aggregated_holdings = self.holdings.groupby(['Portfolio', 'Security', 'Sector']).agg({
+        self.aggregated_holdings = lots.groupby(['Portfolio', 'Security', 'Sector'], observed=True).agg({
             'Quantity': 'sum',
             'Cost_Basis': 'sum',
             'Market_Value': 'sum',
@@ -102,41 +233,242 @@ class PortfolioData:
         self.aggregated_holdings['Average_Cost'] = (
             self.aggregated_holdings['Cost_Basis'] / self.aggregated_holdings['Quantity']
         ).round(2)
+        
+        # Rollups by portfolio, sector and security, kept current by apply_price_updates
+        self.cube = AggregationCube(self.aggregated_holdings)
+        
+        self._build_indexes()
+        self._invalidate()
+    
+    def _build_indexes(self):
+        """Build row-position maps per ticker and per portfolio"""
+        # Used by apply_price_updates to touch only the changed tickers.
+        # Compact lots hold no price-dependent columns, so need no ticker map.
+        if not self.compact:
+            self._ticker_rows = self.holdings.groupby('Security', observed=True).indices
+        self._ticker_agg_rows = self.aggregated_holdings.groupby('Security', observed=True).indices
+        
+        # Used by the accessors to slice a portfolio without scanning every lot
+        self._portfolio_rows = self.holdings.groupby('Portfolio', observed=True).indices
+        if self.compact:
+            self._portfolio_rows = {portfolio: rows.astype(np.int32)
+                                    for portfolio, rows in self._portfolio_rows.items()}
+        self._portfolio_agg_rows = self.aggregated_holdings.groupby('Portfolio', observed=True).indices
+    
+    def _invalidate(self, portfolios=None):
+        """
+        Bump the data version and drop memoized views
+        
+        Args:
+            portfolios (set): Portfolios whose data changed. Views for the
+                              whole book are always dropped. Drops every
+                              view if None.
+        """
+        self.version += 1
+        if portfolios is None:
+            self._views = {}
+            return
+        
+        for key in [key for key in self._views if key[1] is None or key[1] in portfolios]:
+            del self._views[key]
+    
+    def _memoized(self, name, portfolio, compute):
+        """Return a memoized per-portfolio view, computing it on first use"""
+        key = (name, portfolio)
+        # Under the lock, so an update can't drop the view or change its inputs mid-compute
+        with self.lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = compute()
+            return view
+    
+    def _portfolio_slice(self, frame, portfolio_rows, portfolio):
+        """Slice a frame to one portfolio using the precomputed row positions"""
+        return frame.iloc[portfolio_rows.get(portfolio, np.array([], dtype=np.intp))]
     
     def get_portfolios(self):
         """Get list of available portfolios"""
-        return sorted(self.holdings['Portfolio'].unique())
+        with self.lock:
+            return sorted(self._portfolio_rows)
+    
+    def get_tickers(self):
+        """Get list of securities held across all portfolios"""
+        with self.lock:
+            return list(self._current_prices)
+    
+    def get_current_prices(self):
+        """Get the current price of every security"""
+        with self.lock:
+            return dict(self._current_prices)
     
     def get_portfolio_summary(self, portfolio=None):
         """Get summary metrics for the selected portfolio"""
-        data = self.holdings if portfolio is None else self.holdings[self.holdings['Portfolio'] == portfolio]
+        with self.lock:
+            totals = self.cube.get(portfolio=portfolio)
         
         return {
-            'total_value': data['Market_Value'].sum(),
-            'total_gain_loss': data['Gain_Loss'].sum(),
-            'total_cost': data['Cost_Basis'].sum(),
-            'total_return': (data['Gain_Loss'].sum() / data['Cost_Basis'].sum() * 100).round(2),
-            'holdings': len(data['Security'].unique())
+            'total_value': totals['Market_Value'],
+            'total_gain_loss': totals['Gain_Loss'],
+            'total_cost': totals['Cost_Basis'],
+            'total_return': round(totals['Gain_Loss'] / totals['Cost_Basis'] * 100, 2)
+                            if totals['Cost_Basis'] else float('nan'),
+            'holdings': totals['securities']
         }
     
     def get_holdings_summary(self, portfolio=None):
         """Get aggregated holdings for the selected portfolio"""
         if portfolio is None:
-            return self.aggregated_holdings
-        return self.aggregated_holdings[self.aggregated_holdings['Portfolio'] == portfolio]
+            with self.lock:
+                return self.aggregated_holdings
+        return self._memoized('holdings_summary', portfolio, lambda: self._portfolio_slice(
+            self.aggregated_holdings, self._portfolio_agg_rows, portfolio))
     
     def get_holdings_detail(self, portfolio=None):
         """Get detailed holdings with purchase history"""
+        if self.compact:
+            # Price-dependent columns are only materialized for the requested portfolio
+            return self._memoized('holdings_detail', portfolio, lambda: self._with_metrics(
+                self.holdings if portfolio is None
+                else self._portfolio_slice(self.holdings, self._portfolio_rows, portfolio)))
         if portfolio is None:
-            return self.holdings
-        return self.holdings[self.holdings['Portfolio'] == portfolio]
+            with self.lock:
+                return self.holdings
+        return self._memoized('holdings_detail', portfolio, lambda: self._portfolio_slice(
+            self.holdings, self._portfolio_rows, portfolio))
     
     def get_sector_allocation(self, portfolio=None):
         """Get sector-wise allocation for selected portfolio"""
-        data = self.get_holdings_summary(portfolio)
-        return data.groupby('Sector')['Market_Value'].sum().reset_index()
+        return self._memoized('sector_allocation', portfolio, lambda: (
+            self.get_breakdown('Sector', portfolio=portfolio)[['Sector', 'Market_Value']]))
     
-    def get_sector_performance(self, portfolio=None):
-        """Get sector-wise performance for selected portfolio"""
-        data = self.get_holdings_summary(portfolio)
-        return data.groupby('Sector')['Return'].mean().reset_index()
\ No newline at end of file
+    def get_sector_performance(self, portfolio=None, weighting='equal'):
+        """
+        Get sector-wise performance for selected portfolio
+        
+        Args:
+            portfolio (str): Portfolio name, or None for the whole book
+            weighting (str): 'equal' for the plain mean of the securities'
+                             returns, 'value' to weight them by market value
+        
+        Returns:
+            pd.DataFrame: Sector and Return per sector
+        """
+        if weighting not in ('equal', 'value'):
+            raise ValueError(f"Unknown weighting: {weighting}")
+        
+        def compute():
+            sectors = self.get_breakdown('Sector', portfolio=portfolio)
+            if weighting == 'value':
+                returns = sectors['Weighted_Return'] / sectors['Market_Value']
+            else:
+                returns = sectors['Return'] / sectors['count']
+            return pd.DataFrame({'Sector': sectors['Sector'], 'Return': returns})
+        
+        return self._memoized(('sector_performance', weighting), portfolio, compute)
+    
+    def get_breakdown(self, by, portfolio=None, sector=None, security=None):
+        """
+        Get totals per Portfolio, Sector or Security within a slice of the book
+        
+        For example get_breakdown('Security', portfolio='Growth', sector='Technology')
+        for the technology holdings of one portfolio. Served from the
+        aggregation cube, so no holdings are scanned.
+        
+        Returns:
+            pd.DataFrame: One row per value of `by` with Quantity, Cost_Basis,
+                          Market_Value, Gain_Loss, the Return and
+                          Weighted_Return sums, and position and security counts
+        """
+        with self.lock:
+            return self.cube.breakdown(by, portfolio=portfolio, sector=sector, security=security)
+    
+    def get_holdings_page(self, portfolio=None, view='summary', page=0, page_size=25,
+                          sort_by=None, ascending=True, filters=None):
+        """
+        Get one page of holdings, sorted and filtered server-side
+        
+        Args:
+            portfolio (str): Portfolio name, or None for the whole book
+            view (str): 'summary' for aggregated holdings, 'detail' for purchase lots
+            page (int): Zero-based page number
+            page_size (int): Rows per page
+            sort_by (str): Column to sort on, using a precomputed sorted index
+            ascending (bool): Sort direction
+            filters (list): (column, operator, value) tuples, combined with AND.
+                            Operators are the keys of FILTER_OPERATORS. A filter
+                            whose value doesn't fit its column is ignored.
+        
+        Returns:
+            tuple: (pd.DataFrame with the rows of the page, number of matching rows)
+        """
+        with self.lock:
+            data = self._holdings_view(view, portfolio)
+            if sort_by:
+                order = self._sorted_rows(view, portfolio, sort_by, ascending)
+            else:
+                order = np.arange(len(data))
+            
+            if filters:
+                mask = np.ones(len(data), dtype=bool)
+                for column, operator, value in filters:
+                    if column not in data.columns or operator not in FILTER_OPERATORS:
+                        raise ValueError(f"Unsupported filter: {column} {operator} {value}")
+                    matches = _filter_mask(data[column], operator, value)
+                    # A filter whose value doesn't fit the column is dropped
+                    if matches is not None:
+                        mask &= matches.to_numpy(dtype=bool)
+                order = order[mask[order]]
+            
+            start = page * page_size
+            return data.iloc[order[start:start + page_size]], len(order)
+    
+    def iter_holdings(self, view='detail', portfolio=None, chunk_size=100000):
+        """
+        Yield holdings in chunks of rows, for exports that shouldn't copy the whole book
+        
+        Lots are priced chunk by chunk at the prices current when iteration
+        starts, so memory depends on the chunk size and a long export stays
+        consistent while live updates carry on. Aggregated holdings are one
+        row per security and are copied once up front.
+        
+        Args:
+            view (str): 'summary' for aggregated holdings, 'detail' for purchase lots
+            portfolio (str): Portfolio name, or None for the whole book
+            chunk_size (int): Rows per chunk
+        
+        Yields:
+            pd.DataFrame: Consecutive rows of the view, at least one (possibly empty) chunk
+        """
+        with self.lock:
+            if view == 'summary':
+                lots, rows, prices = self.get_holdings_summary(portfolio).copy(), None, None
+            elif view == 'detail':
+                lots, prices = self.holdings, dict(self._current_prices)
+                rows = (np.arange(len(lots)) if portfolio is None
+                        else self._portfolio_rows.get(portfolio, np.array([], dtype=np.intp)))
+            else:
+                raise ValueError(f"Unknown holdings view: {view}")
+        
+        for start in range(0, max(len(lots) if rows is None else len(rows), 1), chunk_size):
+            if rows is None:
+                yield lots.iloc[start:start + chunk_size]
+            else:
+                yield self._with_metrics(lots.iloc[rows[start:start + chunk_size]], prices)
+    
+    def _holdings_view(self, view, portfolio):
+        if view == 'summary':
+            return self.get_holdings_summary(portfolio)
+        if view == 'detail':
+            return self.get_holdings_detail(portfolio)
+        raise ValueError(f"Unknown holdings view: {view}")
+    
+    def _sorted_rows(self, view, portfolio, column, ascending):
+        """Get row positions of a holdings view ordered by one column, memoized per version"""
+        def compute():
+            data = self._holdings_view(view, portfolio)
+            if column not in data.columns:
+                raise ValueError(f"Unknown column: {column}")
+            order = np.argsort(data[column].to_numpy(), kind='stable')
+            return order if ascending else order[::-1]
+        
+        return self._memoized(('sorted_rows', view, column, ascending), portfolio, compute)
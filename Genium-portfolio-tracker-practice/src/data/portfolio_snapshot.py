@@ -0,0 +1,85 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+
+PortfolioSnapshot = namedtuple('PortfolioSnapshot', [
+    'portfolio',
+    'version',
+    'summary',
+    'holdings_summary',
+    'holdings_detail',
+    'sector_performance'
+])
+PortfolioSnapshot.__doc__ = """Immutable view of one portfolio at one data version"""
+
+
+class SnapshotStore:
+    """
+    Server-side memoization of portfolio snapshots
+
+    Each (portfolio, version) pair is computed once and shared by every
+    callback and every user that asks for it, so a dropdown change costs one
+    pass over PortfolioData instead of one per callback.
+    """
+
+    def __init__(self, portfolio_data, max_entries=32, sector_weighting='equal'):
+        self.portfolio_data = portfolio_data
+        self.max_entries = max_entries
+        self.sector_weighting = sector_weighting  # See PortfolioData.get_sector_performance
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._worker_id = None
+
+    @property
+    def worker_id(self):
+        """
+        Identifies the process whose data versions this store holds
+
+        Every worker counts versions on its own, so a version number only
+        names a snapshot together with the worker it came from. A forked
+        worker gets its own id.
+        """
+        if self._pid != os.getpid():
+            self._pid, self._worker_id = os.getpid(), uuid.uuid4().hex
+        return self._worker_id
+
+    def get(self, portfolio, version=None):
+        """
+        Get the snapshot for a portfolio
+
+        Args:
+            portfolio (str): Portfolio name, or None for the whole book
+            version (int): Data version the caller saw. Falls back to the
+                           latest snapshot if that version is no longer held.
+
+        Returns:
+            PortfolioSnapshot: Snapshot of the portfolio
+        """
+        with self._lock:
+            if version is not None and (portfolio, version) in self._snapshots:
+                self._snapshots.move_to_end((portfolio, version))
+                return self._snapshots[(portfolio, version)]
+
+            key = (portfolio, self.portfolio_data.version)
+            if key not in self._snapshots:
+                snapshot = self._build(portfolio)
+                key = (portfolio, snapshot.version)
+                self._snapshots[key] = snapshot
+                while len(self._snapshots) > self.max_entries:
+                    self._snapshots.popitem(last=False)
+            self._snapshots.move_to_end(key)
+            return self._snapshots[key]
+
+    def _build(self, portfolio):
+        data = self.portfolio_data
+        with data.lock:
+            return PortfolioSnapshot(
+                portfolio=portfolio,
+                version=data.version,
+                summary=dict(data.get_portfolio_summary(portfolio)),
+                holdings_summary=data.get_holdings_summary(portfolio).copy(),
+                holdings_detail=data.get_holdings_detail(portfolio).copy(),
+                sector_performance=data.get_sector_performance(portfolio, self.sector_weighting).copy()
+            )
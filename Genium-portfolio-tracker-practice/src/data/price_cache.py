@@ -0,0 +1,169 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+from .price_providers import BasePriceProvider
+
+
+class CachedPriceProvider(BasePriceProvider):
+    """
+    Wraps another price provider with a per-ticker TTL cache
+
+    Fresh entries are served from memory. Stale entries are served right away
+    while a background thread refreshes them, so a slow feed never blocks a
+    page load once a price has been seen. The cache is bounded to max_entries
+    (least recently used first out) and optionally persisted to SQLite so a
+    restarted dashboard starts warm.
+    """
+
+    def __init__(self, provider, ttl=300, max_entries=10000, path=None,
+                 refresh_in_background=True, on_refresh=None):
+        self.provider = provider
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.path = path
+        self.refresh_in_background = refresh_in_background
+        self.on_refresh = on_refresh
+
+        self._entries = OrderedDict()  # ticker -> (price, fetched_at)
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_threads = []
+
+        if self.path:
+            self._load()
+
+    def get_prices(self, tickers):
+        now = time.time()
+        prices, stale, missing = {}, [], []
+
+        with self._lock:
+            for ticker in tickers:
+                entry = self._entries.get(ticker)
+                if entry is None:
+                    missing.append(ticker)
+                    continue
+                self._entries.move_to_end(ticker)
+                prices[ticker] = entry[0]
+                if now - entry[1] > self.ttl:
+                    stale.append(ticker)
+
+        if missing:
+            prices.update(self._fetch(missing))
+
+        if stale:
+            if self.refresh_in_background:
+                self._start_refresh(stale)
+            else:
+                prices.update(self._fetch(stale))
+
+        return prices
+
+    def get_cached_prices(self, tickers):
+        with self._lock:
+            return {ticker: self._entries[ticker][0] for ticker in tickers if ticker in self._entries}
+
+    def invalidate(self, tickers=None):
+        """Mark cached prices as expired so the next lookup refreshes them"""
+        with self._lock:
+            for ticker in list(self._entries) if tickers is None else tickers:
+                if ticker in self._entries:
+                    self._entries[ticker] = (self._entries[ticker][0], 0.0)
+
+    def wait_for_refresh(self, timeout=None):
+        """Block until background refreshes started so far have finished"""
+        for thread in list(self._refresh_threads):
+            thread.join(timeout)
+
+    def _fetch(self, tickers):
+        """Fetch prices from the wrapped provider and store them"""
+        try:
+            prices = self.provider.get_prices(tickers)
+        except Exception as e:
+            print(f"Error refreshing cached prices: {e}")
+            return {}
+
+        prices = {ticker: price for ticker, price in prices.items() if price is not None}
+        self._store(prices)
+        return prices
+
+    def _start_refresh(self, tickers):
+        with self._lock:
+            tickers = [ticker for ticker in tickers if ticker not in self._refreshing]
+            self._refreshing.update(tickers)
+            self._refresh_threads = [t for t in self._refresh_threads if t.is_alive()]
+        if not tickers:
+            return
+
+        thread = threading.Thread(target=self._refresh, args=(tickers,), daemon=True)
+        self._refresh_threads.append(thread)
+        thread.start()
+
+    def _refresh(self, tickers):
+        try:
+            prices = self._fetch(tickers)
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(tickers)
+
+        if prices and self.on_refresh:
+            self.on_refresh(prices)
+
+    def _store(self, prices):
+        if not prices:
+            return
+
+        fetched_at = time.time()
+        with self._lock:
+            for ticker, price in prices.items():
+                self._entries[ticker] = (price, fetched_at)
+                self._entries.move_to_end(ticker)
+
+            evicted = []
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+
+        if self.path:
+            self._persist(prices, fetched_at, evicted)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS prices '
+            '(ticker TEXT PRIMARY KEY, price REAL NOT NULL, fetched_at REAL NOT NULL)'
+        )
+        return connection
+
+    def _load(self):
+        """Warm the cache from the SQLite file"""
+        if not os.path.exists(self.path):
+            return
+
+        try:
+            with closing(self._connect()) as connection:
+                rows = connection.execute(
+                    'SELECT ticker, price, fetched_at FROM prices ORDER BY fetched_at DESC LIMIT ?',
+                    (self.max_entries,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Error loading price cache from {self.path}: {e}")
+            return
+
+        for ticker, price, fetched_at in reversed(rows):
+            self._entries[ticker] = (price, fetched_at)
+
+    def _persist(self, prices, fetched_at, evicted):
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO prices (ticker, price, fetched_at) VALUES (?, ?, ?)',
+                    [(ticker, float(price), fetched_at) for ticker, price in prices.items()]
+                )
+                if evicted:
+                    connection.executemany('DELETE FROM prices WHERE ticker = ?',
+                                           [(ticker,) for ticker in evicted])
+        except sqlite3.Error as e:
+            print(f"Error writing price cache to {self.path}: {e}")
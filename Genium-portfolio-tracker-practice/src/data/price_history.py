@@ -0,0 +1,150 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+
+class BaseHistoryProvider(ABC):
+    """Base class for all historical price providers"""
+
+    @abstractmethod
+    def get_history(self, tickers, start, end):
+        """
+        Fetch daily closes for a batch of tickers
+
+        Args:
+            tickers (list): Ticker symbols
+            start (pd.Timestamp): First date, inclusive
+            end (pd.Timestamp): Last date, inclusive
+
+        Returns:
+            pd.DataFrame: Closes indexed by date with one column per ticker.
+                          Tickers without data are left out.
+        """
+        pass
+
+
+class StaticHistoryProvider(BaseHistoryProvider):
+    """Local fake history, used in place of yfinance for tests and benchmarks"""
+
+    def __init__(self, history):
+        self.history = history
+
+    def get_history(self, tickers, start, end):
+        columns = [ticker for ticker in tickers if ticker in self.history.columns]
+        return self.history.loc[start:end, columns]
+
+
+class YFinanceHistoryProvider(BaseHistoryProvider):
+    """Downloads daily closes for every ticker in one bulk yfinance request"""
+
+    def __init__(self, timeout=30.0):
+        self.timeout = timeout
+
+    def get_history(self, tickers, start, end):
+        tickers = list(tickers)
+        if not tickers:
+            return pd.DataFrame()
+
+        import yfinance as yf  # Slow to import, so only loaded once history is actually fetched
+
+        # yfinance treats end as exclusive
+        data = yf.download(tickers, start=start, end=pd.Timestamp(end) + pd.Timedelta(days=1),
+                           progress=False, threads=True, auto_adjust=True, timeout=self.timeout)
+        if data.empty:
+            return pd.DataFrame()
+
+        close = data['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(name=tickers[0])
+        close.index = pd.DatetimeIndex(close.index).tz_localize(None).normalize()
+        return close.dropna(axis=1, how='all')
+
+
+class PriceHistoryStore:
+    """
+    Daily closes cached locally as a Parquet file, one column per ticker
+
+    Requests are served from the file and only the tickers or date ranges it
+    doesn't cover yet are downloaded, in one bulk request each, then written
+    back. Reads only load the requested ticker columns.
+    """
+
+    def __init__(self, path='price_history.parquet', provider=None):
+        self.path = path
+        self.provider = provider or YFinanceHistoryProvider()
+        self._lock = threading.Lock()
+
+    def get_history(self, tickers, start, end=None):
+        """
+        Get daily closes, fetching what the cache is missing
+
+        Args:
+            tickers (list): Ticker symbols
+            start: First date, anything pd.Timestamp accepts
+            end: Last date, today by default
+
+        Returns:
+            pd.DataFrame: Closes indexed by business day, one column per ticker,
+                          forward-filled over holidays. Tickers without any
+                          data are left out.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.today().normalize()
+
+        with self._lock:
+            stored = self._stored_tickers()
+            cached = self._read([ticker for ticker in tickers if ticker in stored])
+            fetched = self._fetch_missing(cached, tickers, start, end)
+            if fetched:
+                cached = pd.concat([self._read()] + fetched).groupby(level=0).last().sort_index()
+                self._write(cached)
+
+        history = cached.reindex(columns=[ticker for ticker in tickers if ticker in cached.columns])
+        dates = pd.bdate_range(start, end)
+        # Carry the last close forward, seeded from the latest close before start
+        history = history.reindex(history.index.union(dates)).ffill().loc[start:end]
+        return history.reindex(dates).dropna(axis=1, how='all')
+
+    def _fetch_missing(self, cached, tickers, start, end):
+        """Download the tickers and date ranges the cache doesn't cover"""
+        requests = []
+        missing = [ticker for ticker in tickers if ticker not in cached.columns]
+        if missing:
+            requests.append((missing, start, end))
+
+        present = [ticker for ticker in tickers if ticker in cached.columns]
+        if present and not cached.empty:
+            if start < cached.index[0]:
+                requests.append((present, start, cached.index[0] - pd.Timedelta(days=1)))
+            if end > cached.index[-1] and pd.bdate_range(cached.index[-1] + pd.Timedelta(days=1), end).size:
+                requests.append((present, cached.index[-1] + pd.Timedelta(days=1), end))
+
+        fetched = []
+        for request_tickers, request_start, request_end in requests:
+            try:
+                history = self.provider.get_history(request_tickers, request_start, request_end)
+            except Exception as e:
+                print(f"Error fetching price history: {e}")
+                continue
+            if not history.empty:
+                fetched.append(history.astype('float64'))
+        return fetched
+
+    def _stored_tickers(self):
+        if not os.path.exists(self.path):
+            return set()
+        return set(pq.read_schema(self.path).names) - {'Date'}
+
+    def _read(self, columns=None):
+        if not os.path.exists(self.path):
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='Date'), dtype='float64')
+        return pd.read_parquet(self.path, columns=columns)
+
+    def _write(self, history):
+        history.index.name = 'Date'
+        history.columns = history.columns.astype(str)
+        history.to_parquet(self.path)
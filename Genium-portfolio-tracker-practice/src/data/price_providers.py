@@ -0,0 +1,175 @@
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+
+class BasePriceProvider(ABC):
+    """Base class for all price providers"""
+
+    @abstractmethod
+    def get_prices(self, tickers):
+        """
+        Fetch current prices for a batch of tickers
+
+        Args:
+            tickers (list): Ticker symbols to price
+
+        Returns:
+            dict: Mapping of ticker to price. Tickers that could not be
+                  priced are left out so the caller can apply a fallback.
+        """
+        pass
+
+    def get_cached_prices(self, tickers):
+        """
+        Prices that can be returned without a network request, possibly stale
+
+        Used to render a first view while get_prices runs in the background.
+        Providers without a local store return nothing.
+        """
+        return {}
+
+
+class StaticPriceProvider(BasePriceProvider):
+    """Local fake price feed, used in place of yfinance for tests and benchmarks"""
+
+    def __init__(self, prices, latency=0.0):
+        self.prices = dict(prices)
+        self.latency = latency
+
+    def get_prices(self, tickers):
+        if self.latency:
+            time.sleep(self.latency)
+        return {ticker: self.prices[ticker] for ticker in tickers if ticker in self.prices}
+
+
+class ThreadedPriceProvider(BasePriceProvider):
+    """Fetches one ticker per request through a bounded thread pool"""
+
+    def __init__(self, fetch_price, max_workers=8, timeout=10.0, retries=2, backoff=0.5):
+        """
+        Args:
+            fetch_price (callable): Returns the price of one ticker, or None
+            max_workers (int): Fetches run at once
+            timeout (float): Seconds each ticker's fetch may take, retries
+                             included, counted from its own start. None
+                             waits indefinitely.
+            retries (int): Extra attempts after a failed fetch
+            backoff (float): Seconds before the first retry, doubling after each
+        """
+        self.fetch_price = fetch_price
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def _fetch_with_retries(self, ticker):
+        """Fetch a single price, retrying with exponential backoff"""
+        for attempt in range(self.retries + 1):
+            try:
+                price = self.fetch_price(ticker)
+                if price is not None:
+                    return price
+            except Exception as e:
+                if attempt == self.retries:
+                    print(f"Error fetching data for {ticker}: {e}")
+                    return None
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        return None
+
+    def get_prices(self, tickers):
+        if not tickers:
+            return {}
+
+        # At most max_workers fetches run at once and each is submitted when a slot frees up, so its
+        # timeout counts from its own start. Threads beyond max_workers only replace fetches that
+        # timed out and were abandoned, so a hung request never holds up the tickers queued behind it.
+        executor = ThreadPoolExecutor(max_workers=len(tickers))
+        queued = iter(tickers)
+        running = {}  # Future -> (ticker, deadline)
+        prices = {}
+        while True:
+            while len(running) < self.max_workers:
+                ticker = next(queued, None)
+                if ticker is None:
+                    break
+                deadline = time.monotonic() + self.timeout if self.timeout is not None else None
+                running[executor.submit(self._fetch_with_retries, ticker)] = (ticker, deadline)
+            if not running:
+                break
+
+            deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+            timeout = max(min(deadlines) - time.monotonic(), 0) if deadlines else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker, _ = running.pop(future)
+                price = future.result()
+                if price is not None:
+                    prices[ticker] = price
+
+            now = time.monotonic()
+            for future in [future for future, (_, deadline) in running.items()
+                           if deadline is not None and deadline <= now]:
+                print(f"Timed out fetching data for {running.pop(future)[0]}")
+
+        executor.shutdown(wait=False, cancel_futures=True)
+        return prices
+
+
+class YFinancePriceProvider(BasePriceProvider):
+    """Fetches prices from yfinance in one bulk request, with a concurrent per-ticker fallback"""
+
+    def __init__(self, max_workers=8, timeout=10.0, retries=2):
+        self.timeout = timeout
+        self.fallback = ThreadedPriceProvider(
+            self._fetch_single_price,
+            max_workers=max_workers,
+            timeout=timeout,
+            retries=retries
+        )
+
+    def get_prices(self, tickers):
+        tickers = list(tickers)
+        try:
+            prices = self._fetch_bulk_prices(tickers)
+        except Exception as e:
+            print(f"Error fetching bulk price data: {e}")
+            prices = {}
+
+        missing = [ticker for ticker in tickers if ticker not in prices]
+        if missing:
+            prices.update(self.fallback.get_prices(missing))
+        return prices
+
+    def _fetch_bulk_prices(self, tickers):
+        """Download the latest close for every ticker in a single request"""
+        if not tickers:
+            return {}
+
+        import yfinance as yf  # Slow to import, so only loaded once prices are actually fetched
+        data = yf.download(tickers, period='5d', progress=False, threads=True, timeout=self.timeout)
+        if data.empty:
+            return {}
+
+        close = data['Close']
+        if isinstance(close, pd.Series):
+            close = close.to_frame(name=tickers[0])
+
+        latest = close.ffill().iloc[-1].dropna()
+        return {ticker: float(price) for ticker, price in latest.items()}
+
+    @staticmethod
+    def _fetch_single_price(ticker):
+        """Fetch the current price for one ticker"""
+        import yfinance as yf
+        stock = yf.Ticker(ticker)
+        current_price = stock.info.get('regularMarketPrice', None)
+
+        if current_price is None:
+            historical_data = stock.history(period='1d')
+            current_price = historical_data['Close'].iloc[-1] if not historical_data.empty else None
+
+        return current_price
@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .price_providers import BasePriceProvider
+
+TICK_COLUMNS = ['Timestamp', 'Security', 'Price']
+
+
+def load_ticks(path):
+    """Read a tick file (.csv or .parquet) with Timestamp, Security and Price columns"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        ticks = pd.read_parquet(path, columns=TICK_COLUMNS)
+    elif extension == '.csv':
+        ticks = pd.read_csv(path, usecols=TICK_COLUMNS)
+    else:
+        raise ValueError(f"Unsupported tick file: {path}")
+    ticks['Timestamp'] = pd.to_datetime(ticks['Timestamp'])
+    return ticks.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+
+
+def save_ticks(ticks, path):
+    """Write ticks to a .csv or .parquet file"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        ticks[TICK_COLUMNS].to_parquet(path, index=False)
+    elif extension == '.csv':
+        ticks[TICK_COLUMNS].to_csv(path, index=False)
+    else:
+        raise ValueError(f"Unsupported tick file: {path}")
+
+
+class ReplayPriceProvider(BasePriceProvider):
+    """
+    Replays recorded or synthetic ticks from a local file, with no network access
+
+    The replay clock starts on the first request and runs speed times faster
+    than wall time, so speed=60 plays an hour of ticks in a minute. Every
+    ticker starts at its first recorded price; each request applies the
+    ticks up to the replay clock and returns the latest price per ticker.
+    Pass a clock that steps by a fixed amount for fully deterministic runs.
+    """
+
+    def __init__(self, ticks, speed=1.0, loop=True, clock=time.monotonic):
+        """
+        Args:
+            ticks (str or pd.DataFrame): Tick file path, or a frame with TICK_COLUMNS
+            speed (float): Replay seconds per wall-clock second
+            loop (bool): Start over from the first tick after the last one
+            clock (callable): Wall-clock source in seconds
+        """
+        if isinstance(ticks, str):
+            ticks = load_ticks(ticks)
+        else:
+            ticks = ticks.sort_values('Timestamp', kind='stable').reset_index(drop=True)
+        if ticks.empty:
+            raise ValueError("Tick file is empty")
+
+        timestamps = pd.to_datetime(ticks['Timestamp']).to_numpy()
+        self.offsets = (timestamps - timestamps[0]) / np.timedelta64(1, 's')  # Seconds since the first tick
+        self.duration = float(self.offsets[-1])
+        self.securities = ticks['Security'].astype(str).tolist()
+        self.values = ticks['Price'].to_numpy(dtype=np.float64).tolist()
+        self.speed = speed
+        self.loop = loop
+        self.clock = clock
+
+        first = ticks.drop_duplicates('Security')
+        self._initial = dict(zip(first['Security'].astype(str), first['Price'].astype(float)))
+        self._prices = dict(self._initial)
+        self._cursor = 0
+        self._rounds = 0  # Completed passes over the file
+        self._started = None
+        self._lock = threading.Lock()
+
+    @property
+    def replay_time(self):
+        """Seconds of the file replayed so far, counting earlier loops"""
+        if self._started is None:
+            return 0.0
+        return (self.clock() - self._started) * self.speed
+
+    def get_prices(self, tickers):
+        with self._lock:
+            if self._started is None:
+                self._started = self.clock()
+            self._advance(self.replay_time)
+            return {ticker: self._prices[ticker] for ticker in tickers if ticker in self._prices}
+
+    def get_cached_prices(self, tickers):
+        # Everything is local, so the current replay state is always available
+        return self.get_prices(tickers)
+
+    def _advance(self, elapsed):
+        """Apply every tick up to elapsed replay seconds"""
+        rounds = int(elapsed // self.duration) if self.loop and self.duration > 0 else 0
+        if rounds != self._rounds:
+            # Past the end: replay the file again from its first prices
+            self._rounds = rounds
+            self._cursor = 0
+            self._prices.update(self._initial)
+
+        end = int(np.searchsorted(self.offsets, elapsed - rounds * self.duration, side='right'))
+        for index in range(self._cursor, end):
+            self._prices[self.securities[index]] = self.values[index]
+        self._cursor = max(self._cursor, end)
+
+
+class RecordingPriceProvider(BasePriceProvider):
+    """Passes requests through to another provider and records every price as a tick in a CSV file"""
+
+    def __init__(self, provider, path, flush_every=1000):
+        self.provider = provider
+        self.path = path
+        self.flush_every = flush_every
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def get_prices(self, tickers):
+        prices = self.provider.get_prices(tickers)
+        now = pd.Timestamp.now()
+        with self._lock:
+            self._pending.extend((now, ticker, price) for ticker, price in prices.items())
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+        return prices
+
+    def get_cached_prices(self, tickers):
+        return self.provider.get_cached_prices(tickers)
+
+    def flush(self):
+        """Append recorded ticks to the CSV file"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        ticks = pd.DataFrame(self._pending, columns=TICK_COLUMNS)
+        ticks.to_csv(self.path, mode='a', index=False, header=not os.path.exists(self.path))
+        self._pending = []
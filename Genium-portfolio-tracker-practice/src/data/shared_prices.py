@@ -0,0 +1,227 @@
+"""
+Prices shared across processes through a memory-mapped file
+
+One updater process owns the price feed and publishes into the file; every
+dashboard worker maps it read-only instead of fetching prices itself. Run
+the updater from the src directory:
+
+    python -m data.shared_prices prices.shm
+"""
+import argparse
+import mmap
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from .price_providers import BasePriceProvider
+
+# Header: sequence (odd while a write is in progress), version, ticker count, ticker name bytes
+HEADER_FIELDS = 4
+HEADER_SIZE = HEADER_FIELDS * 8
+
+
+class SharedPriceState:
+    """
+    Fixed ticker list and float64 prices in a memory-mapped file, guarded by a seqlock
+
+    The writer bumps the sequence to odd, writes, then bumps it back to
+    even. Readers copy the prices and retry if the sequence moved or was
+    odd, so they never see a half-applied update and never block the writer.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        with open(path, 'r+b' if writable else 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self.inode = os.stat(path).st_ino
+
+        self._header = np.ndarray(HEADER_FIELDS, dtype='<i8', buffer=self._map)
+        count, names_size = int(self._header[2]), int(self._header[3])
+        self.tickers = bytes(self._map[HEADER_SIZE:HEADER_SIZE + names_size]).decode().split('\n') if count else []
+        self._index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._prices = np.ndarray(count, dtype='<f8', buffer=self._map,
+                                  offset=HEADER_SIZE + self._padded(names_size))
+
+    @classmethod
+    def create(cls, path, tickers, prices=None):
+        """
+        Publish a new price file, atomically replacing any previous one
+
+        Args:
+            path (str): File to create, ideally on a tmpfs such as /dev/shm
+            tickers (list): Every ticker the file will hold; fixed for its lifetime
+            prices (dict): Initial prices, unpriced tickers start as NaN
+
+        Returns:
+            SharedPriceState: The writable state
+        """
+        tickers = list(dict.fromkeys(tickers))
+        names = '\n'.join(tickers).encode()
+        prices = prices or {}
+        values = np.array([prices.get(ticker, np.nan) for ticker in tickers], dtype='<f8')
+
+        directory = os.path.dirname(os.path.abspath(path))
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            file.write(np.array([0, 0, len(tickers), len(names)], dtype='<i8').tobytes())
+            file.write(names.ljust(cls._padded(len(names)), b'\0'))
+            file.write(values.tobytes())
+        os.replace(file.name, path)
+        return cls(path, writable=True)
+
+    @property
+    def version(self):
+        """Number of published updates; cheap to poll"""
+        return int(self._header[1])
+
+    def read(self):
+        """
+        Take a consistent copy of every price
+
+        Returns:
+            tuple: (version, np.ndarray of prices in self.tickers order)
+        """
+        while True:
+            sequence = int(self._header[0])
+            if sequence % 2:
+                time.sleep(0)
+                continue
+            version = int(self._header[1])
+            prices = self._prices.copy()
+            if int(self._header[0]) == sequence:
+                return version, prices
+
+    def get_tickers(self):
+        return list(self.tickers)
+
+    def apply_price_updates(self, prices):
+        """
+        Publish new prices for a subset of tickers
+
+        Matches PortfolioData.apply_price_updates, so a LivePriceUpdater can
+        drive the state directly. Tickers outside the file are ignored.
+
+        Returns:
+            list: Tickers whose price actually changed
+        """
+        if not self.writable:
+            raise ValueError(f"{self.path} is mapped read-only")
+        changed = {
+            self._index[ticker]: float(price) for ticker, price in prices.items()
+            if price is not None and ticker in self._index and self._prices[self._index[ticker]] != float(price)
+        }
+        if not changed:
+            return []
+
+        rows = np.fromiter(changed.keys(), dtype=np.intp, count=len(changed))
+        values = np.fromiter(changed.values(), dtype='<f8', count=len(changed))
+        self._header[0] += 1
+        self._prices[rows] = values
+        self._header[1] += 1
+        self._header[0] += 1
+        return [self.tickers[row] for row in rows]
+
+    def close(self):
+        # Views must go before the map they point into can be closed
+        self._header = self._prices = None
+        self._map.close()
+
+    @staticmethod
+    def _padded(size):
+        """Round a byte count up so the price array stays 8-byte aligned"""
+        return (size + 7) // 8 * 8
+
+
+class SharedPriceProvider(BasePriceProvider):
+    """
+    Reads prices published by the shared-price updater process
+
+    The file is re-mapped if the updater restarts and publishes a new one,
+    and prices are only copied out of it when its version moves.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._state = None
+        self._version = None
+        self._prices = {}
+
+    def get_prices(self, tickers):
+        state = self._open()
+        if state.version != self._version:
+            self._version, values = state.read()
+            self._prices = {ticker: price for ticker, price in zip(state.tickers, values.tolist())
+                            if not np.isnan(price)}
+        return {ticker: self._prices[ticker] for ticker in tickers if ticker in self._prices}
+
+    def get_cached_prices(self, tickers):
+        # The mapped file is local memory, so a normal read is already cheap
+        return self.get_prices(tickers)
+
+    def _open(self):
+        inode = os.stat(self.path).st_ino
+        if self._state is None or self._state.inode != inode:
+            self._state = SharedPriceState(self.path)
+            self._version = None
+        return self._state
+
+
+def main():
+    """Run the single updater process that owns the price feed"""
+    from .holdings_sources import SampleHoldingsSource, open_holdings_source
+    from .live_prices import LivePriceUpdater, SimulatedTickProvider
+    from .price_cache import CachedPriceProvider
+    from .price_providers import YFinancePriceProvider
+    from .replay_prices import ReplayPriceProvider
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('path', nargs='?', default=os.environ.get('SHARED_PRICES', '/dev/shm/portfolio-prices'))
+    parser.add_argument('--holdings', default=os.environ.get('HOLDINGS_SOURCE'))
+    parser.add_argument('--portfolios', default=os.environ.get('HOLDINGS_PORTFOLIOS'))
+    parser.add_argument('--source', choices=['yfinance', 'simulated'],
+                        default=os.environ.get('LIVE_PRICES', 'yfinance').lower() or 'yfinance')
+    parser.add_argument('--interval', type=float, default=float(os.environ.get('LIVE_PRICE_INTERVAL', 5)))
+    parser.add_argument('--replay', default=os.environ.get('PRICE_REPLAY'),
+                        help='publish ticks replayed from this file instead of a live source')
+    parser.add_argument('--replay-speed', type=float, default=float(os.environ.get('PRICE_REPLAY_SPEED', 1)))
+    args = parser.parse_args()
+
+    holdings_source = open_holdings_source(args.holdings) if args.holdings else SampleHoldingsSource()
+    holdings = holdings_source.load(args.portfolios.split(',') if args.portfolios else None)
+    tickers = list(holdings['Security'].unique())
+
+    if args.replay:
+        price_provider = ReplayPriceProvider(args.replay, speed=args.replay_speed)
+        state = SharedPriceState.create(args.path, tickers, price_provider.get_prices(tickers))
+    else:
+        price_provider = CachedPriceProvider(
+            YFinancePriceProvider(),
+            ttl=float(os.environ.get('PRICE_CACHE_TTL', 300)),
+            path=os.environ.get('PRICE_CACHE_PATH', 'price_cache.sqlite')
+        )
+        state = SharedPriceState.create(args.path, tickers, price_provider.get_prices(tickers))
+        price_provider.on_refresh = state.apply_price_updates
+
+    if args.replay:
+        live_provider = price_provider
+    elif args.source == 'simulated':
+        _, values = state.read()
+        live_provider = SimulatedTickProvider({ticker: price for ticker, price in zip(state.tickers, values)
+                                               if not np.isnan(price)})
+    else:
+        live_provider = price_provider
+
+    print(f"Publishing {len(tickers)} prices to {args.path} every {args.interval}s")
+    updater = LivePriceUpdater(state, live_provider, interval=args.interval)
+    updater.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        updater.stop()
+
+
+if __name__ == '__main__':
+    main()
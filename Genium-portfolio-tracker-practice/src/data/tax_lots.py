@@ -0,0 +1,295 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .holdings_sources import normalize_holdings
+
+# quantity is the split ratio for splits; price is the per-share amount for dividends
+Transaction = namedtuple('Transaction', ['date', 'portfolio', 'security', 'type', 'quantity', 'price', 'lot_id'],
+                         defaults=[None])
+
+RealizedLot = namedtuple('RealizedLot', ['date', 'portfolio', 'security', 'lot_id', 'acquired', 'quantity',
+                                         'proceeds', 'cost', 'gain'])
+
+# Quantities left below this after a sale are treated as closed
+EPSILON = 1e-9
+
+
+class LotBook:
+    """
+    Lots of one security in one portfolio, stored column-wise in growable arrays
+
+    Lots are appended in purchase order and never moved, so a lot's row is
+    stable while it is open. head is the first row that may still be open,
+    letting FIFO matching skip the fully sold prefix, and fully sold lots at
+    the end are trimmed so LIFO matching starts at an open lot.
+    """
+
+    def __init__(self, capacity=8):
+        self.lot_ids = np.empty(capacity, dtype=np.int64)
+        self.dates = np.empty(capacity, dtype='datetime64[D]')
+        self.open = np.zeros(capacity, dtype=np.float64)
+        self.cost = np.zeros(capacity, dtype=np.float64)  # Cost per share
+        self.size = 0
+        self.head = 0
+        self.rows = {}  # lot id -> row, for specific-lot sales
+
+        # Running totals so P&L queries are O(1) per book
+        self.open_quantity = 0.0
+        self.open_cost = 0.0
+        self.realized = 0.0
+        self.dividends = 0.0
+
+    def add(self, lot_id, date, quantity, price):
+        if self.size == len(self.open):
+            self._grow()
+        row = self.size
+        self.lot_ids[row] = lot_id
+        self.dates[row] = date
+        self.open[row] = quantity
+        self.cost[row] = price
+        self.rows[lot_id] = row
+        self.size += 1
+        self.open_quantity += quantity
+        self.open_cost += quantity * price
+
+    def match(self, quantity, method, lot_id=None):
+        """
+        Pick the lots a sale closes, without changing them yet
+
+        Returns:
+            list: (row, shares taken) per matched lot, in matching order
+        """
+        if method == 'specific':
+            row = self.rows.get(lot_id)
+            if row is None or self.open[row] < quantity - EPSILON:
+                raise ValueError(f"Lot {lot_id} doesn't have {quantity} shares open")
+            return [(row, quantity)]
+
+        if quantity > self.open_quantity + EPSILON:
+            raise ValueError(f"Cannot sell {quantity} shares, only {self.open_quantity} open")
+        # Nothing to match, e.g. a rounding residual left by a fractional split
+        if quantity <= EPSILON or self.head == self.size:
+            return []
+
+        # Common case: the next lot in line covers the whole sale
+        row = self.head if method == 'fifo' else self.size - 1
+        if self.open[row] >= quantity - EPSILON:
+            return [(row, quantity)]
+
+        rows = np.arange(self.head, self.size)
+        if method == 'lifo':
+            rows = rows[::-1]
+        rows = rows[self.open[rows] > EPSILON]
+        filled = np.cumsum(self.open[rows])
+        last = min(int(np.searchsorted(filled, quantity - EPSILON)), len(rows) - 1)
+        taken = self.open[rows[:last + 1]].tolist()
+        taken[-1] = quantity - (float(filled[last - 1]) if last else 0.0)
+        return list(zip(rows[:last + 1].tolist(), taken))
+
+    def close(self, matched):
+        """Reduce the matched lots, returning the cost basis removed"""
+        cost = 0.0
+        for row, shares in matched:
+            cost += shares * self.cost[row]
+            remaining = self.open[row] - shares
+            self.open[row] = remaining if remaining >= EPSILON else 0.0
+            self.open_quantity -= shares
+        self.open_cost -= cost
+        if self.open_quantity < EPSILON:
+            self.open_quantity = self.open_cost = 0.0
+        while self.head < self.size and self.open[self.head] == 0.0:
+            self.head += 1
+        while self.size > self.head and self.open[self.size - 1] == 0.0:
+            self.size -= 1
+            del self.rows[int(self.lot_ids[self.size])]
+        return float(cost)
+
+    def split(self, ratio):
+        """Scale open quantities and per-share costs; total cost is unchanged"""
+        live = slice(self.head, self.size)
+        self.open[live] *= ratio
+        self.cost[live] /= ratio
+        self.open_quantity *= ratio
+
+    def _grow(self):
+        capacity = len(self.open) * 2
+        for name in ('lot_ids', 'dates', 'open', 'cost'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+
+class TaxLotLedger:
+    """
+    Transaction ledger with FIFO, LIFO or specific-lot matching
+
+    Each (portfolio, security) pair keeps its lots in a LotBook, so applying
+    a transaction only touches the lots of that security. Realized P&L is
+    accumulated as sales are matched, and unrealized P&L is derived from
+    running open quantity and cost totals, so neither needs a rescan.
+    """
+
+    def __init__(self, method='fifo', keep_realized_lots=True):
+        if method not in ('fifo', 'lifo'):
+            raise ValueError(f"Unknown matching method: {method}, sell against a lot_id for specific lots")
+        self.method = method
+        self.keep_realized_lots = keep_realized_lots
+        self.books = {}  # (portfolio, security) -> LotBook
+        self.prices = {}
+        self.realized_lots = []
+        self._books_by_security = {}
+        self._next_lot_id = 1
+
+    def apply(self, transaction):
+        """
+        Apply one transaction
+
+        Sells are matched with the ledger's method, or against
+        transaction.lot_id when one is given (specific identification).
+
+        Returns:
+            float: P&L realized by the transaction (sale gain or dividend income)
+        """
+        date, portfolio, security, kind, quantity, price, lot_id = transaction
+        if kind == 'buy':
+            return self._buy(date, portfolio, security, quantity, price, lot_id)
+        if kind == 'sell':
+            return self._sell(date, portfolio, security, quantity, price, lot_id)
+        if kind == 'split':
+            for book in self._books_by_security.get(security, {}).values():
+                book.split(quantity)
+            if security in self.prices:
+                self.prices[security] /= quantity
+            return 0.0
+        if kind == 'dividend':
+            books = self._books_by_security.get(security, {})
+            if portfolio is not None:
+                books = {portfolio: books[portfolio]} if portfolio in books else {}
+            income = 0.0
+            for book in books.values():
+                book.dividends += book.open_quantity * price
+                income += book.open_quantity * price
+            return income
+        raise ValueError(f"Unknown transaction type: {kind}")
+
+    def replay(self, transactions):
+        """
+        Apply a frame of transactions in order
+
+        Args:
+            transactions (pd.DataFrame): Date, Portfolio, Security, Type,
+                                         Quantity, Price and optionally Lot_Id
+
+        Returns:
+            float: Total realized P&L of the replayed transactions
+        """
+        dates = pd.to_datetime(transactions['Date']).to_numpy().astype('datetime64[D]')
+        lot_ids = transactions['Lot_Id'].tolist() if 'Lot_Id' in transactions else [None] * len(transactions)
+        columns = zip(dates, transactions['Portfolio'].tolist(), transactions['Security'].tolist(),
+                      transactions['Type'].tolist(), transactions['Quantity'].tolist(),
+                      transactions['Price'].tolist(), lot_ids)
+        return sum(map(self.apply, columns))
+
+    def update_prices(self, prices):
+        """Set current prices used for unrealized P&L"""
+        self.prices.update(prices)
+
+    def unrealized(self, portfolio=None, security=None):
+        """Unrealized P&L at current prices, optionally for one portfolio and/or security"""
+        return sum(self.prices.get(key[1], 0.0) * book.open_quantity - book.open_cost
+                   for key, book in self._select(portfolio, security))
+
+    def realized(self, portfolio=None, security=None):
+        """Realized P&L from sales, optionally for one portfolio and/or security"""
+        return sum(book.realized for _, book in self._select(portfolio, security))
+
+    def positions(self):
+        """
+        Current position and P&L per portfolio and security
+
+        Returns:
+            pd.DataFrame: Portfolio, Security, Quantity, Cost_Basis, Average_Cost,
+                          Current_Price, Market_Value, Unrealized_PL, Realized_PL, Dividends
+        """
+        rows = [(portfolio, security, book.open_quantity, book.open_cost, book.realized, book.dividends)
+                for (portfolio, security), book in self.books.items()]
+        positions = pd.DataFrame(rows, columns=['Portfolio', 'Security', 'Quantity', 'Cost_Basis',
+                                                'Realized_PL', 'Dividends'])
+        positions['Average_Cost'] = positions['Cost_Basis'] / positions['Quantity'].where(positions['Quantity'] > 0)
+        positions['Current_Price'] = positions['Security'].map(self.prices).astype(float)
+        positions['Market_Value'] = positions['Quantity'] * positions['Current_Price']
+        positions['Unrealized_PL'] = positions['Market_Value'] - positions['Cost_Basis']
+        return positions[['Portfolio', 'Security', 'Quantity', 'Cost_Basis', 'Average_Cost', 'Current_Price',
+                          'Market_Value', 'Unrealized_PL', 'Realized_PL', 'Dividends']]
+
+    def open_lots(self, sectors=None):
+        """
+        Open lots in the PortfolioData holdings layout, e.g. for DataFrameHoldingsSource
+
+        Args:
+            sectors (dict): Security to sector; unknown securities get 'Unknown'
+        """
+        frames = []
+        for (portfolio, security), book in self.books.items():
+            live = slice(book.head, book.size)
+            is_open = book.open[live] > 0
+            frames.append(pd.DataFrame({
+                'Portfolio': portfolio,
+                'Security': security,
+                'Lot_Id': book.lot_ids[live][is_open],
+                'Purchase_Date': book.dates[live][is_open],
+                'Quantity': book.open[live][is_open],
+                'Purchase_Price': book.cost[live][is_open]
+            }))
+        lots = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            columns=['Portfolio', 'Security', 'Lot_Id', 'Purchase_Date', 'Quantity', 'Purchase_Price'])
+        lots['Sector'] = lots['Security'].map(sectors or {}).fillna('Unknown')
+        quantity = lots['Quantity'].to_numpy(dtype=np.float64)
+        lots = normalize_holdings(lots.assign(Quantity=0))
+        # Split-adjusted lots can hold fractional shares
+        lots['Quantity'] = quantity.astype(np.int64) if np.all(quantity % 1 == 0) else quantity
+        return lots
+
+    def realized_lot_report(self):
+        """Realized sales per lot with holding period, for tax reporting"""
+        report = pd.DataFrame(self.realized_lots, columns=RealizedLot._fields)
+        report['long_term'] = (pd.to_datetime(report['date']) - pd.to_datetime(report['acquired'])) > pd.Timedelta(days=365)
+        return report
+
+    def _buy(self, date, portfolio, security, quantity, price, lot_id):
+        book = self.books.get((portfolio, security))
+        if book is None:
+            book = self.books[(portfolio, security)] = LotBook()
+            self._books_by_security.setdefault(security, {})[portfolio] = book
+        if lot_id is None or lot_id != lot_id:
+            lot_id = self._next_lot_id
+        self._next_lot_id = max(self._next_lot_id, int(lot_id)) + 1
+        book.add(int(lot_id), date, quantity, price)
+        return 0.0
+
+    def _sell(self, date, portfolio, security, quantity, price, lot_id):
+        book = self.books.get((portfolio, security))
+        if book is None:
+            raise ValueError(f"No open lots of {security} in {portfolio}")
+        specific = lot_id is not None and lot_id == lot_id
+        matched = book.match(quantity, 'specific' if specific else self.method,
+                             int(lot_id) if specific else None)
+        if self.keep_realized_lots:
+            for row, shares in matched:
+                lot_cost = shares * float(book.cost[row])
+                self.realized_lots.append(RealizedLot(date, portfolio, security, int(book.lot_ids[row]),
+                                                      book.dates[row], shares, shares * price, lot_cost,
+                                                      shares * price - lot_cost))
+
+        cost = book.close(matched)
+        gain = quantity * price - cost
+        book.realized += gain
+        return gain
+
+    def _select(self, portfolio, security):
+        for key, book in self.books.items():
+            if (portfolio is None or key[0] == portfolio) and (security is None or key[1] == security):
+                yield key, book
@@ -0,0 +1,192 @@
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the payload size buckets, in bytes
+SIZE_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6, 1e7)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram:
+    """
+    Cumulative bucket counts plus a bounded sample of recent observations
+
+    Buckets are what Prometheus aggregates; the sample gives exact
+    p50/p95/p99 over the most recent observations.
+    """
+
+    def __init__(self, buckets, sample_size=1024):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=sample_size)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.samples.append(value)
+
+    def quantiles(self, quantiles=QUANTILES):
+        """Quantiles of the recent sample, NaN before the first observation"""
+        if not self.samples:
+            return {q: float('nan') for q in quantiles}
+        values = np.quantile(np.fromiter(self.samples, dtype=float), quantiles)
+        return dict(zip(quantiles, values.tolist()))
+
+
+class MetricsRegistry:
+    """
+    Named histogram families with labels, rendered in Prometheus text format
+
+    Families are declared with describe() and observed with observe() or
+    the span() context manager. Every family is exported as a histogram and,
+    alongside it, as a <name>_quantiles summary with p50/p95/p99.
+    """
+
+    def __init__(self):
+        self._families = {}  # name -> (help, buckets)
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._lock = threading.Lock()
+        self.describe('dashboard_span_duration_seconds', 'Time spent in an instrumented method')
+
+    def describe(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self._families[name] = (help_text, buckets)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self._families[name][1])
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, span_name):
+        """Time a block into dashboard_span_duration_seconds{span=span_name}"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe('dashboard_span_duration_seconds', time.perf_counter() - start, span=span_name)
+
+    def timed(self, func, span_name):
+        """Wrap a function so every call is recorded as a span"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def instrument(self, obj, methods, prefix=None):
+        """
+        Replace methods on an instance with timed wrappers
+
+        Calls the object makes to itself go through the wrappers too, so
+        nested work such as _calculate_metrics inside update_prices shows
+        up as its own span.
+        """
+        prefix = prefix or type(obj).__name__
+        for method in methods:
+            setattr(obj, method, self.timed(getattr(obj, method), f"{prefix}.{method}"))
+
+    def stats(self):
+        """Per-family, per-label count, sum and quantiles as plain dicts"""
+        with self._lock:
+            items = list(self._histograms.items())
+        stats = {}
+        for (name, labels), histogram in sorted(items):
+            stats.setdefault(name, []).append({
+                'labels': dict(labels),
+                'count': histogram.count,
+                'sum': histogram.sum,
+                **{f"p{round(q * 100)}": value for q, value in histogram.quantiles().items()}
+            })
+        return stats
+
+    def render_prometheus(self):
+        """Render every family in the Prometheus text exposition format"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            by_family = {}
+            for (name, labels), histogram in items:
+                by_family.setdefault(name, []).append(
+                    (labels, list(histogram.counts), histogram.sum, histogram.count, histogram.quantiles()))
+
+        lines = []
+        for name, children in by_family.items():
+            help_text, buckets = self._families[name]
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+            for labels, counts, total, count, _ in children:
+                cumulative = 0
+                for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                    cumulative += bucket_count
+                    le = bound if bound == '+Inf' else f"{bound:g}"
+                    lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {total!r}")
+                lines.append(f"{name}_count{_labels(labels)} {count}")
+
+            summary = f"{name}_quantiles"
+            lines += [f"# HELP {summary} {help_text}, recent p50/p95/p99", f"# TYPE {summary} summary"]
+            for labels, _, total, count, quantiles in children:
+                for q, value in quantiles.items():
+                    lines.append(f"{summary}{_labels(labels, quantile=q)} {value!r}")
+                lines.append(f"{summary}_sum{_labels(labels)} {total!r}")
+                lines.append(f"{summary}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels, **extra):
+    """Format a label set as {name="value",...}, escaping values"""
+    pairs = list(labels) + [(key, str(value)) for key, value in extra.items()]
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+
+def instrument_callbacks(app, registry):
+    """
+    Time every registered Dash callback and record its response size
+
+    Must run after the callbacks are defined. The recorded time covers the
+    callback body and the JSON serialization of its response; serialization
+    on its own is also recorded as the dash.to_json span.
+    """
+    import dash._callback
+
+    registry.describe('dashboard_callback_duration_seconds',
+                      'Dash callback time, including JSON serialization of the response')
+    registry.describe('dashboard_callback_response_bytes', 'Size of the serialized callback response',
+                      buckets=SIZE_BUCKETS)
+
+    # Dash serializes callback responses through this module-level function
+    if not hasattr(dash._callback.to_json, '__wrapped__'):
+        dash._callback.to_json = registry.timed(dash._callback.to_json, 'dash.to_json')
+
+    for entry in app.callback_map.values():
+        entry['callback'] = _timed_callback(entry['callback'], registry)
+
+
+def _timed_callback(callback, registry):
+    name = callback.__name__
+
+    @functools.wraps(callback)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = callback(*args, **kwargs)
+        finally:
+            registry.observe('dashboard_callback_duration_seconds', time.perf_counter() - start, callback=name)
+        if isinstance(response, (str, bytes)):
+            registry.observe('dashboard_callback_response_bytes', len(response), callback=name)
+        return response
+    return wrapper
@@ -0,0 +1,67 @@
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Low-overhead profiler that periodically samples every thread's stack
+
+    Samples are aggregated into folded stacks ("outer;inner;leaf count"),
+    the input format of flamegraph.pl and speedscope. Nothing is hooked
+    into the code being profiled, so it is safe to leave running in a
+    live dashboard.
+    """
+
+    def __init__(self, interval=0.005, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self.samples = 0
+
+    def folded(self):
+        """Collected stacks in folded format, most sampled first"""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [self._fold(frame) for thread_id, frame in frames.items() if thread_id != own_id]
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
@@ -0,0 +1,63 @@
+"""
+Run from the src directory:
+
+    python -m pytest tests
+"""
+import pandas as pd
+
+from components.dashboard_components import DashboardComponents
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+
+
+def make_portfolio_data():
+    holdings = pd.DataFrame({
+        'Portfolio': ['Growth'] * 4,
+        'Security': ['AAPL', 'MSFT', 'NVDA', 'TSLA'],
+        'Purchase_Date': pd.to_datetime(['2021-03-01', '2022-06-15', '2023-01-10', '2023-09-30']),
+        'Quantity': [10, 20, 30, 40],
+        'Purchase_Price': [100.0, 100.0, 100.0, 100.0],
+        'Sector': ['Technology', 'Technology', 'Technology', 'Automotive']
+    })
+    prices = {'AAPL': 110.0, 'MSFT': 90.0, 'NVDA': 200.0, 'TSLA': 50.0}
+    return PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings)
+
+
+def securities(portfolio_data, filter_query, view='detail'):
+    page, _ = portfolio_data.get_holdings_page('Growth', view, 0, 100,
+                                               filters=DashboardComponents.parse_filter_query(filter_query))
+    return sorted(page['Security'])
+
+
+def test_operators_inside_quoted_values_are_part_of_the_value():
+    parse = DashboardComponents.parse_filter_query
+    assert parse('{Sector} contains "Apple Inc"') == [('Sector', 'contains', 'Apple Inc')]
+    assert parse('{Sector} contains "Phone Co"') == [('Sector', 'contains', 'Phone Co')]
+    assert parse('{Security} contains AA && {Return} >= 10') == [('Security', 'contains', 'AA'),
+                                                                ('Return', 'ge', 10.0)]
+    assert parse('{Return} i< 5') == [('Return', 'lt', 5.0)]
+
+
+def test_unparseable_clauses_are_dropped():
+    parse = DashboardComponents.parse_filter_query
+    assert parse('garbage && {Return} < 0') == [('Return', 'lt', 0.0)]
+    assert parse('{Return} is blank') == []
+    assert parse(None) == []
+
+
+def test_values_are_compared_by_column_type():
+    portfolio_data = make_portfolio_data()
+    assert securities(portfolio_data, '{Return} > 0') == ['AAPL', 'NVDA']
+    # Categorical columns order as strings
+    assert securities(portfolio_data, '{Security} >= N') == ['NVDA', 'TSLA']
+    assert securities(portfolio_data, '{Security} >= N', view='summary') == ['NVDA', 'TSLA']
+    assert securities(portfolio_data, '{Purchase_Date} > 2023-01-01') == ['NVDA', 'TSLA']
+    assert securities(portfolio_data, '{Purchase_Date} datestartswith 2022') == ['MSFT']
+
+
+def test_values_of_the_wrong_type_are_ignored():
+    portfolio_data = make_portfolio_data()
+    everything = ['AAPL', 'MSFT', 'NVDA', 'TSLA']
+    assert securities(portfolio_data, '{Return} > abc') == everything
+    assert securities(portfolio_data, '{Purchase_Date} > soon') == everything
+    assert securities(portfolio_data, '{Return} > abc && {Sector} = Automotive') == ['TSLA']
@@ -0,0 +1,97 @@
+"""
+Run from the src directory:
+
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+from analytics.optimizer import OBJECTIVES, PortfolioOptimizer, round_to_shares, shrunk_covariance
+
+TOLERANCE = 1e-6
+
+
+def make_problem(n_securities, n_sectors, seed):
+    rng = np.random.default_rng(seed)
+    covariance = shrunk_covariance(rng.normal(0, 0.01, (n_securities, 60)))
+    current = rng.lognormal(size=n_securities)
+    return covariance, current / current.sum(), rng.integers(n_sectors, size=n_securities)
+
+
+def assert_meets_limits(solution, current, sectors, lower, upper):
+    weights = solution.weights
+    assert solution.converged
+    assert weights.sum() == pytest.approx(1, abs=TOLERANCE)
+    assert np.all(weights >= lower - TOLERANCE)
+    assert np.all(weights <= upper + TOLERANCE)
+    assert np.bincount(sectors, weights=weights).max() <= solution.sector_cap + TOLERANCE
+    assert np.abs(weights - current).sum() <= solution.max_turnover + TOLERANCE
+
+
+@pytest.mark.parametrize('objective', OBJECTIVES)
+@pytest.mark.parametrize('seed', range(5))
+def test_weights_meet_every_limit(objective, seed):
+    covariance, current, sectors = make_problem(40, 6, seed)
+    optimizer = PortfolioOptimizer(objective, max_weight=0.08, sector_cap=0.3, max_turnover=0.3)
+    solution = optimizer.solve(covariance, current, sectors)
+
+    # Limits are only ever relaxed
+    assert solution.sector_cap >= 0.3 and solution.max_turnover >= 0.3
+    assert_meets_limits(solution, current, sectors, np.zeros(40), np.full(40, 0.08))
+
+
+def test_limits_are_relaxed_until_they_can_be_met():
+    covariance, current, sectors = make_problem(30, 3, 0)
+    # Three sectors can't be fully invested at a 20% cap
+    solution = PortfolioOptimizer(sector_cap=0.2, max_turnover=1.0).solve(covariance, current, sectors)
+    assert solution.sector_cap >= 1 / 3 - TOLERANCE
+    assert_meets_limits(solution, current, sectors, np.zeros(30), np.full(30, 0.1))
+
+    # Half the book in one security needs more than 10% turnover to reach a 10% position limit
+    concentrated = np.full(30, 0.5 / 29)
+    concentrated[0] = 0.5
+    optimizer = PortfolioOptimizer(sector_cap=0.5, max_turnover=0.1)
+    solution = optimizer.solve(covariance, concentrated, sectors)
+    assert solution.max_turnover == pytest.approx(0.8)
+    assert_meets_limits(solution, concentrated, sectors, np.zeros(30), np.full(30, 0.1))
+
+
+def test_fixed_positions_stay_fixed():
+    covariance, current, sectors = make_problem(20, 4, 1)
+    lower, upper = np.zeros(20), np.full(20, 0.15)
+    lower[3] = upper[3] = current[3]
+    solution = PortfolioOptimizer(max_turnover=1.0).solve(covariance, current, sectors, lower, upper)
+    assert solution.weights[3] == pytest.approx(current[3], abs=TOLERANCE)
+    assert_meets_limits(solution, current, sectors, lower, upper)
+
+
+@pytest.mark.parametrize('objective', OBJECTIVES)
+def test_warm_start_reaches_the_cold_solution(objective):
+    covariance, current, sectors = make_problem(60, 6, 2)
+    optimizer = PortfolioOptimizer(objective, max_weight=0.05)
+    first = optimizer.solve(covariance, current, sectors)
+    # Prices move a little between solves
+    moved = current * (1 + np.random.default_rng(3).uniform(-0.02, 0.02, 60))
+    moved /= moved.sum()
+
+    cold = optimizer.solve(covariance, moved, sectors)
+    warm = optimizer.solve(covariance, moved, sectors, warm_start=first.state)
+    assert_meets_limits(warm, moved, sectors, np.zeros(60), np.full(60, 0.05))
+    assert warm.iterations < cold.iterations
+    np.testing.assert_allclose(warm.weights, cold.weights, atol=1e-3)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_share_rounding_never_spends_more_cash_than_it_raises(seed):
+    rng = np.random.default_rng(seed)
+    prices = rng.uniform(5, 500, 25)
+    quantities = rng.integers(0, 200, 25).astype(np.float64)
+    total_value = (quantities * prices).sum()
+    weights = rng.dirichlet(np.ones(25))
+
+    trades, cash = round_to_shares(weights, quantities, prices, total_value)
+    assert cash >= -1e-6
+    assert cash == pytest.approx(-(trades * prices).sum())
+    # Rounding moves each holding less than one share from its exact target
+    assert np.all(np.abs(quantities + trades - weights * total_value / prices) < 1 + 1e-9)
+    assert np.all(quantities + trades >= 0)
@@ -0,0 +1,52 @@
+"""
+Run from the src directory:
+
+    python -m pytest tests
+"""
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import make_holdings, make_prices
+from data.portfolio_data import PortfolioData
+from data.price_providers import StaticPriceProvider
+
+
+def views(portfolio_data, portfolio):
+    """Every accessor whose result depends on prices"""
+    return {
+        'summary': pd.Series(portfolio_data.get_portfolio_summary(portfolio)).to_frame(),
+        'holdings_summary': portfolio_data.get_holdings_summary(portfolio).reset_index(drop=True),
+        'holdings_detail': portfolio_data.get_holdings_detail(portfolio).reset_index(drop=True),
+        'sector_allocation': portfolio_data.get_sector_allocation(portfolio).reset_index(drop=True),
+        'sector_performance': portfolio_data.get_sector_performance(portfolio).reset_index(drop=True),
+        'value_weighted': portfolio_data.get_sector_performance(portfolio, 'value').reset_index(drop=True),
+        'security_breakdown': portfolio_data.get_breakdown('Security', portfolio=portfolio).reset_index(drop=True),
+        'page': portfolio_data.get_holdings_page(portfolio, 'detail', 0, 50, 'Return', False)[0]
+                .reset_index(drop=True)
+    }
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_partial_price_update_matches_a_full_rebuild(compact):
+    holdings = make_holdings(2000, n_portfolios=4)
+    prices = make_prices(sorted(holdings['Security'].unique()))
+    updated = PortfolioData(price_provider=StaticPriceProvider(prices), holdings=holdings, compact=compact)
+    portfolios = [None] + updated.get_portfolios()
+    # Fill the memoized views so the update has to invalidate them
+    for portfolio in portfolios:
+        views(updated, portfolio)
+
+    # A fifth of the tickers move, one is unchanged and one isn't held
+    moves = {ticker: price * 1.07 for ticker, price in list(prices.items())[::5]}
+    moves[next(iter(prices))] = prices[next(iter(prices))]
+    moves['NOT_HELD'] = 42.0
+    changed = updated.apply_price_updates(moves)
+    assert len(changed) == len(moves) - 2
+
+    rebuilt = PortfolioData(price_provider=StaticPriceProvider({**prices, **moves}), holdings=holdings,
+                            compact=compact)
+    for portfolio in portfolios:
+        expected = views(rebuilt, portfolio)
+        for name, frame in views(updated, portfolio).items():
+            pd.testing.assert_frame_equal(frame, expected[name], check_exact=False, rtol=1e-9,
+                                          obj=f"{name} of {portfolio}")
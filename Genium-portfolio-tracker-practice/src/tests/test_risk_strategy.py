@@ -0,0 +1,41 @@
+"""
+Run from the src directory:
+
+    python -m pytest tests
+"""
+import math
+
+import pandas as pd
+
+from analytics.risk import MonteCarloRiskEngine
+from analytics.risk_strategy import MonteCarloRiskStrategy
+from benchmarks.synthetic import make_price_history
+from data.price_history import StaticHistoryProvider
+
+
+def make_strategy(tickers):
+    history = make_price_history(tickers, 300, end=pd.Timestamp.today().normalize())
+    return MonteCarloRiskStrategy(history_store=StaticHistoryProvider(history),
+                                  engine=MonteCarloRiskEngine(n_paths=2000))
+
+
+def test_zero_priced_sector_is_reported_without_a_ratio():
+    holdings = pd.DataFrame({
+        'Portfolio': ['Growth', 'Growth', 'Unpriced'],
+        'Security': ['AAPL', 'RIVN', 'SPCE'],
+        'Sector': ['Technology', 'Automotive', 'Aerospace'],
+        # Unpriced tickers fall back to a sample price of 0
+        'Market_Value': [10000.0, 0.0, 0.0]
+    })
+    results = make_strategy(['AAPL', 'RIVN', 'SPCE']).analyze_many(holdings)
+
+    growth = results['Growth']
+    automotive = next(row for row in growth['metrics']['sectors'] if row['Sector'] == 'Automotive')
+    assert automotive['Market_Value'] == 0
+    assert any(line.startswith("- Automotive") and "(n/a of $0)" in line for line in growth['recommendations'])
+    assert "n/a" not in growth['summary']
+
+    unpriced = results['Unpriced']
+    assert unpriced['metrics']['market_value'] == 0
+    assert "(n/a of value)" in unpriced['summary']
+    assert not math.isnan(unpriced['metrics']['var'][0.99])
@@ -0,0 +1,34 @@
+"""
+Run from the src directory:
+
+    python -m pytest tests
+"""
+import pytest
+
+from data.tax_lots import EPSILON, Transaction, TaxLotLedger
+
+
+@pytest.mark.parametrize('method', ['fifo', 'lifo'])
+def test_empty_sale_on_a_closed_full_book_matches_nothing(method):
+    ledger = TaxLotLedger(method)
+    # Eight lots fill the book's initial capacity
+    for day in range(1, 9):
+        ledger.apply(Transaction(f"2024-01-0{day}", 'Growth', 'AAPL', 'buy', 1, 100.0))
+    assert ledger.apply(Transaction('2024-02-01', 'Growth', 'AAPL', 'sell', 8, 110.0)) == pytest.approx(80.0)
+
+    assert ledger.apply(Transaction('2024-02-02', 'Growth', 'AAPL', 'sell', 0, 110.0)) == 0.0
+    ledger.apply(Transaction('2024-02-03', 'Growth', 'AAPL', 'sell', EPSILON / 2, 110.0))
+    assert len(ledger.realized_lots) == 8
+    assert ledger.realized() == pytest.approx(80.0)
+
+
+def test_residual_sale_after_a_fractional_split():
+    ledger = TaxLotLedger('fifo')
+    ledger.apply(Transaction('2024-01-02', 'Growth', 'AAPL', 'buy', 3, 90.0))
+    ledger.apply(Transaction('2024-03-01', 'Growth', 'AAPL', 'split', 1 / 3, None))
+    ledger.apply(Transaction('2024-03-02', 'Growth', 'AAPL', 'sell', 1, 300.0))
+
+    ledger.apply(Transaction('2024-03-03', 'Growth', 'AAPL', 'sell', EPSILON / 2, 300.0))
+    ledger.update_prices({'AAPL': 300.0})
+    assert ledger.unrealized() == pytest.approx(0.0)
+    assert ledger.realized() == pytest.approx(30.0)